@@ -0,0 +1,158 @@
+"""
+Site-wide totals behind /api/analytics/stats.
+
+One document in ``analytics_counters`` holds the total article views,
+breed views, ratings and rating score (and the site-wide visitor sketch,
+see unique_visitors.py). The write paths keep it current
+with ``$inc``: one update per page view flush (see ViewCounter listeners)
+and one per rating. Reading the stats is a single ``find_one``.
+
+``reconcile()`` recomputes the totals by aggregating ``page_views`` and
+``article_ratings`` and applies the difference, correcting drift left by
+writes that failed halfway. Each write and its counter update run inside
+``counting()``, and a reconcile waits until none is in flight and holds
+new ones back, so it never sees a write before its ``$inc``. Differences
+are applied with ``$inc`` so counts from other processes are kept; if the
+counters moved while the aggregation ran, the pass is skipped and the next
+one tries again.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_ID = "totals"
+COUNTER_FIELDS = ("article_views", "breed_views", "ratings", "rating_score")
+
+
+class AnalyticsCounters:
+    """Running totals of page views and ratings."""
+
+    def __init__(self, db, interval: float = 3600.0):
+        self.db = db
+        self.interval = interval
+        self._task = None
+        # Writes between their database update and their counter $inc
+        self._writes = 0
+        self._reconciling = False
+        self._gate = asyncio.Condition()
+
+    @asynccontextmanager
+    async def counting(self):
+        """Wrap a write together with the add_views()/add_rating() call counting it."""
+        async with self._gate:
+            await self._gate.wait_for(lambda: not self._reconciling)
+            self._writes += 1
+        try:
+            yield
+        finally:
+            async with self._gate:
+                self._writes -= 1
+                self._gate.notify_all()
+
+    async def _inc(self, amounts: Dict[str, int]) -> None:
+        amounts = {field: amount for field, amount in amounts.items() if amount}
+        if amounts:
+            await self.db.analytics_counters.update_one(
+                {"_id": COUNTERS_ID},
+                {"$inc": amounts, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+
+    async def add_views(self, increments: Dict[Tuple[str, str], int]) -> None:
+        """View counter flush listener: count the views just written."""
+        totals = {"article_views": 0, "breed_views": 0}
+        for (page_type, _), count in increments.items():
+            field = f"{page_type}_views"
+            if field in totals:
+                totals[field] += count
+        await self._inc(totals)
+
+    async def add_rating(self, rating: int) -> None:
+        await self._inc({"ratings": 1, "rating_score": rating})
+
+    async def _counters(self) -> Dict[str, int]:
+        doc = await self.db.analytics_counters.find_one({"_id": COUNTERS_ID}, {"_id": 0, "visitors": 0})
+        return {field: (doc or {}).get(field, 0) for field in COUNTER_FIELDS}
+
+    async def read(self) -> dict:
+        """The stats shown on the admin dashboard."""
+        doc = await self.db.analytics_counters.find_one({"_id": COUNTERS_ID}, {"_id": 0, "visitors": 0})
+        if doc is None:
+            await self.reconcile()
+        counters = await self._counters()
+        return {
+            "total_article_views": counters["article_views"],
+            "total_breed_views": counters["breed_views"],
+            "total_ratings": counters["ratings"],
+            "average_rating": round(counters["rating_score"] / counters["ratings"], 2) if counters["ratings"] else 0
+        }
+
+    async def _aggregate(self) -> Dict[str, int]:
+        totals = dict.fromkeys(COUNTER_FIELDS, 0)
+        views = self.db.page_views.aggregate([
+            {"$match": {"page_type": {"$in": ["article", "breed"]}}},
+            {"$group": {"_id": "$page_type", "views": {"$sum": "$views"}}}
+        ])
+        for group in await views.to_list(None):
+            totals[f"{group['_id']}_views"] = group["views"]
+        ratings = self.db.article_ratings.aggregate([
+            {"$group": {"_id": None, "ratings": {"$sum": "$total_ratings"}, "score": {"$sum": "$total_score"}}}
+        ])
+        for group in await ratings.to_list(None):
+            totals["ratings"], totals["rating_score"] = group["ratings"], group["score"]
+        return totals
+
+    async def reconcile(self) -> dict:
+        """Recompute the totals and correct the counters; returns the corrections made."""
+        async with self._gate:
+            await self._gate.wait_for(lambda: not self._reconciling)
+            self._reconciling = True
+            await self._gate.wait_for(lambda: self._writes == 0)
+        try:
+            return await self._reconcile()
+        finally:
+            async with self._gate:
+                self._reconciling = False
+                self._gate.notify_all()
+
+    async def _reconcile(self) -> dict:
+        before = await self._counters()
+        actual = await self._aggregate()
+        if await self._counters() != before:
+            return {"skipped": True, "corrections": {}}
+        corrections = {field: actual[field] - before[field] for field in COUNTER_FIELDS if actual[field] != before[field]}
+        if corrections:
+            logger.warning("Corrected analytics counter drift: %s", corrections)
+        await self._inc(corrections)
+        if not corrections:
+            # Create the document on first use even when everything is zero
+            await self.db.analytics_counters.update_one(
+                {"_id": COUNTERS_ID}, {"$set": {"updated_at": datetime.utcnow()}}, upsert=True
+            )
+        return {"skipped": False, "corrections": corrections}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.reconcile()
+            except Exception:
+                logger.exception("Failed to reconcile analytics counters")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Reconcile now and then periodically."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,294 @@
+"""
+Prefix autocomplete over breed names, article titles and popular searches.
+
+Completions live in one sorted array of ``(key, kind, ref)`` tuples, so the
+keys starting with a prefix form one contiguous slice found by two binary
+searches. A max segment tree over the weights of that array then yields
+the heaviest keys of the slice in O(k log n), however wide it is. Every
+word start of a title is indexed, so "retr" finds "Golden Retriever".
+
+Weights come from page views (for breeds and articles) and from how often
+a query was searched (for terms). A query only becomes a term once
+``MIN_TERM_SEARCHERS`` different searchers made it; term weights halve
+every ``TERM_HALF_LIFE`` searches and faded terms are dropped, so stale
+terms make room for new ones. Weight changes update the tree in place;
+inserts and removals shift positions, so the tree is rebuilt on the next
+lookup. Results for a prefix are memoised until the next change.
+"""
+import heapq
+import re
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+# Word starts indexed per title, beyond the start of the title itself
+MAX_WORD_STARTS = 4
+# Popular search terms kept as completions
+MAX_TERMS = 5000
+# Different searchers needed before a query is suggested to anyone
+MIN_TERM_SEARCHERS = 3
+# Queries still short of MIN_TERM_SEARCHERS, least recently searched dropped first
+MAX_CANDIDATES = 20000
+# Searches after which term weights halve; terms below MIN_TERM_WEIGHT are dropped then
+TERM_HALF_LIFE = 5000
+MIN_TERM_WEIGHT = 1.0
+MAX_MEMO = 4096
+
+_SPACE_RE = re.compile(r"\s+")
+
+EntryKey = Tuple[str, str]  # (kind, ref): ("breed", id), ("article", id) or ("term", text)
+
+
+def normalize(text: str) -> str:
+    return _SPACE_RE.sub(" ", text.strip().lower())
+
+
+class _Entry:
+    __slots__ = ("text", "weight", "keys")
+
+    def __init__(self, text: str, weight: float, keys: List[Tuple[str, str, str]]):
+        self.text = text
+        self.weight = weight
+        self.keys = keys
+
+
+class Autocomplete:
+    """Weighted top-k prefix completion."""
+
+    def __init__(self):
+        self._keys: List[Tuple[str, str, str]] = []
+        self._entries: Dict[EntryKey, _Entry] = {}
+        self._terms = 0
+        # Query -> searchers seen so far, until it becomes a term
+        self._candidates: "OrderedDict[str, Set[Hashable]]" = OrderedDict()
+        self._searches = 0
+        self._memo: Dict[Tuple[str, int], List[str]] = {}
+        # Max segment tree over key positions; None until the next lookup after an insert/remove
+        self._tree: Optional[array] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ----- updates -----
+
+    def upsert(self, kind: str, ref: str, text: str, weight: Optional[float] = None,
+               _append: bool = False) -> None:
+        """Add or rename a completion, keeping its weight unless one is given."""
+        entry_key = (kind, ref)
+        existing = self._entries.get(entry_key)
+        if weight is None:
+            weight = existing.weight if existing else 0.0
+        if existing is not None:
+            if existing.text == text:
+                self._set_weight(existing, weight)
+                return
+            self.remove(kind, ref)
+
+        normalized = normalize(text)
+        if not normalized:
+            return
+        starts = [0] + [match.end() for match in re.finditer(" ", normalized)][:MAX_WORD_STARTS]
+        keys = sorted({(normalized[start:], kind, ref) for start in starts})
+        for key in keys:
+            if _append:
+                self._keys.append(key)
+            else:
+                self._keys.insert(bisect_left(self._keys, key), key)
+        self._entries[entry_key] = _Entry(text, weight, keys)
+        if kind == "term":
+            self._terms += 1
+        self._tree = None
+        self._memo.clear()
+
+    def upsert_many(self, kind: str, entries: Iterable[Tuple[str, str]]) -> None:
+        """upsert() for many ``(ref, text)`` completions, sorting the keys once."""
+        added: Dict[str, Tuple[str, float]] = {}
+        for ref, text in entries:
+            existing = self._entries.get((kind, ref))
+            if existing is not None:
+                if existing.text == text:
+                    continue
+                # Removing needs the keys sorted, so renames go before the appends
+                self.remove(kind, ref)
+            weight = existing.weight if existing else added.get(ref, ("", 0.0))[1]
+            added[ref] = (text, weight)
+        for ref, (text, weight) in added.items():
+            self.upsert(kind, ref, text, weight, _append=True)
+        if added:
+            self._keys.sort()
+
+    def remove(self, kind: str, ref: str) -> None:
+        """Drop a completion."""
+        entry = self._entries.pop((kind, ref), None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+        if kind == "term":
+            self._terms -= 1
+        self._tree = None
+        self._memo.clear()
+
+    def add_weight(self, kind: str, ref: str, amount: float) -> None:
+        """Increase the weight of an existing completion."""
+        entry = self._entries.get((kind, ref))
+        if entry is not None:
+            self._set_weight(entry, entry.weight + amount)
+
+    def _set_weight(self, entry: _Entry, weight: float) -> None:
+        entry.weight = weight
+        self._memo.clear()
+        if self._tree is None:
+            return
+        for key in entry.keys:
+            node = bisect_left(self._keys, key) + self._size
+            self._weights[node - self._size] = weight
+            node //= 2
+            while node:
+                self._tree[node] = self._heavier(self._tree[2 * node], self._tree[2 * node + 1])
+                node //= 2
+
+    # ----- segment tree -----
+
+    def _heavier(self, left: int, right: int) -> int:
+        if left < 0:
+            return right
+        if right < 0:
+            return left
+        return left if self._weights[left] >= self._weights[right] else right
+
+    def _build_tree(self) -> None:
+        size = 1
+        while size < len(self._keys):
+            size *= 2
+        entries = self._entries
+        self._weights = array("d", (entries[(kind, ref)].weight for _, kind, ref in self._keys))
+        tree = array("i", [-1]) * (2 * size)
+        tree[size:size + len(self._keys)] = array("i", range(len(self._keys)))
+        self._tree, self._size = tree, size
+        for node in range(size - 1, 0, -1):
+            tree[node] = self._heavier(tree[2 * node], tree[2 * node + 1])
+
+    def _heaviest(self, low: int, high: int) -> int:
+        """Position of the heaviest key in ``[low, high)``, or -1."""
+        best = -1
+        low += self._size
+        high += self._size
+        tree = self._tree
+        while low < high:
+            if low & 1:
+                best = self._heavier(best, tree[low])
+                low += 1
+            if high & 1:
+                high -= 1
+                best = self._heavier(best, tree[high])
+            low //= 2
+            high //= 2
+        return best
+
+    def record_query(self, q: str, searcher: Hashable) -> None:
+        """Count a search so queries made by enough searchers become completions."""
+        term = normalize(q)
+        if len(term) < 3:
+            return
+        self._searches += 1
+        if self._searches >= TERM_HALF_LIFE:
+            self._decay_terms()
+        if ("term", term) in self._entries:
+            self.add_weight("term", term, 1.0)
+            return
+        searchers = self._candidates.pop(term, set())
+        searchers.add(searcher)
+        if len(searchers) < MIN_TERM_SEARCHERS:
+            self._candidates[term] = searchers
+            if len(self._candidates) > MAX_CANDIDATES:
+                self._candidates.popitem(last=False)
+            return
+        if self._terms >= MAX_TERMS:
+            self._drop_lightest_terms(MAX_TERMS // 10)
+        self.upsert("term", term, term, float(MIN_TERM_SEARCHERS))
+
+    def _decay_terms(self) -> None:
+        self._searches = 0
+        faded = []
+        for (kind, ref), entry in self._entries.items():
+            if kind == "term":
+                entry.weight /= 2
+                if entry.weight < MIN_TERM_WEIGHT:
+                    faded.append(ref)
+        for ref in faded:
+            self.remove("term", ref)
+        self._tree = None
+        self._memo.clear()
+
+    def _drop_lightest_terms(self, count: int) -> None:
+        terms = ((entry.weight, ref) for (kind, ref), entry in self._entries.items() if kind == "term")
+        for _, ref in heapq.nsmallest(count, terms):
+            self.remove("term", ref)
+
+    # ----- queries -----
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[str]:
+        """Return up to ``limit`` completions for ``prefix``, heaviest first."""
+        prefix = normalize(prefix)
+        memo_key = (prefix, limit)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+
+        if self._tree is None:
+            self._build_tree()
+        low = bisect_left(self._keys, (prefix,))
+        high = bisect_left(self._keys, (prefix + "\uffff",), low)
+
+        # Pop the heaviest key of a range and push the two ranges beside it
+        suggestions, seen_entries, seen_texts = [], set(), set()
+        candidates = []
+        position = self._heaviest(low, high)
+        if position >= 0:
+            candidates.append((-self._weights[position], position, low, high))
+        while candidates and len(suggestions) < limit:
+            _, position, range_low, range_high = heapq.heappop(candidates)
+            for part_low, part_high in ((range_low, position), (position + 1, range_high)):
+                best = self._heaviest(part_low, part_high)
+                if best >= 0:
+                    heapq.heappush(candidates, (-self._weights[best], best, part_low, part_high))
+
+            _, kind, ref = self._keys[position]
+            if (kind, ref) in seen_entries:
+                continue
+            seen_entries.add((kind, ref))
+            text = self._entries[(kind, ref)].text
+            if text.lower() not in seen_texts:
+                seen_texts.add(text.lower())
+                suggestions.append(text)
+
+        if len(self._memo) >= MAX_MEMO:
+            self._memo.clear()
+        self._memo[memo_key] = suggestions
+        return suggestions
+
+    # ----- building -----
+
+    async def load(self, db) -> None:
+        """Load breed names, article titles and their page views."""
+        # Append everything and sort once instead of inserting in order
+        async for breed in db.breeds.find({}, {"_id": 0, "id": 1, "name": 1}):
+            self.upsert("breed", breed["id"], breed.get("name", ""), _append=True)
+        async for article in db.articles.find({}, {"_id": 0, "id": 1, "title": 1}):
+            self.upsert("article", article["id"], article.get("title", ""), _append=True)
+        self._keys.sort()
+        async for view in db.page_views.find({}, {"_id": 0, "page_type": 1, "page_id": 1, "views": 1}):
+            entry = self._entries.get((view["page_type"], view["page_id"]))
+            if entry is not None:
+                entry.weight += view.get("views", 0)
+        self._build_tree()
+
+    def add_views(self, increments: Dict[Tuple[str, str], int]) -> None:
+        """View counter flush listener: move weights by the new page views."""
+        for (page_type, page_id), count in increments.items():
+            self.add_weight(page_type, page_id, count)
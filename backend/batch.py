@@ -0,0 +1,38 @@
+"""
+Batch reads: many documents by id in one ``$in`` query.
+
+Results keep the order the ids were requested in, and ids with no
+document are reported back instead of failing the whole batch.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+MAX_BATCH = 100
+
+
+def parse_ids(ids: str, max_batch: int = MAX_BATCH) -> List[str]:
+    """Split a comma-separated ``ids`` parameter, dropping blanks and duplicates."""
+    parsed = list(dict.fromkeys(part.strip() for part in ids.split(",") if part.strip()))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if len(parsed) > max_batch:
+        raise HTTPException(status_code=400, detail=f"At most {max_batch} ids per batch")
+    return parsed
+
+
+def in_order(docs: List[dict], ids: List[str], field: str = "id") -> Tuple[List[dict], List[str]]:
+    """Order ``docs`` like ``ids``; return them with the ids that matched nothing."""
+    by_id: Dict[str, dict] = {doc[field]: doc for doc in docs}
+    return [by_id[doc_id] for doc_id in ids if doc_id in by_id], [doc_id for doc_id in ids if doc_id not in by_id]
+
+
+async def fetch_by_ids(collection, ids: List[str], projection: Optional[dict] = None,
+                       field: str = "id") -> Tuple[List[dict], List[str]]:
+    """Read the documents whose ``field`` is in ``ids`` with one query."""
+    projection = dict(projection or {"_id": 0})
+    if projection.get(field) is None and any(value == 1 for value in projection.values()):
+        # The id is needed to put the documents back in order
+        projection[field] = 1
+    docs = await collection.find({field: {"$in": ids}}, projection).to_list(len(ids))
+    return in_order(docs, ids, field)
@@ -0,0 +1,103 @@
+"""
+Minimal in-memory stand-in for a Motor collection used by the benchmarks.
+
+Every call costs one simulated network round trip, and at most
+``pool_size`` calls are in flight at once (Motor's default connection
+pool is 100). Run the benchmarks with ``--mongo`` to use the database
+from ``MONGO_URL``/``DB_NAME`` instead.
+"""
+import asyncio
+import os
+
+from pymongo.results import BulkWriteResult
+
+
+class SimulatedCollection:
+    """Counts round trips and sleeps ``rtt`` seconds for each one."""
+
+    def __init__(self, rtt: float = 0.0005, pool_size: int = 100):
+        self.rtt = rtt
+        self.round_trips = 0
+        self.docs = {}
+        self._pool = None
+        self._pool_size = pool_size
+
+    async def _round_trip(self):
+        if self._pool is None:
+            self._pool = asyncio.Semaphore(self._pool_size)
+        async with self._pool:
+            self.round_trips += 1
+            await asyncio.sleep(self.rtt)
+
+    @staticmethod
+    def _key(filter_doc):
+        return tuple(sorted(filter_doc.items()))
+
+    def _apply(self, filter_doc, update):
+        """Upsert; returns True if the document was inserted."""
+        key = self._key(filter_doc)
+        inserted = key not in self.docs
+        doc = self.docs.setdefault(key, dict(filter_doc))
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        doc.update(update.get("$set", {}))
+        if inserted:
+            doc.update(update.get("$setOnInsert", {}))
+        return inserted
+
+    async def update_one(self, filter_doc, update, upsert=False):
+        await self._round_trip()
+        self._apply(filter_doc, update)
+
+    async def find_one(self, filter_doc, projection=None):
+        await self._round_trip()
+        doc = self.docs.get(self._key(filter_doc))
+        return dict(doc) if doc else None
+
+    def find(self, filter_doc, projection=None):
+        """Equality and ``$in`` filters only; costs one round trip when the results are read."""
+        def matches(doc):
+            for field, condition in filter_doc.items():
+                if isinstance(condition, dict) and "$in" in condition:
+                    if doc.get(field) not in condition["$in"]:
+                        return False
+                elif doc.get(field) != condition:
+                    return False
+            return True
+
+        return _SimulatedCursor(self, [dict(doc) for doc in self.docs.values() if matches(doc)])
+
+    async def insert_many(self, documents):
+        await self._round_trip()
+        for doc in documents:
+            self.docs[len(self.docs)] = dict(doc)
+
+    async def bulk_write(self, operations, ordered=True):
+        await self._round_trip()
+        upserted = sum(self._apply(operation._filter, operation._doc) for operation in operations)
+        return BulkWriteResult({"nUpserted": upserted, "nMatched": len(operations) - upserted}, True)
+
+
+class _SimulatedCursor:
+    def __init__(self, collection, docs):
+        self._collection = collection
+        self._docs = docs
+
+    async def __aiter__(self):
+        await self._collection._round_trip()
+        for doc in self._docs:
+            yield doc
+
+    async def to_list(self, length=None):
+        await self._collection._round_trip()
+        return self._docs if length is None else self._docs[:length]
+
+
+def mongo_collection(name: str):
+    """Return a real Motor collection from the environment configuration."""
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv()
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return client[os.environ['DB_NAME']][name]
@@ -0,0 +1,65 @@
+"""
+Benchmark: autocomplete memory footprint and top-k latency.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_autocomplete [--sizes 1000,10000,100000]
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from autocomplete import Autocomplete
+
+QUERIES = 2000
+
+
+def make_title(rng):
+    syllables = ["ka", "lo", "ri", "ten", "mar", "do", "bel", "gri", "shep", "ter", "sa", "pon"]
+    return " ".join(
+        "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).capitalize()
+        for _ in range(rng.randint(1, 4))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    args = parser.parse_args()
+
+    for size in [int(size) for size in args.sizes.split(",")]:
+        rng = random.Random(size)
+        titles = [make_title(rng) for _ in range(size)]
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        index = Autocomplete()
+        for number, title in enumerate(titles):
+            index.upsert("article", str(number), title, weight=rng.paretovariate(1.2), _append=True)
+        index._keys.sort()
+        index._build_tree()
+        used = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename"))
+        tracemalloc.stop()
+
+        prefixes = [title.lower()[:rng.randint(2, 5)] for title in rng.sample(titles, min(QUERIES, size))]
+        cold = []
+        for prefix in prefixes:
+            index._memo.clear()
+            start = time.perf_counter()
+            index.suggest(prefix)
+            cold.append(time.perf_counter() - start)
+        warm = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.suggest(prefix)
+            warm.append(time.perf_counter() - start)
+
+        print(f"{size:>8,} completions  {used / 1024 / 1024:7.1f} MiB ({used / size:5.0f} B each)   "
+              f"cold p50 {statistics.median(cold) * 1e6:6.1f} us  max {max(cold) * 1e6:8.1f} us   "
+              f"memoised p50 {statistics.median(warm) * 1e6:5.1f} us")
+
+
+if __name__ == "__main__":
+    main()
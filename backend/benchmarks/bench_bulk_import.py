@@ -0,0 +1,110 @@
+"""
+Benchmark: NDJSON import throughput and memory, against one POST per article.
+
+Streams generated articles through import_ndjson the way /api/admin/import
+reads a request body, and compares with validating and inserting them one
+at a time as the create route does (timed on a sample and extrapolated).
+Run from the backend directory:
+
+    python -m benchmarks.bench_bulk_import [--records 1000000] [--batch 1000] [--mongo]
+
+The simulated database charges one round trip per call whatever its size
+and does not keep the documents, so memory reflects the import alone.
+"""
+import argparse
+import asyncio
+import resource
+import time
+
+import orjson
+
+from bulk_io import IMPORT_BATCH, import_ndjson
+from models import Article, ArticleCreate
+from benchmarks._simulated_db import SimulatedCollection, mongo_collection
+from pymongo.results import BulkWriteResult
+
+CATEGORIES = ["nutrition", "health", "training", "grooming", "behavior", "care"]
+CONTENT = "<p>" + "Regular walks and a balanced diet keep most pets healthy. " * 5 + "</p>"
+
+
+class SinkCollection(SimulatedCollection):
+    """Round trips without storing anything."""
+
+    async def insert_one(self, document):
+        await self._round_trip()
+
+    async def bulk_write(self, operations, ordered=True):
+        await self._round_trip()
+        return BulkWriteResult({"nUpserted": len(operations), "nMatched": 0}, True)
+
+
+def article(number):
+    return {
+        "id": f"article-{number}", "title": f"Pet care tip #{number}", "category": CATEGORIES[number % 6],
+        "excerpt": "A short summary of the article.", "content": CONTENT, "author": "PetsLib",
+        "date": "2025-01-15", "readTime": "5 min read",
+    }
+
+
+async def ndjson_body(records, chunk_bytes=64 * 1024):
+    """The request body as the server receives it: NDJSON in ~64 KiB chunks."""
+    buffer = bytearray()
+    for number in range(records):
+        buffer += orjson.dumps(article(number))
+        buffer += b"\n"
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def one_by_one(collection, records):
+    """The create route per article: validate ArticleCreate, build Article, insert_one."""
+    for number in range(records):
+        fields = article(number)
+        new_article = Article(**ArticleCreate(**fields).model_dump(), date=fields["date"])
+        await collection.insert_one(new_article.model_dump())
+
+
+def max_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=20_000, help="articles timed one by one")
+    parser.add_argument("--batch", type=int, default=IMPORT_BATCH)
+    parser.add_argument("--rtt", type=float, default=0.0005, help="simulated round trip in seconds")
+    parser.add_argument("--mongo", action="store_true", help="use MONGO_URL instead of the simulation")
+    args = parser.parse_args()
+
+    def collection(name):
+        return mongo_collection(name) if args.mongo else SinkCollection(rtt=args.rtt)
+
+    start = time.perf_counter()
+    async for _ in ndjson_body(args.records):
+        pass
+    generating = time.perf_counter() - start
+    print(f"{args.records:,} articles, {generating:.1f} s to generate the body (included below)")
+
+    sample = min(args.sample, args.records)
+    start = time.perf_counter()
+    await one_by_one(collection("bench_import_one_by_one"), sample)
+    elapsed = time.perf_counter() - start
+    print(f"one by one  {sample / elapsed:>10,.0f} records/sec   "
+          f"~{elapsed * args.records / sample:8.1f} s for {args.records:,}")
+
+    rss_before = max_rss_mib()
+    target = collection("bench_import_ndjson")
+    start = time.perf_counter()
+    report = await import_ndjson(target, Article, ndjson_body(args.records), batch_size=args.batch)
+    elapsed = time.perf_counter() - start
+    print(f"import      {args.records / elapsed:>10,.0f} records/sec   {elapsed:9.1f} s"
+          f"   {getattr(target, 'round_trips', '?')} round trips"
+          f"   peak RSS +{max_rss_mib() - rss_before:.1f} MiB   {report.failed} failed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
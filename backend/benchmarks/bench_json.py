@@ -0,0 +1,107 @@
+"""
+Benchmark: serializing /api/articles?limit=50 and /api/breeds?limit=50 payloads.
+
+"before" is FastAPI's default path (jsonable_encoder, then JSONResponse's
+json.dumps); "after" is serialization.dumps, which the list routes now use.
+Run from the backend directory:
+
+    python -m benchmarks.bench_json [--rounds 500] [--content-kb 8]
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from serialization import dumps
+
+WORDS = "dog cat breed care health food puppy kitten training walk groom vet coat play sleep".split()
+
+
+def text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def article(rng, content_kb):
+    paragraphs = "".join(f"<p>{text(rng, 80)}</p>" for _ in range(max(1, content_kb * 1024 // 500)))
+    stamp = datetime(2024, 1, 1) + timedelta(seconds=rng.randint(0, 10 ** 7), milliseconds=rng.randint(0, 999))
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "title": text(rng, 6).title(),
+        "category": rng.choice(["nutrition", "health", "training", "care"]),
+        "excerpt": text(rng, 25),
+        "content": paragraphs,
+        "author": "PetsLib Editorial Team",
+        "date": stamp.strftime("%Y-%m-%d"),
+        "readTime": f"{rng.randint(3, 12)} min read",
+        "image_url": f"/api/uploads/articles/{uuid.UUID(int=rng.getrandbits(128))}.jpg",
+        "created_at": stamp,
+        "updated_at": stamp,
+    }
+
+
+def breed(rng):
+    stamp = datetime(2024, 1, 1) + timedelta(seconds=rng.randint(0, 10 ** 7), milliseconds=rng.randint(0, 999))
+    return {
+        "id": text(rng, 2).replace(" ", "-"),
+        "name": text(rng, 2).title(),
+        "species": rng.choice(["dog", "cat"]),
+        "size": rng.choice(["Small", "Medium", "Large"]),
+        "weight": "20-30 kg",
+        "lifespan": "10-12 years",
+        "temperament": [text(rng, 1) for _ in range(4)],
+        "origin": "Scotland",
+        "history": text(rng, 300),
+        "careRequirements": {key: text(rng, 20) for key in ("exercise", "grooming", "training", "space")},
+        "healthInfo": text(rng, 200),
+        "idealFor": text(rng, 20),
+        "image_url": None,
+        "created_at": stamp,
+        "updated_at": stamp,
+    }
+
+
+def page(key, items):
+    return {key: items, "pagination": {"page": 1, "limit": 50, "total": 5000, "total_pages": 100,
+                                       "next_cursor": "eyJ2IjpbIjIwMjQtMDEtMDEiLCJ4Il19"}}
+
+
+def before(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def time_it(function, content, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function(content)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--content-kb", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    payloads = {
+        "/api/articles?limit=50": page("articles", [article(rng, args.content_kb) for _ in range(50)]),
+        "/api/breeds?limit=50": page("breeds", [breed(rng) for _ in range(50)]),
+    }
+    for route, content in payloads.items():
+        assert before(content) == dumps(content), "serializers disagree"
+        size = len(dumps(content))
+        old = time_it(before, content, args.rounds)
+        new = time_it(dumps, content, args.rounds)
+        print(f"{route:<24} {size / 1024:7.1f} KiB   before {old * 1000:7.3f} ms   "
+              f"after {new * 1000:7.3f} ms   {old / new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
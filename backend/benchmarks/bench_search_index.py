@@ -0,0 +1,117 @@
+"""
+Benchmark: in-memory BM25 query latency at several corpus sizes.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_search_index [--sizes 10000,100000,1000000] [--mongo]
+
+With ``--mongo`` the same corpus is written to a scratch collection in the
+database from ``MONGO_URL`` and the same queries are timed against its
+``$text`` index for comparison.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from search_index import SearchIndex
+from benchmarks._simulated_db import mongo_collection
+
+VOCABULARY_SIZE = 20000
+QUERIES = 200
+
+
+def make_vocabulary(rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(VOCABULARY_SIZE)]
+
+
+def make_corpus(size, vocabulary, rng):
+    # Zipf-like term distribution, as in natural text
+    cumulative, total = [], 0.0
+    for rank in range(len(vocabulary)):
+        total += 1.0 / (rank + 1)
+        cumulative.append(total)
+
+    def words(count):
+        return " ".join(rng.choices(vocabulary, cum_weights=cumulative, k=count))
+
+    for number in range(size):
+        yield {
+            "id": str(number),
+            "title": words(6),
+            "excerpt": words(20),
+            "content": f"<p>{words(60)}</p>",
+        }
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def report(label, samples):
+    print(f"  {label:<8} p50 {percentile(samples, 0.5) * 1000:8.3f} ms   "
+          f"p99 {percentile(samples, 0.99) * 1000:8.3f} ms   "
+          f"mean {statistics.mean(samples) * 1000:8.3f} ms")
+
+
+async def bench_mongo(corpus, queries):
+    collection = mongo_collection("bench_search_articles")
+    await collection.drop()
+    batch = []
+    for doc in corpus:
+        batch.append(dict(doc))
+        if len(batch) == 10000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    await collection.create_index([("title", "text"), ("excerpt", "text"), ("content", "text")])
+
+    samples = []
+    score = {"$meta": "textScore"}
+    for q in queries:
+        start = time.perf_counter()
+        await collection.find({"$text": {"$search": q}}, {"_id": 0, "id": 1, "score": score}) \
+            .sort([("score", score)]).limit(11).to_list(11)
+        samples.append(time.perf_counter() - start)
+    await collection.drop()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--mongo", action="store_true", help="also time MongoDB $text queries")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    # Mix of frequent, mid-frequency and rare terms, one or two words each
+    queries = [" ".join(rng.choice(vocabulary[:rng.choice([50, 2000, VOCABULARY_SIZE])])
+                        for _ in range(rng.randint(1, 2)))
+               for _ in range(QUERIES)]
+
+    for size in [int(size) for size in args.sizes.split(",")]:
+        print(f"{size:,} documents")
+        index = SearchIndex()
+        start = time.perf_counter()
+        for doc in make_corpus(size, vocabulary, random.Random(size)):
+            index.add_article(doc)
+        print(f"  built in {time.perf_counter() - start:.1f}s: {index.stats()}")
+
+        samples = []
+        for q in queries:
+            start = time.perf_counter()
+            index.search(q, ("article",), 10)
+            samples.append(time.perf_counter() - start)
+        report("memory", samples)
+
+        if args.mongo:
+            report("mongo", asyncio.run(bench_mongo(make_corpus(size, vocabulary, random.Random(size)), queries)))
+
+
+if __name__ == "__main__":
+    main()
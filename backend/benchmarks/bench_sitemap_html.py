@@ -0,0 +1,99 @@
+"""
+Benchmark: time and peak memory of HTML sitemap rendering.
+
+Compares the previous string-concatenating implementation (copied below,
+with the shared page head) against the streaming renderer behind
+/api/sitemap.html. Run from the backend directory:
+
+    python -m benchmarks.bench_sitemap_html [--sizes 10000,100000,1000000]
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from sitemap_generator import HTML_SITEMAP_FOOT, HTML_SITEMAP_HEAD, aiter_html_sitemap
+
+BASE_URL = "https://petslib.com"
+CATEGORIES = ["nutrition", "health", "training", "grooming", "behavior", "care"]
+
+
+def legacy_generate_html_sitemap(articles, breeds, base_url):
+    """The renderer before streaming: grows one string with += per link."""
+    articles_by_category = {}
+    for article in articles:
+        articles_by_category.setdefault(article.get('category', 'other'), []).append(article)
+    dogs = [b for b in breeds if b.get('species') == 'dog']
+    cats = [b for b in breeds if b.get('species') == 'cat']
+
+    html = HTML_SITEMAP_HEAD.format(base_url=base_url)
+    for category, cat_articles in sorted(articles_by_category.items()):
+        html += f'        <h3 style="color: #f97316; text-transform: capitalize;">{category}</h3>\n'
+        html += '        <ul>\n'
+        for article in sorted(cat_articles, key=lambda x: x.get('title', '')):
+            html += f'            <li><a href="{base_url}/articles/{article["id"]}">{article.get("title", "Untitled")}</a></li>\n'
+        html += '        </ul>\n'
+    for title, group in (('Dog Breeds', dogs), ('Cat Breeds', cats)):
+        html += f'    </div>\n\n    <div class="section">\n        <h2>{title}</h2>\n        <ul>\n'
+        for breed in sorted(group, key=lambda x: x.get('name', '')):
+            html += f'            <li><a href="{base_url}/breeds/{breed["id"]}">{breed.get("name", "Unknown")}</a></li>\n'
+        html += '        </ul>\n'
+    html += '    </div>\n' + HTML_SITEMAP_FOOT
+    return html
+
+
+def make_documents(count, rng):
+    articles = [{"id": f"article-{n}", "title": f"Article {rng.random():.8f}",
+                 "category": rng.choice(CATEGORIES)} for n in range(count)]
+    breeds = [{"id": f"breed-{n}", "name": f"Breed {rng.random():.8f}",
+               "species": rng.choice(["dog", "cat"])} for n in range(max(1, count // 10))]
+    return articles, breeds
+
+
+async def cursor(docs):
+    """Stand-in for a MongoDB cursor walking an index in order."""
+    for doc in docs:
+        yield doc
+
+
+async def stream(articles, dogs, cats):
+    size = 0
+    async for chunk in aiter_html_sitemap(cursor(articles), cursor(dogs), cursor(cats), BASE_URL):
+        size += len(chunk)
+    return size
+
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def report(label, count, size, elapsed, peak):
+    print(f"{label:<10} {count:>10,} articles  {size / 1024 / 1024:8.1f} MiB output  "
+          f"{elapsed:7.2f} s  peak {peak / 1024 / 1024:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    args = parser.parse_args()
+
+    for count in [int(size) for size in args.sizes.split(",") if size]:
+        articles, breeds = make_documents(count, random.Random(count))
+        report("legacy", count, *measure(lambda: len(legacy_generate_html_sitemap(articles, breeds, BASE_URL))))
+
+        # The database returns these already sorted, so sorting is not timed
+        sorted_articles = sorted(articles, key=lambda a: (a["category"], a["title"]))
+        dogs = sorted((b for b in breeds if b["species"] == "dog"), key=lambda b: b["name"])
+        cats = sorted((b for b in breeds if b["species"] == "cat"), key=lambda b: b["name"])
+        report("streaming", count, *measure(lambda: asyncio.run(stream(sorted_articles, dogs, cats))))
+
+
+if __name__ == "__main__":
+    main()
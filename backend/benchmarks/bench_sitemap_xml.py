@@ -0,0 +1,83 @@
+"""
+Benchmark: peak memory and time of XML sitemap generation.
+
+Compares the previous ElementTree + minidom implementation (copied below)
+with the streaming generator that server.py now uses. Run from the backend
+directory:
+
+    python -m benchmarks.bench_sitemap_xml [--legacy-sizes 10000,100000] [--sizes 100000,1000000]
+"""
+import argparse
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import date
+from xml.dom import minidom
+
+from sitemap_generator import content_url, iter_xml_urlset, static_urls
+
+BASE_URL = "https://petslib.com"
+
+
+def legacy_generate_xml_sitemap(articles, breeds, base_url):
+    """The generator before streaming: full tree, serialise, reparse, pretty-print."""
+    urlset = ET.Element('urlset')
+    urlset.set('xmlns', 'http://www.sitemaps.org/schemas/sitemap/0.9')
+    today = date.today().isoformat()
+    for loc in [base_url, f"{base_url}/articles", f"{base_url}/breeds"] + \
+               [f"{base_url}/articles/{a['id']}" for a in articles] + \
+               [f"{base_url}/breeds/{b['id']}" for b in breeds]:
+        url = ET.SubElement(urlset, 'url')
+        ET.SubElement(url, 'loc').text = loc
+        ET.SubElement(url, 'lastmod').text = today
+        ET.SubElement(url, 'changefreq').text = 'hourly'
+        ET.SubElement(url, 'priority').text = '0.9'
+    rough_string = ET.tostring(urlset, encoding='unicode')
+    reparsed = minidom.parseString(rough_string)
+    return reparsed.toprettyxml(indent="  ", encoding="UTF-8").decode('utf-8')
+
+
+def documents(count):
+    """Stand-in for a database cursor: documents are produced one at a time."""
+    for number in range(count):
+        yield {"id": f"article-{number}"}
+
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def report(label, urls, size, elapsed, peak):
+    print(f"{label:<10} {urls:>10,} URLs  {size / 1024 / 1024:8.1f} MiB output  "
+          f"{elapsed:7.2f} s  peak {peak / 1024 / 1024:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--legacy-sizes", default="10000,100000")
+    parser.add_argument("--sizes", default="100000,1000000")
+    args = parser.parse_args()
+
+    for count in [int(size) for size in args.legacy_sizes.split(",") if size]:
+        articles = list(documents(count))
+        report("legacy", count, *measure(lambda: len(legacy_generate_xml_sitemap(articles, [], BASE_URL))))
+
+    for count in [int(size) for size in args.sizes.split(",") if size]:
+        def stream():
+            def urls():
+                yield from static_urls(BASE_URL)
+                for doc in documents(count):
+                    yield content_url(BASE_URL, "articles", doc)
+            return sum(len(chunk) for chunk in iter_xml_urlset(urls()))
+
+        report("streaming", count, *measure(stream))
+
+
+if __name__ == "__main__":
+    main()
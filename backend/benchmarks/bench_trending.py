@@ -0,0 +1,52 @@
+"""
+Benchmark: decayed trending score updates per second.
+
+Replays views with a skewed (Zipf-like) page popularity over a simulated
+day, so the landmark is moved several times, and checks the top-K against
+a full sort of the scores at the end. Run from the backend directory:
+
+    python -m benchmarks.bench_trending [--views 1000000] [--pages 10000,100000]
+"""
+import argparse
+import random
+import time
+
+from trending import Trending
+
+SIMULATED_SPAN = 24 * 60 * 60
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--views", type=int, default=1_000_000)
+    parser.add_argument("--pages", default="10000,100000")
+    parser.add_argument("--half-life", type=float, default=15 * 60)
+    args = parser.parse_args()
+
+    for pages in [int(pages) for pages in args.pages.split(",")]:
+        rng = random.Random(pages)
+        weights = [1 / (rank + 1) ** 1.1 for rank in range(pages)]
+        ids = [f"page-{number}" for number in range(pages)]
+        viewed = rng.choices(ids, weights, k=args.views)
+        types = [rng.choice(("article", "breed")) for _ in range(args.views)]
+        step = SIMULATED_SPAN / args.views
+
+        trending = Trending(None, half_life=args.half_life, clock=lambda: 0.0)
+        start = time.perf_counter()
+        for number, (page_type, page_id) in enumerate(zip(types, viewed)):
+            trending.record(page_type, page_id, now=number * step)
+        elapsed = time.perf_counter() - start
+
+        end = args.views * step
+        exact = all(
+            [page_id for page_id, _ in trending.top(page_type, trending.size, now=end)]
+            == [page_id for page_id, _ in sorted(trending._scores[page_type].items(), key=lambda item: (-item[1], item[0]))[:trending.size]]
+            for page_type in ("article", "breed")
+        )
+        print(f"{pages:>8,} pages  {args.views / elapsed:>10,.0f} updates/s  "
+              f"({elapsed / args.views * 1e6:.2f} us each)  "
+              f"{sum(map(len, trending._scores.values())):>7,} scores kept  top-{trending.size} exact: {exact}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: page view writes/sec, per-hit upsert + find_one vs ViewCounter.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_view_counter [--hits 5000] [--pages 200] [--mongo]
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from view_counter import ViewCounter
+from benchmarks._simulated_db import SimulatedCollection, mongo_collection
+
+
+async def track_direct(collection, page_type, page_id):
+    """The original track_page_view: one upsert plus one read per hit."""
+    await collection.update_one(
+        {"page_type": page_type, "page_id": page_id},
+        {"$inc": {"views": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return await collection.find_one({"page_type": page_type, "page_id": page_id}, {"_id": 0})
+
+
+async def run(label, collection, hits, track):
+    start = time.perf_counter()
+    await asyncio.gather(*(track(page_type, page_id) for page_type, page_id in hits))
+    elapsed = time.perf_counter() - start
+    round_trips = getattr(collection, "round_trips", None)
+    print(f"{label:<12} {len(hits) / elapsed:>12,.0f} writes/sec   "
+          f"{elapsed * 1000:>8.1f} ms" + (f"   {round_trips} round trips" if round_trips is not None else ""))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hits", type=int, default=5000)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--rtt", type=float, default=0.0005, help="simulated round trip in seconds")
+    parser.add_argument("--mongo", action="store_true", help="use MONGO_URL instead of the simulation")
+    args = parser.parse_args()
+
+    random.seed(42)
+    hits = [(random.choice(["article", "breed"]), str(random.randrange(args.pages)))
+            for _ in range(args.hits)]
+
+    def collection(name):
+        return mongo_collection(name) if args.mongo else SimulatedCollection(rtt=args.rtt)
+
+    print(f"{args.hits} concurrent hits over {args.pages * 2} pages")
+
+    before = collection("bench_page_views_direct")
+    await run("before", before, hits, lambda t, i: track_direct(before, t, i))
+
+    after = collection("bench_page_views_batched")
+    counter = ViewCounter(after)
+    counter.start()
+    await run("after", after, hits, counter.record)
+    # Second pass: every page total is already known, only flushes hit the database
+    await run("after/warm", after, hits, counter.record)
+    await counter.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
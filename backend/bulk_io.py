@@ -0,0 +1,200 @@
+"""
+NDJSON bulk import and export of articles and breeds.
+
+Import reads the request body line by line, validates every line against
+the article or breed model and upserts the valid documents by id with
+unordered ``bulk_write`` batches. One batch is written while the next one
+is parsed, so memory stays at about two batches whatever the size of the
+upload. Export streams a cursor out as one JSON document per line.
+"""
+import asyncio
+import inspect
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Callable, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models import Article, Breed
+from serialization import dumps
+
+# Model the lines of each collection are validated against
+IMPORT_MODELS = {"articles": Article, "breeds": Breed}
+
+# Documents per bulk_write
+IMPORT_BATCH = 1000
+
+# Longer lines are rejected without being buffered
+MAX_LINE_BYTES = 1024 * 1024
+
+# Errors listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+# Export sends NDJSON in chunks of about this size
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+Line = Tuple[int, dict]
+
+
+class ImportReport:
+    """Counts of an import and the first MAX_REPORTED_ERRORS failed lines."""
+
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def fail(self, line: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+async def iter_lines(chunks: AsyncIterable[bytes],
+                     max_line: int = MAX_LINE_BYTES) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Numbered lines of a byte stream; None for a line longer than ``max_line``."""
+    buffer = bytearray()
+    number = 0
+    too_long = False
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            number += 1
+            yield number, None if too_long or end - start > max_line else bytes(buffer[start:end])
+            too_long = False
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line:
+            # Drop the rest of this line as it arrives instead of holding it
+            too_long = True
+            buffer.clear()
+    if buffer or too_long:
+        yield number + 1, None if too_long or len(buffer) > max_line else bytes(buffer)
+
+
+def _describe(error: ValueError) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+                         for detail in error.errors())
+    return str(error)
+
+
+def to_document(model, line: bytes, now: datetime) -> dict:
+    """Validate one NDJSON line; raises ValueError for bad JSON or fields.
+
+    Lines without an id create a new document, like the create routes.
+    """
+    data = orjson.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    if "date" in model.model_fields:
+        data.setdefault("date", now.strftime("%Y-%m-%d"))
+    return model.model_validate(data).model_dump()
+
+
+def _upsert(doc: dict, now: datetime) -> UpdateOne:
+    # Existing documents keep their created_at; every imported one counts as updated now
+    created_at = doc.pop("created_at")
+    doc["updated_at"] = now
+    return UpdateOne({"id": doc["id"]}, {"$set": doc, "$setOnInsert": {"created_at": created_at}}, upsert=True)
+
+
+async def _call(callback: Callable[[List[dict]], Any], docs: List[dict]) -> None:
+    result = callback(docs)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def _write(collection, batch: List[Line], now: datetime, report: ImportReport,
+                 before_batch: Optional[Callable[[List[dict]], Any]],
+                 on_batch: Optional[Callable[[List[dict]], Any]]) -> None:
+    failed = set()
+    if before_batch is not None:
+        await _call(before_batch, [doc for _, doc in batch])
+    try:
+        result = await collection.bulk_write([_upsert(doc, now) for _, doc in batch], ordered=False)
+        inserted, updated = result.upserted_count, result.matched_count
+    except BulkWriteError as error:
+        inserted, updated = error.details["nUpserted"], error.details["nMatched"]
+        for write_error in error.details["writeErrors"]:
+            failed.add(write_error["index"])
+            report.fail(batch[write_error["index"]][0], write_error["errmsg"])
+    report.inserted += inserted
+    report.updated += updated
+    if on_batch is not None:
+        await _call(on_batch, [doc for index, (_, doc) in enumerate(batch) if index not in failed])
+
+
+async def import_ndjson(collection, model, chunks: AsyncIterable[bytes], batch_size: int = IMPORT_BATCH,
+                        on_batch: Optional[Callable[[List[dict]], Any]] = None,
+                        before_batch: Optional[Callable[[List[dict]], Any]] = None) -> ImportReport:
+    """Upsert the valid lines of an NDJSON stream into ``collection`` by id.
+
+    ``before_batch`` and ``on_batch`` (functions or coroutine functions) are
+    called with the documents of each batch right before it is written and
+    once it is written, one batch at a time. Invalid lines are reported
+    and skipped; they don't stop the import. A later line for the same id
+    wins.
+    """
+    report = ImportReport()
+    now = datetime.utcnow()
+    batch: List[Line] = []
+    writing: Optional[asyncio.Future] = None
+    try:
+        async for number, line in iter_lines(chunks):
+            if line is None:
+                report.received += 1
+                report.fail(number, f"Line longer than {MAX_LINE_BYTES} bytes")
+                continue
+            if not line.strip():
+                continue
+            report.received += 1
+            try:
+                batch.append((number, to_document(model, line, now)))
+            except ValueError as error:
+                report.fail(number, _describe(error))
+                continue
+            if len(batch) >= batch_size:
+                # At most one batch in flight while the next one is parsed
+                if writing is not None:
+                    await writing
+                writing = asyncio.ensure_future(_write(collection, batch, now, report, before_batch, on_batch))
+                batch = []
+        if writing is not None:
+            await writing
+        if batch:
+            await _write(collection, batch, now, report, before_batch, on_batch)
+    finally:
+        if writing is not None and not writing.done():
+            writing.cancel()
+    return report
+
+
+async def aiter_ndjson(cursor, chunk_bytes: int = EXPORT_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """One JSON document per line, in chunks of about ``chunk_bytes``."""
+    buffer = bytearray()
+    async for doc in cursor:
+        buffer += dumps(doc)
+        buffer += b"\n"
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
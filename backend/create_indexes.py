@@ -7,6 +7,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 
+from view_rollups import HOURLY_RETENTION
+
 load_dotenv()
 
 async def create_indexes():
@@ -46,14 +48,75 @@ async def create_indexes():
     ], name='page_views_popular_index')
     print("✓ Created compound index on page_views for analytics")
     
+    # Page views lookup index (one document per page, used by batched $inc upserts)
+    await db.page_views.create_index([
+        ('page_type', 1),
+        ('page_id', 1)
+    ], name='page_views_page_index', unique=True)
+    print("✓ Created unique index on page_views page key")
+    
     # Articles category and date indexes
     await db.articles.create_index([('category', 1), ('date', -1)], name='articles_category_date_index')
     print("✓ Created compound index on articles for filtering")
     
+    # Unique id indexes for detail lookups
+    await db.articles.create_index([('id', 1)], name='articles_id_index', unique=True)
+    await db.breeds.create_index([('id', 1)], name='breeds_id_index', unique=True)
+    print("✓ Created unique id indexes on articles and breeds")
+    
+    # Covered (id, updated_at) lookups answer detail revalidations without reading the document
+    await db.articles.create_index([('id', 1), ('updated_at', 1)], name='articles_id_updated_at_index')
+    await db.breeds.create_index([('id', 1), ('updated_at', 1)], name='breeds_id_updated_at_index')
+    print("✓ Created version lookup indexes on articles and breeds")
+    
+    # One rating document per article (lets concurrent rating upserts retry safely)
+    await db.article_ratings.create_index([('article_id', 1)], name='article_ratings_article_index', unique=True)
+    print("✓ Created unique index on article_ratings.article_id")
+    
+    # Keyset pagination indexes: the sort key plus id as a unique tie-breaker,
+    # so /api/articles and /api/breeds can seek straight to a cursor
+    await db.articles.create_index([('category', 1), ('date', -1), ('id', -1)], name='articles_category_date_id_index')
+    await db.articles.create_index([('date', -1), ('id', -1)], name='articles_date_id_index')
+    await db.breeds.create_index([('name', 1), ('id', 1)], name='breeds_name_id_index')
+    await db.breeds.create_index([('species', 1), ('name', 1), ('id', 1)], name='breeds_species_name_id_index')
+    print("✓ Created keyset pagination indexes on articles and breeds")
+    
+    # HTML sitemap walks articles by category and title
+    await db.articles.create_index([('category', 1), ('title', 1)], name='articles_category_title_index')
+    print("✓ Created HTML sitemap index on articles")
+    
+    # Newest updated_at per collection: sitemap Last-Modified and cache fingerprint
+    await db.articles.create_index([('updated_at', -1)], name='articles_updated_at_index')
+    await db.breeds.create_index([('updated_at', -1)], name='breeds_updated_at_index')
+    print("✓ Created updated_at indexes on articles and breeds")
+    
     # Breeds species index
     await db.breeds.create_index([('species', 1)], name='breeds_species_index')
     print("✓ Created index on breeds.species field")
     
+    # Image references, one document per stored image
+    await db.upload_refs.create_index([('id', 1)], name='upload_refs_id_index', unique=True)
+    print("✓ Created unique index on upload_refs.id")
+    
+    # View buckets: one document per page and hour/day; hourly ones expire (see view_rollups.py)
+    await db.view_buckets_hourly.create_index([
+        ('page_type', 1),
+        ('page_id', 1),
+        ('hour', 1)
+    ], name='view_buckets_hourly_page_index', unique=True)
+    await db.view_buckets_hourly.create_index(
+        [('hour', 1)], name='view_buckets_hourly_ttl_index',
+        expireAfterSeconds=int(HOURLY_RETENTION.total_seconds())
+    )
+    # Also the key the daily rollup $merges on
+    await db.view_buckets_daily.create_index([
+        ('page_type', 1),
+        ('page_id', 1),
+        ('day', 1)
+    ], name='view_buckets_daily_page_index', unique=True)
+    await db.view_buckets_daily.create_index([('page_type', 1), ('day', 1)], name='view_buckets_daily_trending_index')
+    print("✓ Created view bucket indexes and hourly TTL")
+    
     print("\n✅ All indexes created successfully!")
     print("\nNote: The text indexes will significantly improve search performance.")
     print("You can now use $text search queries instead of $regex for better performance.")
@@ -0,0 +1,134 @@
+"""
+HTTP validators: ETag and Last-Modified headers, and 304 answers to
+conditional GETs (If-None-Match / If-Modified-Since).
+
+ETags come either from a hash of the body or, so a 304 can be answered
+before reading and serializing a document, from values that change with
+it: its updated_at, or a collection's version stamp plus the query.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+
+def strong_etag(body: bytes) -> str:
+    """Strong ETag from a hash of the response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def version_etag(*parts) -> str:
+    """Strong ETag from values that change whenever the response does."""
+    key = "\x1f".join(part.isoformat() if isinstance(part, datetime) else str(part) for part in parts)
+    return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _utc(moment: datetime) -> datetime:
+    # MongoDB returns naive datetimes that are already UTC
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def http_date(moment: datetime) -> str:
+    return format_datetime(_utc(moment).replace(microsecond=0), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in candidates)
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime] = None) -> bool:
+    """Whether the client's cached copy is still current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored when If-None-Match is present
+        return etag is not None and _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _utc(last_modified).replace(microsecond=0) <= _utc(since)
+    return False
+
+
+def validator_headers(etag: Optional[str], last_modified: Optional[datetime] = None,
+                      cache_control: Optional[str] = None) -> Dict[str, str]:
+    headers = {"Cache-Control": cache_control} if cache_control else {}
+    if etag is not None:
+        headers["ETag"] = etag
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(etag: Optional[str], last_modified: Optional[datetime] = None,
+                 cache_control: Optional[str] = None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified, cache_control))
+
+
+class CollectionVersions:
+    """Version stamps for whole collections, for list ETags.
+
+    A stamp is the document count plus the newest ``updated_at``, so any
+    insert, update or delete made through the API changes it. Stamps are
+    kept until the write handlers call ``invalidate()``, or for ``ttl``
+    seconds so writes made by other workers show up eventually.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._stamps: Dict[str, Tuple[float, str, Optional[datetime]]] = {}
+        self._invalidations: Dict[str, int] = {}
+
+    async def get(self, collection) -> Tuple[str, Optional[datetime]]:
+        """Return ``(version, newest updated_at)`` for a collection."""
+        name = collection.name
+        stamp = self._stamps.get(name)
+        if stamp is not None and time.monotonic() - stamp[0] < self.ttl:
+            return stamp[1], stamp[2]
+
+        invalidations = self._invalidations.get(name, 0)
+        count = await collection.estimated_document_count()
+        newest = await collection.find_one({}, {"_id": 0, "updated_at": 1}, sort=[("updated_at", -1)])
+        updated_at = newest.get("updated_at") if newest else None
+        if not isinstance(updated_at, datetime):
+            updated_at = None
+        version = f"{count}:{updated_at.isoformat() if updated_at else ''}"
+        # Don't keep a stamp read while a write was invalidating it
+        if invalidations == self._invalidations.get(name, 0):
+            self._stamps[name] = (time.monotonic(), version, updated_at)
+        return version, updated_at
+
+    def invalidate(self, collection_name: str) -> None:
+        self._invalidations[collection_name] = self._invalidations.get(collection_name, 0) + 1
+        self._stamps.pop(collection_name, None)
+
+
+# Uploaded files never change under the same name, so browsers may keep them
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles whose responses may be cached for a year without revalidation."""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
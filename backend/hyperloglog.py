@@ -0,0 +1,60 @@
+"""
+HyperLogLog sketch for approximate distinct counts.
+
+``2 ** precision`` one-byte registers each keep the longest run of leading
+zero bits seen among the 64-bit hashes routed to them. The default
+precision of 12 takes 4 KiB and has a standard error of about 1.6%
+(``1.04 / sqrt(4096)``). Sketches merge by taking the register-wise
+maximum, which gives exactly the sketch of the union, so sketches kept in
+different places can be combined in any order and more than once.
+"""
+import math
+from typing import Optional
+
+PRECISION = 12
+HASH_BITS = 64
+
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(HASH_BITS + 1)]
+
+
+class HyperLogLog:
+    """Approximate count of distinct 64-bit hashes."""
+
+    def __init__(self, precision: int = PRECISION, registers: Optional[bytes] = None):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(1 << precision)
+        if len(self.registers) != 1 << precision:
+            raise ValueError("register count does not match the precision")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        precision = len(data).bit_length() - 1
+        return cls(precision, data)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    def add(self, hashed: int) -> None:
+        """Add a uniformly distributed 64-bit hash."""
+        suffix_bits = HASH_BITS - self.precision
+        index = hashed >> suffix_bits
+        rank = suffix_bits - (hashed & ((1 << suffix_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(map(_INVERSE_POWERS.__getitem__, self.registers))
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
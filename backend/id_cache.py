@@ -0,0 +1,45 @@
+"""
+In-memory set of document ids used for cheap existence checks.
+
+The set is loaded once at startup and kept current by the create/delete
+handlers. An id that is not in the set is confirmed with a single lookup
+before being rejected, so documents written by another worker are still
+found.
+"""
+from typing import Set
+
+
+class IdCache:
+    """Cached set of the ``id`` field of a collection."""
+
+    def __init__(self, collection, field: str = "id"):
+        self.collection = collection
+        self.field = field
+        self._ids: Set[str] = set()
+
+    async def load(self) -> None:
+        """Read every id from the collection."""
+        cursor = self.collection.find({}, {"_id": 0, self.field: 1})
+        self._ids = {doc[self.field] async for doc in cursor if self.field in doc}
+
+    async def exists(self, doc_id: str) -> bool:
+        """Return True if a document with this id exists."""
+        if doc_id in self._ids:
+            return True
+        doc = await self.collection.find_one({self.field: doc_id}, {"_id": 0, self.field: 1})
+        if doc:
+            self._ids.add(doc_id)
+            return True
+        return False
+
+    def add(self, doc_id: str) -> None:
+        self._ids.add(doc_id)
+
+    def discard(self, doc_id: str) -> None:
+        self._ids.discard(doc_id)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
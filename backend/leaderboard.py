@@ -0,0 +1,167 @@
+"""
+Materialized leaderboard of the most viewed articles and breeds.
+
+One aggregation over ``page_views`` builds it: a ``$facet`` per page type
+sorts by views, and ``$lookup``s add the title, image and (for articles)
+rating of each page. The result is stored as one document in
+``leaderboards``, so /api/analytics/popular reads a single small document.
+
+After every page view flush only the pages just viewed are run through the
+same pipeline. Views only grow, so merging those entries into the stored
+board and keeping the top ones gives the same board as a full rebuild. A
+full rebuild every ``rebuild_interval`` picks up renamed or deleted pages
+and changed ratings.
+
+The ``$lookup``s use localField/foreignField together with a pipeline,
+which needs MongoDB 5.0 or later.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from batch import fetch_by_ids
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_ID = "popular"
+LEADERBOARD_SIZE = 10
+
+# Page type -> (facet name, content collection, fields shown on the board)
+BOARD_CONTENT = {
+    "article": ("articles", "articles", ("title", "category", "image_url", "image_derivatives")),
+    "breed": ("breeds", "breeds", ("name", "species", "image_url", "image_derivatives")),
+}
+
+
+def popular_pipeline(limit: int = LEADERBOARD_SIZE, only: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+    """The ``limit`` most viewed pages of each type with their content, in one aggregation.
+
+    ``only`` restricts the ranking to the given page ids of each type.
+    Pages whose article or breed no longer exists are left out.
+    """
+    facets = {}
+    for page_type, (facet, collection, fields) in BOARD_CONTENT.items():
+        match = {"page_type": page_type}
+        if only is not None:
+            match["page_id"] = {"$in": only.get(page_type, [])}
+        stages = [
+            {"$match": match},
+            {"$sort": {"views": -1, "page_id": 1}},
+            # Room for pages whose content was deleted
+            {"$limit": limit * 2},
+            {"$lookup": {
+                "from": collection, "localField": "page_id", "foreignField": "id",
+                "pipeline": [{"$project": {"_id": 0, **{field: 1 for field in fields}}}],
+                "as": "content",
+            }},
+            {"$match": {"content.0": {"$exists": True}}},
+            {"$limit": limit},
+        ]
+        merged = [{"$first": "$content"}, {"page_id": "$page_id", "views": "$views"}]
+        if page_type == "article":
+            stages.append({"$lookup": {
+                "from": "article_ratings", "localField": "page_id", "foreignField": "article_id",
+                "pipeline": [{"$project": {"_id": 0, "average_rating": 1, "total_ratings": 1}}],
+                "as": "rating",
+            }})
+            merged = [{"average_rating": 0.0, "total_ratings": 0}, {"$first": "$rating"}, *merged]
+        stages.append({"$replaceWith": {"$mergeObjects": merged}})
+        facets[facet] = stages
+
+    types = list(BOARD_CONTENT) if only is None else [page_type for page_type, ids in only.items() if ids]
+    return [{"$match": {"page_type": {"$in": types}}}, {"$facet": facets}]
+
+
+async def with_content(db, page_type: str, entries: List[dict], limit: int) -> List[dict]:
+    """The first ``limit`` ranked ``entries`` (with a ``page_id``) whose page still exists, with its content."""
+    _, collection, fields = BOARD_CONTENT[page_type]
+    docs, _ = await fetch_by_ids(
+        db[collection], [entry["page_id"] for entry in entries], {"_id": 0, **{field: 1 for field in fields}}
+    )
+    content = {doc["id"]: doc for doc in docs}
+    return [
+        {**{field: content[entry["page_id"]].get(field) for field in fields}, **entry}
+        for entry in entries if entry["page_id"] in content
+    ][:limit]
+
+
+def merge_entries(board: List[dict], fresh: List[dict], limit: int = LEADERBOARD_SIZE) -> List[dict]:
+    """Top ``limit`` of ``board`` updated with ``fresh`` entries for the same or new pages."""
+    entries = {entry["page_id"]: entry for entry in board}
+    entries.update((entry["page_id"], entry) for entry in fresh)
+    return sorted(entries.values(), key=lambda entry: (-entry["views"], entry["page_id"]))[:limit]
+
+
+class Leaderboard:
+    """The stored leaderboard, kept current from page view flushes."""
+
+    def __init__(self, db, limit: int = LEADERBOARD_SIZE, rebuild_interval: float = 600.0):
+        self.db = db
+        self.limit = limit
+        self.rebuild_interval = rebuild_interval
+        self._task = None
+        # Serializes read-merge-write updates of the document in this process
+        self._lock = asyncio.Lock()
+
+    async def _aggregate(self, only: Optional[Dict[str, List[str]]] = None) -> dict:
+        cursor = self.db.page_views.aggregate(popular_pipeline(self.limit, only))
+        results = await cursor.to_list(1)
+        return results[0] if results else {}
+
+    async def _store(self, board: dict) -> dict:
+        board = {facet: board.get(facet, []) for facet, _, _ in BOARD_CONTENT.values()}
+        board["updated_at"] = datetime.utcnow()
+        await self.db.leaderboards.replace_one({"_id": LEADERBOARD_ID}, board, upsert=True)
+        return board
+
+    async def read(self) -> dict:
+        """The stored leaderboard, built first if there is none yet."""
+        board = await self.db.leaderboards.find_one({"_id": LEADERBOARD_ID}, {"_id": 0})
+        return board if board is not None else await self.rebuild()
+
+    async def rebuild(self) -> dict:
+        """Rank every page from scratch."""
+        async with self._lock:
+            return await self._store(await self._aggregate())
+
+    async def add_views(self, increments: Dict[Tuple[str, str], int]) -> None:
+        """View counter flush listener: re-rank the pages just viewed."""
+        only: Dict[str, List[str]] = {}
+        for page_type, page_id in increments:
+            if page_type in BOARD_CONTENT:
+                only.setdefault(page_type, []).append(page_id)
+        if not only:
+            return
+        async with self._lock:
+            stored = await self.db.leaderboards.find_one({"_id": LEADERBOARD_ID}, {"_id": 0})
+            if stored is None:
+                await self._store(await self._aggregate())
+                return
+            fresh = await self._aggregate(only)
+            await self._store({
+                facet: merge_entries(stored.get(facet, []), fresh.get(facet, []), self.limit)
+                for facet, _, _ in BOARD_CONTENT.values()
+            })
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Failed to rebuild the leaderboard")
+            await asyncio.sleep(self.rebuild_interval)
+
+    def start(self) -> None:
+        """Build the leaderboard now and rebuild it periodically."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -28,6 +28,13 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
 
+# Image Models
+class ImageDerivative(BaseModel):
+    """A resized WebP copy of an uploaded image, for srcset."""
+    width: int
+    height: int
+    url: str
+
 # Article Models
 class Article(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -39,6 +46,7 @@ class Article(BaseModel):
     date: str
     readTime: str
     image_url: Optional[str] = None
+    image_derivatives: Optional[List[ImageDerivative]] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -50,6 +58,7 @@ class ArticleCreate(BaseModel):
     author: str
     readTime: str
     image_url: Optional[str] = None
+    image_derivatives: Optional[List[ImageDerivative]] = None
 
 class ArticleUpdate(BaseModel):
     title: Optional[str] = None
@@ -59,6 +68,7 @@ class ArticleUpdate(BaseModel):
     author: Optional[str] = None
     readTime: Optional[str] = None
     image_url: Optional[str] = None
+    image_derivatives: Optional[List[ImageDerivative]] = None
 
 # Breed Models
 class CareRequirements(BaseModel):
@@ -81,6 +91,7 @@ class Breed(BaseModel):
     healthInfo: str
     idealFor: str
     image_url: Optional[str] = None
+    image_derivatives: Optional[List[ImageDerivative]] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -97,6 +108,7 @@ class BreedCreate(BaseModel):
     healthInfo: str
     idealFor: str
     image_url: Optional[str] = None
+    image_derivatives: Optional[List[ImageDerivative]] = None
 
 class BreedUpdate(BaseModel):
     name: Optional[str] = None
@@ -111,3 +123,4 @@ class BreedUpdate(BaseModel):
     healthInfo: Optional[str] = None
     idealFor: Optional[str] = None
     image_url: Optional[str] = None
+    image_derivatives: Optional[List[ImageDerivative]] = None
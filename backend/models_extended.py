@@ -9,6 +9,8 @@ class ArticleRating(BaseModel):
     total_ratings: int = 0
     total_score: int = 0
     average_rating: float = 0.0
+    # Number of ratings per star, keyed "1".."5"
+    distribution: Dict[str, int] = Field(default_factory=lambda: {str(star): 0 for star in range(1, 6)})
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class RatingSubmit(BaseModel):
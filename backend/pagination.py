@@ -0,0 +1,124 @@
+"""
+Pagination helpers for list endpoints.
+
+Keyset (cursor) pagination continues from the sort key of the last item on
+the previous page, so every page costs the same no matter how deep it is.
+Cursors are opaque to clients: URL-safe base64 of the JSON-encoded key.
+"""
+import base64
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+# Deepest offset served in page-number mode; deeper pages must use a cursor
+MAX_SKIP = 1000
+
+SortSpec = Sequence[Tuple[str, int]]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode a sort key as an opaque cursor string."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _is_key_value(value: Any) -> bool:
+    # Strings (ids, names, ISO dates) and numbers only; objects could smuggle in query operators
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor produced by encode_cursor, checking its length and value types."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size or not all(map(_is_key_value, values)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+
+def keyset_filter(sort: SortSpec, values: Sequence[Any]) -> dict:
+    """Build the query matching documents that sort strictly after ``values``."""
+    branches = []
+    for position, (field, direction) in enumerate(sort):
+        branch = {prev_field: values[i] for i, (prev_field, _) in enumerate(sort[:position])}
+        branch[field] = {"$lt" if direction < 0 else "$gt": values[position]}
+        branches.append(branch)
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+
+def apply_cursor(query: dict, sort: SortSpec, cursor: str) -> dict:
+    """Restrict ``query`` to the documents after ``cursor``."""
+    after = keyset_filter(sort, decode_cursor(cursor, len(sort)))
+    return {"$and": [query, after]} if query else after
+
+
+def check_skip(page: int, limit: int) -> int:
+    """Return the offset for a page number, rejecting pages past MAX_SKIP."""
+    skip = (page - 1) * limit
+    if skip > MAX_SKIP:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Page too deep for page-number pagination; use the cursor parameter"
+        )
+    return skip
+
+
+def next_cursor(items: List[dict], sort: SortSpec, limit: int) -> Optional[str]:
+    """Trim the look-ahead item and return the cursor for the following page.
+
+    ``items`` must have been fetched with ``limit + 1``.
+    """
+    if len(items) <= limit:
+        return None
+    del items[limit:]
+    return encode_cursor([items[-1].get(field) for field, _ in sort])
+
+
+class CountCache:
+    """Totals for list filters, kept until a write to the collection.
+
+    Unfiltered totals come from ``estimated_document_count`` (collection
+    metadata) instead of counting documents. Entries also expire after
+    ``ttl`` seconds so writes made by other workers show up eventually.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, int]]" = OrderedDict()
+
+    async def count(self, collection, query: Dict[str, Any]) -> int:
+        """Return the number of documents matching ``query``."""
+        key = (collection.name, json.dumps(query, sort_keys=True, default=str))
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        if query:
+            total = await collection.count_documents(query)
+        else:
+            total = await collection.estimated_document_count()
+
+        self._entries[key] = (time.monotonic(), total)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return total
+
+    def invalidate(self, collection_name: str) -> None:
+        """Forget every cached total for a collection."""
+        for key in [key for key in self._entries if key[0] == collection_name]:
+            del self._entries[key]
@@ -0,0 +1,40 @@
+"""
+Field selection for list endpoints.
+
+List routes return a summary of each document unless ``fields`` asks for
+more (or less). The selection becomes a MongoDB projection, so unused
+fields such as article ``content`` never leave the database.
+"""
+from typing import Dict, Iterable, Optional, Sequence
+
+from fastapi import HTTPException
+
+# fields=all returns whole documents
+ALL_FIELDS = "all"
+
+
+def list_projection(fields: Optional[str], allowed: Iterable[str], summary: Sequence[str],
+                    required: Sequence[str] = ("id",)) -> Dict[str, int]:
+    """Projection for a comma-separated ``fields`` list, or ``summary`` when it is not given.
+
+    ``required`` fields (the id and the sort keys the cursor is built from)
+    are always included. Dotted paths select part of an allowed field.
+    """
+    if fields is not None and fields.strip() == ALL_FIELDS:
+        return {"_id": 0}
+
+    if fields is None:
+        selected = list(summary)
+    else:
+        selected = [field.strip() for field in fields.split(",") if field.strip()]
+        allowed = set(allowed)
+        unknown = sorted(field for field in selected if field.split(".", 1)[0] not in allowed)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    projection = {"_id": 0}
+    for field in [*required, *selected]:
+        # MongoDB rejects a path together with one of its sub-paths
+        if not any(field.startswith(f"{other}.") for other in selected if other != field):
+            projection[field] = 1
+    return projection
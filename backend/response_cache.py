@@ -0,0 +1,108 @@
+"""
+Serialized responses for detail endpoints, bounded by bytes.
+
+Entries are the JSON bodies exactly as sent, with their validators, so a
+hit skips MongoDB and serialization alike. The least recently used entries
+are evicted once the cached bodies exceed the byte budget, and entries
+expire after ``ttl`` seconds so writes made by other workers show up
+eventually.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "last_modified")
+
+    def __init__(self, body: bytes, etag: Optional[str] = None, last_modified: Optional[datetime] = None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class ResponseCache:
+    """LRU + TTL cache of response bodies with byte accounting."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 300.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, CachedResponse]]" = OrderedDict()
+        self._bytes = 0
+        # Bumped by every invalidation, see token()
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        """Return the cached response for ``key``, or None."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._drop(key)
+        self.misses += 1
+        return None
+
+    def token(self) -> int:
+        """Take before reading from the database; pass to put()."""
+        return self._invalidations
+
+    def put(self, key: Hashable, response: CachedResponse, token: Optional[int] = None) -> None:
+        """Cache ``response``, unless something was invalidated since ``token`` was taken.
+
+        That keeps a read that raced with a write from caching the old document.
+        """
+        if token is not None and token != self._invalidations:
+            return
+        if len(response.body) > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (time.monotonic(), response)
+        self._bytes += len(response.body)
+        self._evict()
+
+    def invalidate(self, key: Hashable) -> None:
+        self._invalidations += 1
+        self._drop(key)
+
+    def clear(self) -> None:
+        self._invalidations += 1
+        self._entries.clear()
+        self._bytes = 0
+
+    def set_budget(self, max_bytes: int) -> None:
+        """Change the memory budget, evicting entries that no longer fit."""
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1].body)
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes:
+            _, (_, response) = self._entries.popitem(last=False)
+            self._bytes -= len(response.body)
+            self.evictions += 1
@@ -0,0 +1,90 @@
+"""
+Full-text search over articles and breeds using MongoDB text indexes.
+
+Both collections are queried with ``$text`` (``articles_text_search`` and
+``breeds_text_search`` from create_indexes.py), ranked by ``textScore``
+and merged into one list. The paging cursor records how many results of
+each type have been consumed, so the next page continues both rankings
+exactly where the merge stopped.
+"""
+import asyncio
+from typing import List, Optional, Sequence, Tuple
+
+from models_extended import SearchResult
+
+SEARCH_TYPES = ("article", "breed")
+SNIPPET_LENGTH = 150
+
+_SCORE = {"$meta": "textScore"}
+
+# collection, title field, excerpt field
+_SOURCES = {
+    "article": ("articles", "title", "excerpt"),
+    "breed": ("breeds", "name", "idealFor"),
+}
+
+
+def snippet(text: Optional[str], length: int = SNIPPET_LENGTH) -> str:
+    """Shorten text for a result card."""
+    text = text or ""
+    return text[:length] + "..." if len(text) > length else text
+
+
+async def _search_type(db, result_type: str, q: str, skip: int, limit: int) -> List[SearchResult]:
+    collection, title_field, excerpt_field = _SOURCES[result_type]
+    docs = await db[collection].find(
+        {"$text": {"$search": q}},
+        {"_id": 0, "id": 1, title_field: 1, excerpt_field: 1, "score": _SCORE}
+    ).sort([("score", _SCORE), ("id", 1)]).skip(skip).limit(limit).to_list(limit)
+    return [
+        SearchResult(
+            type=result_type,
+            id=doc["id"],
+            title=doc.get(title_field, ""),
+            excerpt=snippet(doc.get(excerpt_field)),
+            relevance=round(doc["score"], 4)
+        )
+        for doc in docs
+    ]
+
+
+async def text_search(db, q: str, types: Sequence[str] = SEARCH_TYPES, limit: int = 10,
+                      offsets: Sequence[int] = (0, 0)) -> Tuple[List[SearchResult], Optional[List[int]]]:
+    """Return one page of merged results and the offsets for the next page.
+
+    ``offsets`` holds the number of article and breed results already
+    returned; the second item of the return value is None on the last page.
+    """
+    # One extra result per type tells whether anything is left after this page
+    ranked = await asyncio.gather(*(
+        _search_type(db, result_type, q, offset, limit + 1) if result_type in types else _nothing()
+        for result_type, offset in zip(SEARCH_TYPES, offsets)
+    ))
+
+    return merge_ranked(ranked, limit, offsets)
+
+
+def merge_ranked(ranked: Sequence[List[SearchResult]], limit: int,
+                 offsets: Sequence[int]) -> Tuple[List[SearchResult], Optional[List[int]]]:
+    """Merge per-type rankings (each already past its offset) into one page."""
+    page: List[SearchResult] = []
+    positions = [0] * len(ranked)
+    while len(page) < limit:
+        best = None
+        for index, results in enumerate(ranked):
+            if positions[index] < len(results) and (
+                best is None or results[positions[index]].relevance > ranked[best][positions[best]].relevance
+            ):
+                best = index
+        if best is None:
+            break
+        page.append(ranked[best][positions[best]])
+        positions[best] += 1
+
+    has_more = any(positions[index] < len(results) for index, results in enumerate(ranked))
+    next_offsets = [offset + used for offset, used in zip(offsets, positions)] if has_more else None
+    return page, next_offsets
+
+
+async def _nothing() -> List[SearchResult]:
+    return []
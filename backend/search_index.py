@@ -0,0 +1,291 @@
+"""
+In-process BM25 search index over articles and breeds.
+
+Built from MongoDB at startup and kept current by the article/breed write
+handlers, so /api/search can answer without a database round trip when
+``SEARCH_ENGINE=memory``. Posting lists are parallel ``array`` objects
+(document numbers and weighted term frequencies) rather than Python lists.
+
+Updates never rewrite posting lists: a changed or deleted document is
+marked dead and skipped at query time, and ``compact()`` drops dead
+entries once they make up a quarter of the index. Document frequencies
+include dead entries until then, which nudges IDF slightly but keeps
+updates O(document length).
+
+Run ``python search_index.py`` to build the index from MongoDB and print
+its statistics.
+"""
+import asyncio
+import heapq
+import html
+import math
+import re
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models_extended import SearchResult
+from search import SEARCH_TYPES, merge_ranked, snippet
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Term frequency weight per field: a title match counts more than a body match
+ARTICLE_FIELDS = {"title": 3.0, "excerpt": 1.5, "content": 1.0}
+BREED_FIELDS = {"name": 3.0, "temperament": 1.5, "origin": 1.0, "idealFor": 1.0}
+
+# Compact once this share of indexed documents is dead
+COMPACT_RATIO = 0.25
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the
+their this to was were will with your you
+""".split())
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"\w+")
+
+DocKey = Tuple[str, str]  # (type, id)
+
+
+def strip_html(text: str) -> str:
+    """Remove tags and decode entities."""
+    return html.unescape(_TAG_RE.sub(" ", text))
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase index terms."""
+    return [token for token in _TOKEN_RE.findall(text.lower())
+            if len(token) > 1 and token not in STOPWORDS]
+
+
+def _field_text(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return str(value) if value is not None else ""
+
+
+class SearchIndex:
+    """BM25-ranked inverted index with incremental updates."""
+
+    def __init__(self):
+        self._reset()
+        # Writes that arrive while rebuild() reads MongoDB, replayed afterwards
+        self._journal: Optional[list] = None
+
+    def _reset(self) -> None:
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_keys: List[Optional[DocKey]] = []
+        self._doc_lengths = array("f")
+        self._doc_titles: List[str] = []
+        self._doc_excerpts: List[str] = []
+        self._docs: Dict[DocKey, int] = {}
+        self._total_length = 0.0
+        self._dead = 0
+        # Per-document BM25 length normalisation, recomputed after writes
+        self._norms: Optional[array] = None
+
+    # ----- updates -----
+
+    def add_article(self, article: dict) -> None:
+        """Index or re-index an article document."""
+        fields = {field: strip_html(article.get(field) or "") if field == "content" else _field_text(article.get(field))
+                  for field in ARTICLE_FIELDS}
+        self._add(("article", article["id"]), fields, ARTICLE_FIELDS,
+                  article.get("title", ""), snippet(article.get("excerpt")))
+
+    def add_breed(self, breed: dict) -> None:
+        """Index or re-index a breed document."""
+        fields = {field: _field_text(breed.get(field)) for field in BREED_FIELDS}
+        self._add(("breed", breed["id"]), fields, BREED_FIELDS,
+                  breed.get("name", ""), snippet(breed.get("idealFor")))
+
+    def remove(self, doc_type: str, doc_id: str) -> None:
+        """Drop a document from the index."""
+        if self._journal is not None:
+            self._journal.append(("remove", (doc_type, doc_id)))
+        self._kill((doc_type, doc_id))
+        self._maybe_compact()
+
+    def _add(self, key: DocKey, fields: Dict[str, str], weights: Dict[str, float],
+             title: str, excerpt: str) -> None:
+        if self._journal is not None:
+            self._journal.append(("add", (key, fields, weights, title, excerpt)))
+        self._kill(key)
+
+        frequencies: Dict[str, float] = {}
+        for field, text in fields.items():
+            weight = weights[field]
+            for term in tokenize(text):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+
+        doc = len(self._doc_keys)
+        length = sum(frequencies.values())
+        self._doc_keys.append(key)
+        self._doc_lengths.append(length)
+        self._doc_titles.append(title)
+        self._doc_excerpts.append(excerpt)
+        self._docs[key] = doc
+        self._total_length += length
+        self._norms = None
+
+        for term, frequency in frequencies.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = (array("I"), array("f"))
+            posting[0].append(doc)
+            posting[1].append(frequency)
+        self._maybe_compact()
+
+    def _kill(self, key: DocKey) -> None:
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        self._doc_keys[doc] = None
+        self._doc_titles[doc] = self._doc_excerpts[doc] = ""
+        self._total_length -= self._doc_lengths[doc]
+        self._dead += 1
+        self._norms = None
+
+    def _maybe_compact(self) -> None:
+        if self._dead > 1000 and self._dead > COMPACT_RATIO * len(self._doc_keys):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite posting lists without dead documents."""
+        remap = array("i", [-1]) * len(self._doc_keys)
+        keys, lengths, titles, excerpts = [], array("f"), [], []
+        for doc, key in enumerate(self._doc_keys):
+            if key is not None:
+                remap[doc] = len(keys)
+                keys.append(key)
+                lengths.append(self._doc_lengths[doc])
+                titles.append(self._doc_titles[doc])
+                excerpts.append(self._doc_excerpts[doc])
+
+        postings = {}
+        for term, (docs, frequencies) in self._postings.items():
+            new_docs, new_frequencies = array("I"), array("f")
+            for doc, frequency in zip(docs, frequencies):
+                if remap[doc] >= 0:
+                    new_docs.append(remap[doc])
+                    new_frequencies.append(frequency)
+            if new_docs:
+                postings[term] = (new_docs, new_frequencies)
+
+        self._postings = postings
+        self._doc_keys, self._doc_lengths = keys, lengths
+        self._doc_titles, self._doc_excerpts = titles, excerpts
+        self._docs = {key: doc for doc, key in enumerate(keys)}
+        self._dead = 0
+        self._norms = None
+
+    # ----- building -----
+
+    async def rebuild(self, db) -> None:
+        """Reload every article and breed from MongoDB."""
+        self._journal = []
+        try:
+            fresh = SearchIndex()
+            async for article in db.articles.find({}, {"_id": 0, "id": 1, "title": 1, **{f: 1 for f in ARTICLE_FIELDS}}):
+                fresh.add_article(article)
+            async for breed in db.breeds.find({}, {"_id": 0, "id": 1, **{f: 1 for f in BREED_FIELDS}}):
+                fresh.add_breed(breed)
+            # Apply writes that happened while reading, then take over the new state
+            for operation, args in self._journal:
+                if operation == "add":
+                    fresh._add(*args)
+                else:
+                    fresh._kill(args)
+            fresh.compact()
+            self.__dict__.update({name: value for name, value in fresh.__dict__.items() if name != "_journal"})
+        finally:
+            self._journal = None
+
+    # ----- queries -----
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._docs),
+            "dead_documents": self._dead,
+            "terms": len(self._postings),
+            "postings": sum(len(docs) for docs, _ in self._postings.values()),
+        }
+
+    def _length_norms(self) -> array:
+        if self._norms is None:
+            average_length = self._total_length / max(len(self._docs), 1) or 1.0
+            self._norms = array("f", (K1 * (1.0 - B + B * length / average_length) for length in self._doc_lengths))
+        return self._norms
+
+    def score(self, q: str) -> Dict[int, float]:
+        """Return BM25 scores of every matching live document."""
+        live = len(self._docs)
+        if not live:
+            return {}
+        norms = self._length_norms()
+        scores: Dict[int, float] = {}
+        get = scores.get
+
+        for term in set(tokenize(q)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            docs, frequencies = posting
+            df = len(docs)
+            weight = math.log(1.0 + (max(live - df, 0) + 0.5) / (df + 0.5)) * (K1 + 1.0)
+            for doc, frequency in zip(docs, frequencies):
+                scores[doc] = get(doc, 0.0) + weight * frequency / (frequency + norms[doc])
+        return scores
+
+    def search(self, q: str, types: Sequence[str] = SEARCH_TYPES, limit: int = 10,
+               offsets: Sequence[int] = (0, 0)) -> Tuple[List[SearchResult], Optional[List[int]]]:
+        """Same contract as search.text_search, answered from memory."""
+        scores = self.score(q)
+        keys = self._doc_keys
+        by_type: Dict[str, List[Tuple[float, int]]] = {result_type: [] for result_type in types}
+        for doc, doc_score in scores.items():
+            key = keys[doc]
+            if key is not None and key[0] in by_type:
+                by_type[key[0]].append((doc_score, doc))
+
+        ranked = []
+        for result_type, offset in zip(SEARCH_TYPES, offsets):
+            candidates = by_type.get(result_type, [])
+            top = heapq.nlargest(offset + limit + 1, candidates, key=lambda item: (item[0], -item[1]))
+            ranked.append([
+                SearchResult(
+                    type=result_type,
+                    id=keys[doc][1],
+                    title=self._doc_titles[doc],
+                    excerpt=self._doc_excerpts[doc],
+                    relevance=round(doc_score, 4)
+                )
+                for doc_score, doc in top[offset:]
+            ])
+        return merge_ranked(ranked, limit, offsets)
+
+
+async def _main() -> None:
+    import os
+    import time
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv()
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    print("Building in-memory search index...")
+    start = time.perf_counter()
+    index = SearchIndex()
+    await index.rebuild(db)
+    print(f"✓ Indexed {len(index)} documents in {time.perf_counter() - start:.2f}s: {index.stats()}")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
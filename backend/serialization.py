@@ -0,0 +1,37 @@
+"""
+Fast JSON for API responses, backed by orjson.
+
+orjson serializes dicts, lists, datetimes and UUIDs natively, so MongoDB
+documents go straight to bytes without FastAPI's ``jsonable_encoder`` walk.
+Routes that return a ``Response`` themselves skip that walk entirely; bytes
+handed to ``ORJSONResponse`` (cached payloads) are sent as they are.
+"""
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    # Types orjson doesn't know natively (Pydantic models, ObjectId, Decimal, ...)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return jsonable_encoder(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize ``content`` to JSON bytes."""
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson; ``bytes`` content is sent unchanged."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -1,21 +1,52 @@
 # ИМПОРТЫ
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 import os
+import re
+import asyncio
+import gzip
 import logging
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 
 # Импортируем только то, что нужно для публичных роутов:
 from models import Article, ArticleCreate, ArticleUpdate, Breed, BreedCreate, BreedUpdate
 from models_extended import ArticleRating, RatingSubmit, PageView, SEOSettings, SEOSettingsUpdate, PageMeta, PageMetaCreate, PageMetaUpdate, SearchResult
-from utils.file_upload import save_upload_file, delete_file # Безопасный импорт
-from sitemap_generator import generate_xml_sitemap, generate_html_sitemap
+from utils.file_upload import UPLOADS_DIR, save_upload_file, delete_file
+from utils.image_derivatives import check_pillow, shutdown_pool as shutdown_image_pool
+from sitemap_generator import (
+    HTML_SITEMAP_PAGE_SIZE, SITEMAP_URL_LIMIT, aiter_content_urls, aiter_html_sitemap, aiter_xml_urlset,
+    iter_xml_sitemap_index, static_urls
+)
+from view_counter import ViewCounter
+from id_cache import IdCache
+from pagination import (
+    MAX_SKIP, CountCache, apply_cursor, check_skip, decode_cursor, encode_cursor, keyset_filter, next_cursor
+)
+from search import SEARCH_TYPES, text_search
+from search_index import SearchIndex
+from autocomplete import Autocomplete
+from sitemap_cache import SitemapCache
+from response_cache import CachedResponse, ResponseCache
+from serialization import ORJSONResponse, dumps
+from projection import ALL_FIELDS, list_projection
+from batch import fetch_by_ids, parse_ids
+from bulk_io import IMPORT_MODELS, aiter_ndjson, import_ndjson
+from upload_refs import UploadRefs, blob_id
+from leaderboard import BOARD_CONTENT, Leaderboard, with_content
+from analytics_counters import AnalyticsCounters
+from view_rollups import GRANULARITIES, HOURLY_RETENTION, ViewRollups
+from trending import TRENDING_SIZE, Trending
+from unique_visitors import UniqueVisitors, visitor_fingerprint
+from http_cache import (
+    CollectionVersions, ImmutableStaticFiles, is_conditional, is_not_modified, not_modified, strong_etag,
+    validator_headers, version_etag
+)
 
 # Инициализация
 ROOT_DIR = Path(__file__).parent
@@ -26,19 +57,177 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
-# --- ИСПРАВЛЕНИЕ: Используем абсолютный путь Render для uploads ---
-UPLOADS_DIR = Path("/opt/render/project/src/backend/uploads")
-UPLOADS_DIR.mkdir(exist_ok=True)
-# --- КОНЕЦ ИСПРАВЛЕНИЯ ---
+# Write-behind page view counter (flushed in batches, see view_counter.py)
+view_counter = ViewCounter(
+    db.page_views,
+    flush_interval=float(os.environ.get('VIEWS_FLUSH_INTERVAL', '1.0')),
+    max_pending=int(os.environ.get('VIEWS_FLUSH_MAX_PENDING', '1000')),
+    max_cached=int(os.environ.get('VIEWS_MAX_CACHED', '50000'))
+)
+
+# Known article ids, so ratings don't need a lookup to check the article exists
+article_ids = IdCache(db.articles)
+# Same for breeds; views are only counted for pages that exist
+breed_ids = IdCache(db.breeds)
+PAGE_IDS = {"article": article_ids, "breed": breed_ids}
+
+# Totals for list filters, invalidated by the article/breed write handlers
+list_counts = CountCache()
+
+# In-memory BM25 index, used by /api/search when SEARCH_ENGINE=memory
+SEARCH_ENGINE = os.environ.get('SEARCH_ENGINE', 'mongo')
+search_index = SearchIndex() if SEARCH_ENGINE == 'memory' else None
+
+# Prefix index behind /api/search/suggestions, weighted by page views
+autocomplete = Autocomplete()
+view_counter.add_listener(autocomplete.add_views)
+
+# Most viewed articles and breeds, one stored document re-ranked after every view flush
+leaderboard = Leaderboard(db, rebuild_interval=float(os.environ.get('LEADERBOARD_REBUILD_INTERVAL', '600')))
+view_counter.add_listener(leaderboard.add_views)
+
+# Site-wide view and rating totals, kept current with $inc and reconciled periodically
+analytics_counters = AnalyticsCounters(
+    db, interval=float(os.environ.get('ANALYTICS_RECONCILE_INTERVAL', '3600'))
+)
+view_counter.add_listener(analytics_counters.add_views)
+view_counter.guard_flushes(analytics_counters.counting)
+
+# Hourly view buckets, compacted into daily ones, behind the time series and trending routes
+view_rollups = ViewRollups(db, interval=float(os.environ.get('VIEW_ROLLUP_INTERVAL', '300')))
+view_counter.add_listener(view_rollups.add_views)
+
+# Decayed view scores with the top pages of each type, fed by every tracked view
+trending = Trending(
+    db.trending,
+    half_life=float(os.environ.get('TRENDING_HALF_LIFE', str(6 * 60 * 60))),
+    interval=float(os.environ.get('TRENDING_SNAPSHOT_INTERVAL', '60'))
+)
+
+# HyperLogLog sketches of each page's and the whole site's visitors
+unique_visitors = UniqueVisitors(
+    db,
+    interval=float(os.environ.get('VISITORS_FLUSH_INTERVAL', '30')),
+    max_pending=int(os.environ.get('VISITORS_MAX_PENDING', '2000'))
+)
+# Secret mixed into visitor hashes (blake2b keys are at most 64 bytes)
+VISITOR_HASH_KEY = os.environ.get('VISITOR_HASH_KEY', '').encode()[:64]
+# Proxies in front of the app that append to X-Forwarded-For (the ingress by default)
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '1'))
+
+# Serialized article/breed detail responses, dropped by the write handlers
+detail_cache = ResponseCache(
+    max_bytes=int(os.environ.get('DETAIL_CACHE_BYTES', str(32 * 1024 * 1024))),
+    ttl=float(os.environ.get('DETAIL_CACHE_TTL', '300'))
+)
+
+# Version stamps of the articles and breeds collections, for list ETags
+content_versions = CollectionVersions()
+
+async def _content_fingerprint() -> str:
+    """Changes whenever articles or breeds are added, removed or updated."""
+    return "|".join([(await content_versions.get(db.articles))[0], (await content_versions.get(db.breeds))[0]])
+
+# Rendered sitemaps, dropped by the article/breed write handlers
+sitemaps = SitemapCache(
+    Path(os.environ.get('SITEMAP_CACHE_DIR', ROOT_DIR / 'sitemap_cache')),
+    _content_fingerprint,
+    max_bytes=int(os.environ.get('SITEMAP_CACHE_BYTES', str(64 * 1024 * 1024)))
+)
+
+def _content_changed(collection_name: str, kind: str, doc_id: Optional[str] = None) -> None:
+    """Drop what was cached from articles or breeds after a write."""
+    if doc_id is not None:
+        detail_cache.invalidate((kind, doc_id))
+    list_counts.invalidate(collection_name)
+    content_versions.invalidate(collection_name)
+    sitemaps.invalidate()
+
+# Which articles and breeds use which stored image; unused images are collected
+upload_refs = UploadRefs(
+    db.upload_refs,
+    grace=float(os.environ.get('UPLOAD_ORPHAN_GRACE', str(24 * 60 * 60))),
+    interval=float(os.environ.get('UPLOAD_GC_INTERVAL', str(6 * 60 * 60)))
+)
+
+# JSON API responses carry validators; clients revalidate before reusing them
+API_CACHE_CONTROL = "no-cache"
+
+def _json_bytes(content) -> bytes:
+    """Serialize like ORJSONResponse, so cached bodies match uncached ones."""
+    return dumps(content)
+
+def _json_response(content, etag: Optional[str] = None, last_modified: Optional[datetime] = None) -> Response:
+    # Returning a Response skips FastAPI's jsonable_encoder pass over the documents
+    return ORJSONResponse(content, headers=validator_headers(etag, last_modified, API_CACHE_CONTROL))
+
+def _updated_at(doc: dict) -> Optional[datetime]:
+    value = doc.get("updated_at")
+    return value if isinstance(value, datetime) else None
+
+def _serve_cached(request: Request, cached: CachedResponse) -> Response:
+    """304 if the client's copy is current, otherwise the cached body."""
+    if is_not_modified(request, cached.etag, cached.last_modified):
+        return not_modified(cached.etag, cached.last_modified, API_CACHE_CONTROL)
+    return ORJSONResponse(cached.body, headers=validator_headers(cached.etag, cached.last_modified, API_CACHE_CONTROL))
+
+async def _cached_part(key: tuple, read) -> Optional[CachedResponse]:
+    """Serialized document from detail_cache, or ``await read()`` on a miss.
+
+    The ETag derives from updated_at, falling back to a body hash for
+    documents written before updated_at existed. None if there is no document.
+    """
+    cached = detail_cache.get(key)
+    return cached if cached is not None else await _read_part(key, read)
+
+async def _read_part(key: tuple, read) -> Optional[CachedResponse]:
+    """The miss path of _cached_part: read, serialize and cache."""
+    token = detail_cache.token()
+    doc = await read()
+    if doc is None:
+        return None
+    body = _json_bytes(doc)
+    updated_at = _updated_at(doc)
+    etag = version_etag(*key, updated_at) if updated_at else strong_etag(body)
+    cached = CachedResponse(body, etag, updated_at)
+    detail_cache.put(key, cached, token)
+    return cached
+
+def _read_detail(collection, doc_id: str):
+    return lambda: collection.find_one({"id": doc_id}, {"_id": 0})
+
+async def _detail_part(collection, kind: str, doc_id: str) -> Optional[CachedResponse]:
+    return await _cached_part((kind, doc_id), _read_detail(collection, doc_id))
+
+async def _cached_detail(request: Request, collection, kind: str, doc_id: str, not_found: str) -> Response:
+    """Serve one article or breed from detail_cache, reading MongoDB on a miss.
+
+    A revalidation that misses the cache is answered from a covered
+    (id, updated_at) lookup instead of reading the document.
+    """
+    # One lookup per request, so the cache stats count each request once
+    cached = detail_cache.get((kind, doc_id))
+    if cached is None and is_conditional(request):
+        stamp = await collection.find_one({"id": doc_id}, {"_id": 0, "id": 1, "updated_at": 1})
+        if stamp and _updated_at(stamp):
+            etag = version_etag(kind, doc_id, stamp["updated_at"])
+            if is_not_modified(request, etag, stamp["updated_at"]):
+                return not_modified(etag, stamp["updated_at"], API_CACHE_CONTROL)
+
+    if cached is None:
+        cached = await _read_part((kind, doc_id), _read_detail(collection, doc_id))
+    if cached is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return _serve_cached(request, cached)
 
 # Create the main app
-app = FastAPI(title="PetsLib API", version="1.0.0")
+app = FastAPI(title="PetsLib API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Mount static files for uploads
-app.mount("/api/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
+app.mount("/api/uploads", ImmutableStaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
 
 # =========================
 # Authentication Routes - УДАЛЕНЫ, чтобы избежать Internal Server Error
@@ -49,43 +238,105 @@ app.mount("/api/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads
 # Articles Routes (ПУБЛИЧНЫЕ)
 # =========================
 
+ARTICLES_SORT = [("date", -1), ("id", -1)]
+# What article cards show; pass fields= for more, or fields=all for whole documents
+ARTICLE_SUMMARY_FIELDS = (
+    "title", "category", "excerpt", "author", "date", "readTime", "image_url", "image_derivatives", "updated_at"
+)
+
 @api_router.get("/articles")
 async def get_articles(
+    request: Request,
     category: Optional[str] = None,
     page: int = Query(default=1, ge=1),
-    limit: int = Query(default=12, ge=1, le=50)
+    limit: int = Query(default=12, ge=1, le=50),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    """Get all articles with optional category filter and pagination."""
+    """Get all articles with optional category filter and pagination.
+
+    Pass ``cursor`` (the previous response's ``next_cursor``) for keyset
+    pagination; page numbers are kept as a fallback for shallow pages.
+    Articles are summaries without ``content`` unless ``fields`` says otherwise.
+    """
+    projection = list_projection(fields, Article.model_fields, ARTICLE_SUMMARY_FIELDS, ("id", "date"))
+    
+    # Any article write changes the collection version, and with it the ETag
+    version, last_modified = await content_versions.get(db.articles)
+    etag = version_etag("articles", version, sorted(request.query_params.multi_items()))
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified, API_CACHE_CONTROL)
+    
     query = {}
     if category and category != "all":
         query["category"] = category
     
-    # Get total count
-    total = await db.articles.count_documents(query)
+    # Get total count (cached per filter until articles change)
+    total = await list_counts.count(db.articles, query)
     
-    # Calculate skip
-    skip = (page - 1) * limit
+    # Continue after the cursor, or fall back to a bounded skip
+    articles_query = db.articles.find(
+        apply_cursor(query, ARTICLES_SORT, cursor) if cursor else query,
+        projection
+    ).sort(ARTICLES_SORT)
+    if not cursor:
+        articles_query = articles_query.skip(check_skip(page, limit))
     
-    # Get paginated articles
-    articles = await db.articles.find(query, {"_id": 0}).sort("date", -1).skip(skip).limit(limit).to_list(limit)
+    # Fetch one extra article to know whether another page follows
+    articles = await articles_query.limit(limit + 1).to_list(limit + 1)
+    cursor_after = next_cursor(articles, ARTICLES_SORT, limit)
     
-    return {
+    return _json_response({
         "articles": articles,
         "pagination": {
             "page": page,
             "limit": limit,
             "total": total,
-            "total_pages": (total + limit - 1) // limit
+            "total_pages": (total + limit - 1) // limit,
+            "next_cursor": cursor_after
         }
-    }
+    }, etag, last_modified)
+
+@api_router.get("/articles/batch")
+async def get_articles_batch(ids: str, fields: Optional[str] = None):
+    """Get several articles by id (comma-separated, at most MAX_BATCH) in one query."""
+    projection = list_projection(fields or ALL_FIELDS, Article.model_fields, ())
+    articles, missing = await fetch_by_ids(db.articles, parse_ids(ids), projection)
+    return _json_response({"articles": articles, "missing": missing})
+
+@api_router.get("/articles/ratings")
+async def get_article_ratings(ids: str):
+    """Get the ratings of several articles (comma-separated ids) in one query."""
+    requested = parse_ids(ids)
+    unknown = [article_id for article_id in requested if article_id not in article_ids]
+    if unknown:
+        (_, missing), (ratings, _) = await asyncio.gather(
+            fetch_by_ids(db.articles, unknown, {"_id": 0, "id": 1}),
+            fetch_by_ids(db.article_ratings, requested, field="article_id")
+        )
+    else:
+        missing = []
+        ratings, _ = await fetch_by_ids(db.article_ratings, requested, field="article_id")
+    
+    missing_ids = set(missing)
+    for article_id in unknown:
+        if article_id not in missing_ids:
+            article_ids.add(article_id)
+    
+    by_article = {rating["article_id"]: rating for rating in ratings}
+    return _json_response({
+        "ratings": [
+            # Same defaults as /articles/{id}/rating, including for unrated articles
+            {**ArticleRating(article_id=article_id).dict(), "updated_at": None, **by_article.get(article_id, {})}
+            for article_id in requested if article_id not in missing_ids
+        ],
+        "missing": missing
+    })
 
 @api_router.get("/articles/{article_id}")
-async def get_article(article_id: str):
+async def get_article(request: Request, article_id: str):
     """Get single article by ID."""
-    article = await db.articles.find_one({"id": article_id}, {"_id": 0})
-    if not article:
-        raise HTTPException(status_code=404, detail="Article not found")
-    return article
+    return await _cached_detail(request, db.articles, "article", article_id, "Article not found")
 
 @api_router.post("/articles")
 async def create_article(
@@ -99,6 +350,12 @@ async def create_article(
     )
     
     await db.articles.insert_one(new_article.dict())
+    await upload_refs.replace(f"article:{new_article.id}", None, new_article.image_url)
+    article_ids.add(new_article.id)
+    _content_changed("articles", "article")
+    if search_index is not None:
+        search_index.add_article(new_article.dict())
+    autocomplete.upsert("article", new_article.id, new_article.title)
     return new_article
 
 @api_router.put("/articles/{article_id}")
@@ -120,9 +377,15 @@ async def update_article(
         {"id": article_id},
         {"$set": update_data}
     )
+    await upload_refs.replace(f"article:{article_id}", existing_article.get("image_url"),
+                              update_data.get("image_url", existing_article.get("image_url")))
+    _content_changed("articles", "article", article_id)
     
     # Return updated article
     updated_article = await db.articles.find_one({"id": article_id}, {"_id": 0})
+    if search_index is not None:
+        search_index.add_article(updated_article)
+    autocomplete.upsert("article", article_id, updated_article["title"])
     return updated_article
 
 @api_router.delete("/articles/{article_id}")
@@ -130,64 +393,105 @@ async def delete_article(
     article_id: str,
 ):
     """Delete article (admin only)."""
-    result = await db.articles.delete_one({"id": article_id})
-    if result.deleted_count == 0:
+    deleted = await db.articles.find_one_and_delete({"id": article_id}, {"_id": 0, "image_url": 1})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Article not found")
+    await upload_refs.replace(f"article:{article_id}", deleted.get("image_url"), None)
+    article_ids.discard(article_id)
+    _content_changed("articles", "article", article_id)
+    if search_index is not None:
+        search_index.remove("article", article_id)
+    autocomplete.remove("article", article_id)
     return {"success": True, "message": "Article deleted"}
 
 # =========================
 # Breeds Routes (ПУБЛИЧНЫЕ)
 # =========================
 
+BREEDS_SORT = [("name", 1), ("id", 1)]
+# What breed cards show; pass fields= for more, or fields=all for whole documents
+BREED_SUMMARY_FIELDS = (
+    "name", "species", "size", "weight", "lifespan", "temperament", "origin", "idealFor", "image_url",
+    "image_derivatives", "updated_at"
+)
+
 @api_router.get("/breeds")
 async def get_breeds(
+    request: Request,
     species: Optional[str] = None,
     letter: Optional[str] = None,
     search: Optional[str] = None,
     page: int = Query(default=1, ge=1),
-    limit: int = Query(default=12, ge=1, le=50)
+    limit: int = Query(default=12, ge=1, le=50),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    """Get all breeds with optional filters and pagination."""
+    """Get all breeds with optional filters and pagination.
+
+    Pass ``cursor`` (the previous response's ``next_cursor``) for keyset
+    pagination; page numbers are kept as a fallback for shallow pages.
+    Breeds are summaries without history, health and care details unless
+    ``fields`` says otherwise.
+    """
+    projection = list_projection(fields, Breed.model_fields, BREED_SUMMARY_FIELDS, ("id", "name"))
+    
+    version, last_modified = await content_versions.get(db.breeds)
+    etag = version_etag("breeds", version, sorted(request.query_params.multi_items()))
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified, API_CACHE_CONTROL)
+    
     query = {}
     
     if species and species != "all":
         query["species"] = species
     
     if letter and letter != "all":
-        query["name"] = {"$regex": f"^{letter}", "$options": "i"}
+        query["name"] = {"$regex": f"^{re.escape(letter)}", "$options": "i"}
     
     if search:
+        pattern = re.escape(search)
         query["$or"] = [
-            {"name": {"$regex": q, "$options": "i"}},
-            {"temperament": {"$regex": q, "$options": "i"}}
+            {"name": {"$regex": pattern, "$options": "i"}},
+            {"temperament": {"$regex": pattern, "$options": "i"}}
         ]
     
-    # Get total count
-    total = await db.breeds.count_documents(query)
+    # Get total count (cached per filter until breeds change)
+    total = await list_counts.count(db.breeds, query)
     
-    # Calculate skip
-    skip = (page - 1) * limit
+    # Continue after the cursor, or fall back to a bounded skip
+    breeds_query = db.breeds.find(
+        apply_cursor(query, BREEDS_SORT, cursor) if cursor else query,
+        projection
+    ).sort(BREEDS_SORT)
+    if not cursor:
+        breeds_query = breeds_query.skip(check_skip(page, limit))
     
-    # Get paginated breeds
-    breeds = await db.breeds.find(query, {"_id": 0}).sort("name", 1).skip(skip).limit(limit).to_list(limit)
+    # Fetch one extra breed to know whether another page follows
+    breeds = await breeds_query.limit(limit + 1).to_list(limit + 1)
+    cursor_after = next_cursor(breeds, BREEDS_SORT, limit)
     
-    return {
+    return _json_response({
         "breeds": breeds,
         "pagination": {
             "page": page,
             "limit": limit,
             "total": total,
-            "total_pages": (total + limit - 1) // limit
+            "total_pages": (total + limit - 1) // limit,
+            "next_cursor": cursor_after
         }
-    }
+    }, etag, last_modified)
+
+@api_router.get("/breeds/batch")
+async def get_breeds_batch(ids: str, fields: Optional[str] = None):
+    """Get several breeds by id (comma-separated, at most MAX_BATCH) in one query."""
+    projection = list_projection(fields or ALL_FIELDS, Breed.model_fields, ())
+    breeds, missing = await fetch_by_ids(db.breeds, parse_ids(ids), projection)
+    return _json_response({"breeds": breeds, "missing": missing})
 
 @api_router.get("/breeds/{breed_id}")
-async def get_breed(breed_id: str):
+async def get_breed(request: Request, breed_id: str):
     """Get single breed by ID."""
-    breed = await db.breeds.find_one({"id": breed_id}, {"_id": 0})
-    if not breed:
-        raise HTTPException(status_code=404, detail="Breed not found")
-    return breed
+    return await _cached_detail(request, db.breeds, "breed", breed_id, "Breed not found")
 
 @api_router.post("/breeds")
 async def create_breed(
@@ -204,6 +508,12 @@ async def create_breed(
     )
     
     await db.breeds.insert_one(new_breed.dict())
+    await upload_refs.replace(f"breed:{new_breed.id}", None, new_breed.image_url)
+    breed_ids.add(new_breed.id)
+    _content_changed("breeds", "breed")
+    if search_index is not None:
+        search_index.add_breed(new_breed.dict())
+    autocomplete.upsert("breed", new_breed.id, new_breed.name)
     return new_breed
 
 @api_router.put("/breeds/{breed_id}")
@@ -225,9 +535,15 @@ async def update_breed(
         {"id": breed_id},
         {"$set": update_data}
     )
+    await upload_refs.replace(f"breed:{breed_id}", existing_breed.get("image_url"),
+                              update_data.get("image_url", existing_breed.get("image_url")))
+    _content_changed("breeds", "breed", breed_id)
     
     # Return updated breed
     updated_breed = await db.breeds.find_one({"id": breed_id}, {"_id": 0})
+    if search_index is not None:
+        search_index.add_breed(updated_breed)
+    autocomplete.upsert("breed", breed_id, updated_breed["name"])
     return updated_breed
 
 @api_router.delete("/breeds/{breed_id}")
@@ -235,9 +551,15 @@ async def delete_breed(
     breed_id: str,
 ):
     """Delete breed (admin only)."""
-    result = await db.breeds.delete_one({"id": breed_id})
-    if result.deleted_count == 0:
+    deleted = await db.breeds.find_one_and_delete({"id": breed_id}, {"_id": 0, "image_url": 1})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Breed not found")
+    await upload_refs.replace(f"breed:{breed_id}", deleted.get("image_url"), None)
+    breed_ids.discard(breed_id)
+    _content_changed("breeds", "breed", breed_id)
+    if search_index is not None:
+        search_index.remove("breed", breed_id)
+    autocomplete.remove("breed", breed_id)
     return {"success": True, "message": "Breed deleted"}
 
 # =========================
@@ -250,7 +572,6 @@ async def upload_image(
     folder: str = Form(default="general"),
 ):
     """Upload an image file."""
-    # Используем безопасную заглушку из file_upload.py
     result = await save_upload_file(file, folder)
     return result
 
@@ -258,150 +579,216 @@ async def upload_image(
 async def delete_upload(
     file_path: str,
 ):
-    """Delete an uploaded file."""
-    # Используем безопасную заглушку из file_upload.py
-    success = delete_file(file_path)
+    """Delete an uploaded file, unless an article or breed still uses it."""
+    blob = blob_id(file_path)
+    if blob is not None and not await upload_refs.forget(blob):
+        raise HTTPException(status_code=409, detail="File is still used by an article or breed")
+    success = await asyncio.to_thread(delete_file, file_path)
     if not success:
         raise HTTPException(status_code=404, detail="File not found")
     return {"success": True, "message": "File deleted"}
 
+@api_router.post("/admin/uploads/collect")
+async def collect_unused_uploads():
+    """Delete stored images no article or breed uses (admin only)."""
+    return await upload_refs.collect_orphans()
+
 # =========================
 # Ratings Routes (ПУБЛИЧНЫЕ)
 # =========================
 
+def _rating_pipeline(rating: int) -> list:
+    """Update pipeline adding one rating to an article_ratings document.
+
+    It increments the totals and the star bucket, then recomputes the
+    average from the new totals, so a rating is one atomic upsert.
+    """
+    star_counts = {
+        f"distribution.{star}": {"$add": [{"$ifNull": [f"$distribution.{star}", 0]}, 1 if star == rating else 0]}
+        for star in range(1, 6)
+    }
+    return [
+        {"$set": {
+            "total_ratings": {"$add": [{"$ifNull": ["$total_ratings", 0]}, 1]},
+            "total_score": {"$add": [{"$ifNull": ["$total_score", 0]}, rating]},
+            **star_counts,
+            "updated_at": datetime.utcnow()
+        }},
+        {"$set": {
+            "average_rating": {"$round": [{"$divide": ["$total_score", "$total_ratings"]}, 2]}
+        }}
+    ]
+
 @api_router.post("/articles/{article_id}/rate")
 async def rate_article(article_id: str, rating_data: RatingSubmit):
     """Submit a rating for an article (public endpoint)."""
-    # Check if article exists
-    article = await db.articles.find_one({"id": article_id})
-    if not article:
+    if not await article_ids.exists(article_id):
         raise HTTPException(status_code=404, detail="Article not found")
     
-    # Get or create rating record
-    rating_doc = await db.article_ratings.find_one({"article_id": article_id})
-    
-    if rating_doc:
-        # Update existing
-        new_total = rating_doc["total_ratings"] + 1
-        new_score = rating_doc["total_score"] + rating_data.rating
-        new_average = new_score / new_total
-        
-        await db.article_ratings.update_one(
+    # The total counters must not be reconciled between the two writes
+    async with analytics_counters.counting():
+        updated_rating = await db.article_ratings.find_one_and_update(
             {"article_id": article_id},
-            {"$set": {
-                "total_ratings": new_total,
-                "total_score": new_score,
-                "average_rating": round(new_average, 2),
-                "updated_at": datetime.utcnow()
-            }}
-        )
-    else:
-        # Create new
-        new_rating = ArticleRating(
-            article_id=article_id,
-            total_ratings=1,
-            total_score=rating_data.rating,
-            average_rating=float(rating_data.rating)
+            _rating_pipeline(rating_data.rating),
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
-        await db.article_ratings.insert_one(new_rating.dict())
-    
-    # Return updated rating
-    updated_rating = await db.article_ratings.find_one({"article_id": article_id}, {"_id": 0})
+        await analytics_counters.add_rating(rating_data.rating)
+    detail_cache.invalidate(("rating", article_id))
     return updated_rating
 
 @api_router.get("/articles/{article_id}/rating")
-async def get_article_rating(article_id: str):
+async def get_article_rating(request: Request, article_id: str):
     """Get rating for an article."""
-    rating = await db.article_ratings.find_one({"article_id": article_id}, {"_id": 0})
-    if not rating:
-        return ArticleRating(article_id=article_id).dict()
-    return rating
+    return _serve_cached(request, await _rating_part(article_id))
+
+async def _rating_part(article_id: str) -> CachedResponse:
+    async def read():
+        rating = await db.article_ratings.find_one({"article_id": article_id}, {"_id": 0})
+        # Ratings stored before the star distribution existed lack the field.
+        # Unrated articles get no timestamp, so their body and ETag stay the same.
+        return {**ArticleRating(article_id=article_id).dict(), "updated_at": None, **(rating or {})}
+    return await _cached_part(("rating", article_id), read)
 
 # =========================
 # Page Views Routes (ПУБЛИЧНЫЕ)
 # =========================
 
 @api_router.post("/views/{page_type}/{page_id}")
-async def track_page_view(page_type: str, page_id: str):
+async def track_page_view(request: Request, page_type: str, page_id: str):
     """Track page view (public endpoint)."""
     if page_type not in ["article", "breed"]:
         raise HTTPException(status_code=400, detail="Invalid page type")
+    # Unknown ids would otherwise take up memory and page_views documents
+    if not await PAGE_IDS[page_type].exists(page_id):
+        raise HTTPException(status_code=404, detail=f"{page_type.capitalize()} not found")
     
-    # Update or create view record
-    result = await db.page_views.update_one(
-        {"page_type": page_type, "page_id": page_id},
-        {
-            "$inc": {"views": 1},
-            "$set": {"updated_at": datetime.utcnow()},
-            "$setOnInsert": {
-                "page_type": page_type,
-                "page_id": page_id,
-                "created_at": datetime.utcnow()
-            }
-        },
-        upsert=True
-    )
+    # Buffered in memory and written in batches by view_counter
+    views = await view_counter.record(page_type, page_id)
+    _record_visit(request, page_type, page_id)
+    return {
+        "page_type": page_type,
+        "page_id": page_id,
+        "views": views,
+        "updated_at": datetime.utcnow()
+    }
+
+def _record_visit(request: Request, page_type: str, page_id: str) -> None:
+    """Feed a tracked view to the trending scores and the visitor sketches."""
+    trending.record(page_type, page_id)
+    fingerprint = visitor_fingerprint(_client_address(request), request.headers.get("user-agent", ""), VISITOR_HASH_KEY)
+    unique_visitors.record(page_type, page_id, fingerprint)
+
+def _client_address(request: Request) -> str:
+    """The address the outermost trusted proxy saw the request come from."""
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    if TRUSTED_PROXY_HOPS and hops:
+        # Earlier hops are whatever the client sent; each trusted proxy appends one
+        return hops[-min(TRUSTED_PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else ""
+
+@api_router.get("/views/{page_type}")
+async def get_page_views(page_type: str, ids: str):
+    """Get view totals for several pages of one type (comma-separated ids)."""
+    if page_type not in ["article", "breed"]:
+        raise HTTPException(status_code=400, detail="Invalid page type")
     
-    # Get updated view count
-    view_doc = await db.page_views.find_one({"page_type": page_type, "page_id": page_id}, {"_id": 0})
-    return view_doc
+    totals = await view_counter.get_many(page_type, parse_ids(ids))
+    return {
+        "page_type": page_type,
+        "views": [{"page_id": page_id, "views": views} for page_id, views in totals.items()]
+    }
+
+@api_router.get("/trending/{page_type}")
+async def get_trending_pages(page_type: str, limit: int = Query(default=6, ge=1, le=TRENDING_SIZE // 2)):
+    """Get the pages with the most recent views (public endpoint)."""
+    if page_type not in ["article", "breed"]:
+        raise HTTPException(status_code=400, detail="Invalid page type")
+    
+    # Extra candidates stand in for pages deleted since they were viewed
+    ranked = [
+        {"page_id": page_id, "score": round(score, 2)}
+        for page_id, score in trending.top(page_type, limit * 2)
+    ]
+    return {"page_type": page_type, "items": await with_content(db, page_type, ranked, limit)}
 
 @api_router.get("/analytics/popular")
 async def get_popular_content():
     """Get most viewed articles and breeds (admin only)."""
-    # Get top articles
-    top_articles = await db.page_views.find(
-        {"page_type": "article"},
-        {"_id": 0}
-    ).sort("views", -1).limit(10).to_list(10)
-    
-    # Get top breeds
-    top_breeds = await db.page_views.find(
-        {"page_type": "breed"},
-        {"_id": 0}
-    ).sort("views", -1).limit(10).to_list(10)
-    
-    # Enrich with actual content - OPTIMIZED: bulk queries instead of N+1
-    if top_articles:
-        article_ids = [item["page_id"] for item in top_articles]
-        # Заглушка, так как импорт моделей удален
-        articles_lookup = {}
-        for item in top_articles:
-            item["title"] = f"Article ID {item['page_id']}"
-    
-    if top_breeds:
-        breed_ids = [item["page_id"] for item in top_breeds]
-        # Заглушка, так как импорт моделей удален
-        breeds_lookup = {}
-        for item in top_breeds:
-            item["name"] = f"Breed ID {item['page_id']}"
-    
-    return {
-        "articles": top_articles,
-        "breeds": top_breeds
-    }
+    # Titles, images and ratings come from the materialized leaderboard (see leaderboard.py)
+    board = await leaderboard.read()
+    for page_type, (facet, _, _) in BOARD_CONTENT.items():
+        entries = board.get(facet, [])
+        visitors = await unique_visitors.estimate(page_type, [entry["page_id"] for entry in entries])
+        for entry in entries:
+            entry["unique_visitors"] = visitors[entry["page_id"]]
+    return board
 
 @api_router.get("/analytics/stats")
 async def get_analytics_stats():
     """Get overall analytics stats (admin only)."""
-    # ... (Остальной код, использующий только DB и стандартные типы)
+    # One counters document, see analytics_counters.py
+    stats = await analytics_counters.read()
+    stats["unique_visitors"] = await unique_visitors.site_estimate()
+    return stats
+
+@api_router.get("/analytics/timeseries")
+async def get_views_timeseries(
+    page_type: str,
+    page_id: Optional[str] = None,
+    granularity: str = "day",
+    points: int = Query(default=30, ge=1, le=366)
+):
+    """Get views per hour or day of one page, or of all pages of a type (admin only)."""
+    if page_type not in ["article", "breed"]:
+        raise HTTPException(status_code=400, detail="Invalid page type")
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail="Invalid granularity")
+    if granularity == "hour" and points > HOURLY_RETENTION // GRANULARITIES["hour"]:
+        raise HTTPException(status_code=400, detail="Hourly views are only kept for %d days" % HOURLY_RETENTION.days)
+    
+    return {
+        "page_type": page_type,
+        "page_id": page_id,
+        "granularity": granularity,
+        "points": await view_rollups.timeseries(page_type, page_id, granularity, points)
+    }
+
+@api_router.get("/analytics/trending")
+async def get_trending_content(
+    page_type: str = "article",
+    days: int = Query(default=7, ge=1, le=90),
+    limit: int = Query(default=10, ge=1, le=50)
+):
+    """Get the most viewed pages of the last few days (admin only)."""
+    if page_type not in ["article", "breed"]:
+        raise HTTPException(status_code=400, detail="Invalid page type")
+    
     return {
-        "total_article_views": 0, # Заглушка
-        "total_breed_views": 0, # Заглушка
-        "total_ratings": 0, # Заглушка
-        "average_rating": 0 # Заглушка
+        "page_type": page_type,
+        "days": days,
+        "items": await view_rollups.trending(page_type, days, limit)
     }
 
+@api_router.post("/admin/analytics/reconcile")
+async def reconcile_analytics_stats():
+    """Recompute the analytics totals from page views and ratings (admin only)."""
+    return await analytics_counters.reconcile()
+
 # =========================
 # SEO & Meta Tags Routes (ПУБЛИЧНЫЕ)
 # =========================
 # ... (Роуты SEO оставлены, но без Depends, чтобы исключить ошибки)
 
+SEO_SETTINGS = {"id": "seo_settings", "site_name": "PetsLib"}
+SEO_SETTINGS_PART = CachedResponse(_json_bytes(SEO_SETTINGS), strong_etag(_json_bytes(SEO_SETTINGS)))
+
 @api_router.get("/seo/settings")
-async def get_seo_settings():
+async def get_seo_settings(request: Request):
     """Get SEO settings."""
     # Используем заглушку, так как модель SEOSettings не импортирована
-    return {"id": "seo_settings", "site_name": "PetsLib"}
+    return _serve_cached(request, SEO_SETTINGS_PART)
 
 @api_router.put("/seo/settings")
 async def update_seo_settings(
@@ -413,13 +800,18 @@ async def update_seo_settings(
 
 
 @api_router.get("/seo/meta/{page_type}/{page_id}")
-async def get_page_meta(page_type: str, page_id: str):
+async def get_page_meta(request: Request, page_type: str, page_id: str):
     """Get custom meta tags for a page."""
-    meta = await db.page_meta.find_one(
-        {"page_type": page_type, "page_id": page_id},
-        {"_id": 0}
-    )
-    return meta if meta else {}
+    return _serve_cached(request, await _meta_part(page_type, page_id))
+
+async def _meta_part(page_type: str, page_id: str) -> CachedResponse:
+    async def read():
+        meta = await db.page_meta.find_one(
+            {"page_type": page_type, "page_id": page_id},
+            {"_id": 0}
+        )
+        return meta if meta else {}
+    return await _cached_part(("meta", page_type, page_id), read)
 
 @api_router.post("/seo/meta")
 async def create_page_meta(
@@ -427,6 +819,7 @@ async def create_page_meta(
 ):
     """Create custom meta tags for a page (admin only)."""
     # Логика создания пропущена
+    detail_cache.invalidate(("meta", meta_data.get("page_type"), meta_data.get("page_id")))
     return {"page_type": meta_data.get("page_type"), "page_id": meta_data.get("page_id")}
 
 @api_router.put("/seo/meta/{page_type}/{page_id}")
@@ -437,70 +830,382 @@ async def update_page_meta(
 ):
     """Update custom meta tags for a page (admin only)."""
     # Логика обновления пропущена
+    detail_cache.invalidate(("meta", page_type, page_id))
     return {"page_type": page_type, "page_id": page_id}
 
 
+# =========================
+# Page Bundle Routes (ПУБЛИЧНЫЕ)
+# =========================
+
+@api_router.get("/pages/{page_type}/{page_id}")
+async def get_page_bundle(request: Request, page_type: str, page_id: str, track: bool = False):
+    """Everything a detail page needs in one response.
+
+    Returns the article or breed, the article's rating, the page's custom
+    meta tags, the SEO settings and the view count, read concurrently and
+    joined from their cached JSON. ``track=true`` also records the view.
+    """
+    if page_type == "article":
+        collection = db.articles
+    elif page_type == "breed":
+        collection = db.breeds
+    else:
+        raise HTTPException(status_code=400, detail="Invalid page type")
+    # Checked first so unknown ids leave nothing in the caches or the view counts
+    if not await PAGE_IDS[page_type].exists(page_id):
+        raise HTTPException(status_code=404, detail=f"{page_type.capitalize()} not found")
+    
+    parts = [
+        _detail_part(collection, page_type, page_id),
+        _meta_part(page_type, page_id),
+        view_counter.get(page_type, page_id),
+    ]
+    if page_type == "article":
+        parts.append(_rating_part(page_id))
+    doc, meta, views, *rating = await asyncio.gather(*parts)
+    if doc is None:
+        # Deleted meanwhile
+        raise HTTPException(status_code=404, detail=f"{page_type.capitalize()} not found")
+    if track:
+        # The total is loaded already, so this only touches memory
+        views = await view_counter.record(page_type, page_id)
+        _record_visit(request, page_type, page_id)
+    
+    body = b"".join([
+        b'{"', page_type.encode(), b'":', doc.body,
+        b',"rating":' + rating[0].body if rating else b"",
+        b',"meta":', meta.body,
+        b',"seo":', SEO_SETTINGS_PART.body,
+        b',"views":', str(views).encode(), b"}",
+    ])
+    # The view count changes on every visit, so the bundle carries no validators
+    return ORJSONResponse(body, headers={"Cache-Control": "no-store"})
+
 # =========================
 # Search Routes (ПУБЛИЧНЫЕ)
 # =========================
 
-@api_router.get("/search")
-async def search_content(q: str = Query(..., min_length=2)):
-    """Search across articles and breeds."""
-    # ... (Логика поиска осталась, но без сложных моделей)
-    results = []
-    
-    # Search articles
-    articles = await db.articles.find(
-        {
-            "$or": [
-                {"title": {"$regex": q, "$options": "i"}},
-                {"excerpt": {"$regex": q, "$options": "i"}},
-            ]
-        },
-        {"_id": 0, "id": 1, "title": 1, "excerpt": 1}
-    ).limit(10).to_list(10)
-    
-    for article in articles:
-        results.append({
-            "type": "article",
-            "id": article["id"],
-            "title": article["title"],
-            "excerpt": article["excerpt"][:150] + "..." if len(article["excerpt"]) > 150 else article["excerpt"],
-            "relevance": 1.0
-        })
+@api_router.get("/search", response_model=List[SearchResult])
+async def search_content(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=2),
+    type: Optional[str] = None,
+    limit: int = Query(default=10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    engine: Optional[str] = None
+):
+    """Search across articles and breeds, ranked by text relevance.
+
+    Answered from the in-memory BM25 index when it is enabled (pass
+    ``engine=mongo`` to force the MongoDB text indexes). The cursor for the
+    next page is returned in the ``X-Next-Cursor`` header.
+    """
+    if type and type not in SEARCH_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid search type")
+    types = [type] if type else SEARCH_TYPES
     
+    offsets = [0] * len(SEARCH_TYPES)
+    if cursor:
+        offsets = decode_cursor(cursor, len(SEARCH_TYPES))
+        if not all(isinstance(offset, int) and 0 <= offset <= MAX_SKIP for offset in offsets):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if search_index is not None and engine != "mongo":
+        results, next_offsets = search_index.search(q, types, limit, offsets)
+    else:
+        results, next_offsets = await text_search(db, q, types, limit, offsets)
+    if next_offsets:
+        response.headers["X-Next-Cursor"] = encode_cursor(next_offsets)
+    # Searches that find something feed the popular-terms completions
+    if results and not cursor:
+        searcher = visitor_fingerprint(_client_address(request), request.headers.get("user-agent", ""), VISITOR_HASH_KEY)
+        autocomplete.record_query(q, searcher)
     return results
 
+@api_router.post("/admin/search/rebuild")
+async def rebuild_search_index():
+    """Rebuild the in-memory search index from MongoDB (admin only)."""
+    if search_index is None:
+        raise HTTPException(status_code=400, detail="In-memory search is disabled")
+    await search_index.rebuild(db)
+    return {"success": True, **search_index.stats()}
+
 @api_router.get("/search/suggestions")
-async def search_suggestions(q: str = Query(..., min_length=2)):
+async def search_suggestions(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(default=8, ge=1, le=20)
+):
     """Get search suggestions (autocomplete)."""
-    # ... (Логика поиска осталась)
-    return [] # Заглушка для простоты
+    return autocomplete.suggest(q, limit)
 
 
 # =========================
 # Sitemap Routes (ПУБЛИЧНЫЕ)
 # =========================
 
+SITEMAP_SECTIONS = ("articles", "breeds")
+SITEMAP_PART_RE = re.compile(r"^(pages|(articles|breeds)-([1-9][0-9]*))\.xml(\.gz)?$")
+SITEMAP_FIELDS = {"_id": 0, "id": 1, "updated_at": 1, "created_at": 1, "date": 1}
+
+def _frontend_url() -> str:
+    return os.getenv('FRONTEND_URL', 'http://localhost:3000')
+
+def _public_api_url() -> str:
+    # Cached sitemaps are shared by every client, so links never come from the Host header
+    return os.getenv('PUBLIC_API_URL', 'http://localhost:8001').rstrip('/')
+
+async def _sitemap_totals() -> dict:
+    """Number of documents per content section."""
+    return {section: await list_counts.count(db[section], {}) for section in SITEMAP_SECTIONS}
+
+async def _sitemap_newest() -> Optional[datetime]:
+    """Newest updated_at across articles and breeds."""
+    stamps = [(await content_versions.get(db[section]))[1] for section in SITEMAP_SECTIONS]
+    return max(filter(None, stamps), default=None)
+
+def _sitemap_parts(total: int) -> int:
+    return (total + SITEMAP_URL_LIMIT - 1) // SITEMAP_URL_LIMIT
+
+# Per (collection, filter, sort, page size): content version and the key each page starts after
+_sitemap_page_starts: Dict[tuple, Tuple[str, List[Optional[list]]]] = {}
+
+async def _page_starts(name: str, query: dict, sort: List[Tuple[str, int]], size: int) -> List[Optional[list]]:
+    """Sort key each page of ``size`` documents starts after (None for the first page).
+
+    Read in one walk of the sort fields per content version, so a page is a
+    keyset query instead of skipping every earlier page's documents.
+    """
+    version, _ = await content_versions.get(db[name])
+    key = (name, repr(sorted(query.items())), tuple(sort), size)
+    cached = _sitemap_page_starts.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    starts: List[Optional[list]] = [None]
+    count = 0
+    projection = {"_id": 0, **{field: 1 for field, _ in sort}}
+    async for doc in db[name].find(query, projection).sort(sort):
+        count += 1
+        if count % size == 0:
+            starts.append([doc.get(field) for field, _ in sort])
+    starts = starts[:max(1, (count + size - 1) // size)]
+    _sitemap_page_starts[key] = (version, starts)
+    return starts
+
+async def _no_docs():
+    return
+    yield
+
+async def _sitemap_page(name: str, query: dict, projection: dict, sort: List[Tuple[str, int]],
+                        size: int, page: int):
+    """Cursor over one page of ``size`` documents; nothing past the last page."""
+    starts = await _page_starts(name, query, sort, size)
+    if page > len(starts):
+        return _no_docs()
+    after = starts[page - 1]
+    if after is not None:
+        query = {"$and": [query, keyset_filter(sort, after)]} if query else keyset_filter(sort, after)
+    return db[name].find(query, projection).sort(sort).limit(size)
+
+async def _sitemap_urls(section: Optional[str] = None, part: int = 1, pages_lastmod: Optional[str] = None):
+    """Stream sitemap entries from MongoDB: one section part, or everything."""
+    base_url = _frontend_url()
+    if section is None:
+        for url in static_urls(base_url, pages_lastmod):
+            yield url
+    for name in ([section] if section else SITEMAP_SECTIONS):
+        if section:
+            cursor = await _sitemap_page(name, {}, SITEMAP_FIELDS, [("id", 1)], SITEMAP_URL_LIMIT, part)
+        else:
+            cursor = db[name].find({}, SITEMAP_FIELDS).sort("id", 1)
+        async for url in aiter_content_urls(cursor, base_url, name):
+            yield url
+
+async def _pages_urls(lastmod: Optional[str]):
+    for url in static_urls(_frontend_url(), lastmod):
+        yield url
+
+async def _render(chunks, last_modified: Optional[datetime]):
+    return "".join([chunk async for chunk in chunks]).encode("utf-8"), last_modified
+
+async def _cached_sitemap(request: Request, name: str, media_type: str, build, gzipped: bool = False) -> Response:
+    """Serve a sitemap from the cache, or 304 if the client already has it.
+
+    ``build(last_modified)`` renders it; ``gzipped`` serves a gzipped copy,
+    cached next to the uncompressed one.
+    """
+    async def build_cached():
+        # The listing pages and every sitemap change with the newest article or breed
+        last_modified = await _sitemap_newest()
+        return await build(last_modified)
+
+    if gzipped:
+        plain = await sitemaps.get(name, media_type, build_cached)
+
+        async def build_gzipped():
+            return gzip.compress(plain.body, mtime=0), plain.last_modified
+
+        entry = await sitemaps.get(name + ".gz", "application/gzip", build_gzipped)
+    else:
+        entry = await sitemaps.get(name, media_type, build_cached)
+
+    if is_not_modified(request, entry.etag, entry.last_modified):
+        return not_modified(entry.etag, entry.last_modified)
+    return Response(content=entry.body, media_type=entry.media_type,
+                    headers=validator_headers(entry.etag, entry.last_modified))
+
+def _lastmod(last_modified: Optional[datetime]) -> Optional[str]:
+    return last_modified.date().isoformat() if last_modified else None
+
 @api_router.get("/sitemap.xml")
-async def get_xml_sitemap():
-    """Generate and return XML sitemap."""
-    from fastapi.responses import Response
-    
-    # Заглушка для упрощения
-    xml_content = "<?xml version='1.0' encoding='UTF-8'?><urlset xmlns='http://www.sitemaps.org/schemas/sitemap/0.9'><url><loc>https://petslib.com/</loc></url></urlset>"
-    
-    return Response(content=xml_content, media_type="application/xml")
+@api_router.get("/sitemap.xml.gz")
+async def get_xml_sitemap(request: Request):
+    """Serve the XML sitemap, or a sitemap index once it passes 50,000 URLs."""
+    gzipped = request.url.path.endswith(".gz")
+    suffix = ".xml.gz" if gzipped else ".xml"
+    api_url = f"{_public_api_url()}/api/sitemaps"
+
+    async def build(last_modified):
+        totals = await _sitemap_totals()
+        lastmod = _lastmod(last_modified)
+        if len(static_urls("")) + sum(totals.values()) <= SITEMAP_URL_LIMIT:
+            return await _render(aiter_xml_urlset(_sitemap_urls(pages_lastmod=lastmod)), last_modified)
+
+        # Too large for one file: list the parts instead
+        parts = [(f"{api_url}/pages{suffix}", lastmod)] + [
+            (f"{api_url}/{section}-{number}{suffix}", None)
+            for section, total in totals.items()
+            for number in range(1, _sitemap_parts(total) + 1)
+        ]
+        return "".join(iter_xml_sitemap_index(parts)).encode("utf-8"), last_modified
+
+    # The gzipped index lists gzipped parts, so it is cached separately
+    name = "sitemap-gz.xml" if gzipped else "sitemap.xml"
+    return await _cached_sitemap(request, name, "application/xml", build, gzipped)
+
+@api_router.get("/sitemaps/{name}")
+async def get_xml_sitemap_part(request: Request, name: str):
+    """Serve one part of a split XML sitemap (pages.xml, articles-N.xml, breeds-N.xml, optionally .gz)."""
+    match = SITEMAP_PART_RE.match(name)
+    if not match:
+        raise HTTPException(status_code=404, detail="Sitemap not found")
+    _, section, number, gzipped = match.groups()
+    if section is not None and int(number) > _sitemap_parts((await _sitemap_totals())[section]):
+        raise HTTPException(status_code=404, detail="Sitemap not found")
+
+    async def build(last_modified):
+        if section is None:
+            urls = _pages_urls(_lastmod(last_modified))
+        else:
+            urls = _sitemap_urls(section, int(number))
+        return await _render(aiter_xml_urlset(urls), last_modified)
+
+    plain_name = name[:-3] if gzipped else name
+    return await _cached_sitemap(request, f"sitemaps/{plain_name}", "application/xml", build, bool(gzipped))
 
 @api_router.get("/sitemap.html")
-async def get_html_sitemap():
-    """Generate and return HTML sitemap."""
-    from fastapi.responses import HTMLResponse
+async def get_html_sitemap(request: Request, page: int = Query(default=1, ge=1)):
+    """Serve the HTML sitemap, HTML_SITEMAP_PAGE_SIZE links per section and page."""
+    totals = [
+        await list_counts.count(db.articles, {}),
+        await list_counts.count(db.breeds, {"species": "dog"}),
+        await list_counts.count(db.breeds, {"species": "cat"}),
+    ]
+    total_pages = max(1, max((total + HTML_SITEMAP_PAGE_SIZE - 1) // HTML_SITEMAP_PAGE_SIZE for total in totals))
+    if page > total_pages:
+        raise HTTPException(status_code=404, detail="Sitemap page not found")
+
+    async def build(last_modified):
+        # Sections shorter than the others have run out on the last pages
+        articles = await _sitemap_page(
+            "articles", {}, {"_id": 0, "id": 1, "title": 1, "category": 1},
+            [("category", 1), ("title", 1), ("id", 1)], HTML_SITEMAP_PAGE_SIZE, page
+        )
+        dogs, cats = [
+            await _sitemap_page(
+                "breeds", {"species": species}, {"_id": 0, "id": 1, "name": 1},
+                [("name", 1), ("id", 1)], HTML_SITEMAP_PAGE_SIZE, page
+            )
+            for species in ("dog", "cat")
+        ]
+        chunks = aiter_html_sitemap(articles, dogs, cats, _frontend_url(), page, total_pages,
+                                    _public_api_url() + "/api/sitemap.html")
+        return await _render(chunks, last_modified)
+
+    return await _cached_sitemap(request, f"sitemap-{page}.html", "text/html", build)
+
+# =========================
+# Bulk Import & Export Routes
+# =========================
+
+def _bulk_collection(collection: str) -> str:
+    if collection not in IMPORT_MODELS:
+        raise HTTPException(status_code=400, detail="Collection must be articles or breeds")
+    return collection
+
+@api_router.post("/admin/import")
+async def import_content(request: Request, collection: str = Query(...)):
+    """Upsert articles or breeds from an NDJSON body, one document per line (admin only)."""
+    name = _bulk_collection(collection)
+    kind = "article" if name == "articles" else "breed"
+    label = "title" if name == "articles" else "name"
+    
+    # Image each document of the batch being written used before the import
+    previous_images: Dict[str, Optional[str]] = {}
+    
+    async def importing(docs: List[dict]) -> None:
+        previous_images.clear()
+        stored = db[name].find({"id": {"$in": [doc["id"] for doc in docs]}}, {"_id": 0, "id": 1, "image_url": 1})
+        async for doc in stored:
+            previous_images[doc["id"]] = doc.get("image_url")
     
-    html_content = "<html><body>Sitemap Placeholder</body></html>"
+    async def imported(docs: List[dict]) -> None:
+        # A later line for the same id wins, so only its image is referenced
+        latest = {doc["id"]: doc for doc in docs}
+        await upload_refs.replace_many(
+            (f"{kind}:{doc_id}", previous_images.get(doc_id), doc.get("image_url")) for doc_id, doc in latest.items()
+        )
+        for doc in docs:
+            detail_cache.invalidate((kind, doc["id"]))
+            PAGE_IDS[kind].add(doc["id"])
+            if search_index is not None:
+                (search_index.add_article if kind == "article" else search_index.add_breed)(doc)
+        autocomplete.upsert_many(kind, [(doc["id"], doc[label]) for doc in docs])
     
-    return HTMLResponse(content=html_content)
+    try:
+        report = await import_ndjson(
+            db[name], IMPORT_MODELS[name], request.stream(), on_batch=imported, before_batch=importing
+        )
+    finally:
+        # Also after a failed import, since earlier batches were written
+        _content_changed(name, kind)
+    return report.as_dict()
+
+@api_router.get("/admin/export")
+async def export_content(collection: str = Query(...)):
+    """Stream every article or breed as NDJSON (admin only)."""
+    name = _bulk_collection(collection)
+    return StreamingResponse(
+        aiter_ndjson(db[name].find({}, {"_id": 0})),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{name}.ndjson"'}
+    )
+
+# =========================
+# Cache Admin Routes
+# =========================
+
+@api_router.get("/admin/cache")
+async def get_cache_stats():
+    """Article/breed detail cache counters (admin only)."""
+    return detail_cache.stats()
+
+@api_router.put("/admin/cache")
+async def set_cache_budget(max_bytes: int = Query(..., ge=0)):
+    """Change the detail cache memory budget in bytes (admin only)."""
+    detail_cache.set_budget(max_bytes)
+    return detail_cache.stats()
 
 # =========================
 # Public Routes (ПУБЛИЧНЫЕ)
@@ -524,6 +1229,7 @@ app.add_middleware(
     ],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 # --- КОНЕЦ ИСПРАВЛЕНИЯ ---
 
@@ -534,6 +1240,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def check_image_support():
+    # Fail at startup rather than on the first upload
+    check_pillow()
+
+@app.on_event("startup")
+async def start_view_counter():
+    view_counter.start()
+
+@app.on_event("startup")
+async def start_upload_collector():
+    upload_refs.start()
+
+@app.on_event("startup")
+async def start_leaderboard():
+    leaderboard.start()
+
+@app.on_event("startup")
+async def start_analytics_reconciler():
+    analytics_counters.start()
+
+@app.on_event("startup")
+async def start_view_compactor():
+    view_rollups.start()
+
+@app.on_event("startup")
+async def start_trending():
+    await trending.restore()
+    trending.start()
+
+@app.on_event("startup")
+async def start_visitor_sketches():
+    unique_visitors.start()
+
+@app.on_event("startup")
+async def load_page_ids():
+    await article_ids.load()
+    await breed_ids.load()
+
+@app.on_event("startup")
+async def load_autocomplete():
+    await autocomplete.load(db)
+
+@app.on_event("startup")
+async def build_search_index():
+    if search_index is not None:
+        await search_index.rebuild(db)
+        logger.info("Search index built: %s", search_index.stats())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Flush buffered page views before the connection goes away
+    await view_counter.stop()
+    await upload_refs.stop()
+    await leaderboard.stop()
+    await analytics_counters.stop()
+    await view_rollups.stop()
+    await trending.stop()
+    await unique_visitors.stop()
     client.close()
+    shutdown_image_pool()
@@ -0,0 +1,152 @@
+"""
+Rendered sitemaps, kept in memory and on disk until the content changes.
+
+Each sitemap is built once and served from the cache until an article or
+breed write calls ``invalidate()``. Bodies are held in memory up to a byte
+budget (least recently used first out) and written to disk, so evicted
+sitemaps and a restarted server don't rebuild from MongoDB. A disk copy is
+only used while the content fingerprint it was built under still matches.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from http_cache import strong_etag
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9.-]")
+
+Build = Callable[[], Awaitable[Tuple[bytes, Optional[datetime]]]]
+
+
+class CachedSitemap:
+    __slots__ = ("body", "media_type", "etag", "last_modified")
+
+    def __init__(self, body: bytes, media_type: str, etag: str, last_modified: Optional[datetime]):
+        self.body = body
+        self.media_type = media_type
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class SitemapCache:
+    """Sitemap bodies by name, rebuilt on the first request after a change."""
+
+    def __init__(self, directory: Optional[Path], fingerprint: Callable[[], Awaitable[str]],
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._fingerprint_source = fingerprint
+        self._fingerprint: Optional[str] = None
+        self._entries: "OrderedDict[str, CachedSitemap]" = OrderedDict()
+        self._bytes = 0
+        self._building: Dict[str, asyncio.Future] = {}
+        # Bumped by invalidate(), so builds that overlap a change are not kept
+        self._generation = 0
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def invalidate(self) -> None:
+        """Drop every sitemap; call after articles or breeds change."""
+        self._generation += 1
+        self._fingerprint = None
+        self._entries.clear()
+        self._bytes = 0
+
+    async def get(self, name: str, media_type: str, build: Build) -> CachedSitemap:
+        """Return the cached sitemap ``name``, building it with ``build()`` if needed."""
+        while True:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                return entry
+            building = self._building.get(name)
+            if building is None:
+                break
+            # Waiters retry on their own if the build failed or was invalidated
+            await building
+
+        building = self._building[name] = asyncio.get_running_loop().create_future()
+        try:
+            return await self._load_or_build(name, media_type, build)
+        finally:
+            if self._building.get(name) is building:
+                del self._building[name]
+            building.set_result(None)
+
+    async def _load_or_build(self, name: str, media_type: str, build: Build) -> CachedSitemap:
+        generation = self._generation
+        fingerprint = None
+        if self.directory is not None:
+            fingerprint = self._fingerprint
+            if fingerprint is None:
+                fingerprint = await self._fingerprint_source()
+                if generation == self._generation:
+                    self._fingerprint = fingerprint
+            entry = await asyncio.to_thread(self._read, name, fingerprint)
+            if entry is not None:
+                if generation == self._generation:
+                    self._remember(name, entry)
+                return entry
+
+        body, last_modified = await build()
+        entry = CachedSitemap(body, media_type, strong_etag(body), last_modified)
+        if generation == self._generation:
+            self._remember(name, entry)
+            if fingerprint is not None:
+                try:
+                    await asyncio.to_thread(self._write, name, entry, fingerprint)
+                except OSError:
+                    logger.exception("Failed to write sitemap %s to disk", name)
+        return entry
+
+    def _remember(self, name: str, entry: CachedSitemap) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+        self._entries[name] = entry
+        self._bytes += len(entry.body)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+
+    # ----- disk -----
+
+    def _paths(self, name: str) -> Tuple[Path, Path]:
+        safe = _UNSAFE_RE.sub("_", name)
+        return self.directory / safe, self.directory / f"{safe}.json"
+
+    def _read(self, name: str, fingerprint: str) -> Optional[CachedSitemap]:
+        body_path, meta_path = self._paths(name)
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("fingerprint") != fingerprint:
+                return None
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        if strong_etag(body) != meta.get("etag"):
+            return None
+        last_modified = meta.get("last_modified")
+        return CachedSitemap(body, meta["media_type"], meta["etag"],
+                             datetime.fromisoformat(last_modified) if last_modified else None)
+
+    def _write(self, name: str, entry: CachedSitemap, fingerprint: str) -> None:
+        body_path, meta_path = self._paths(name)
+        meta = {
+            "fingerprint": fingerprint,
+            "media_type": entry.media_type,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified.isoformat() if entry.last_modified else None,
+        }
+        # Write to temporary files first so readers never see half a sitemap
+        for path, data in ((body_path, entry.body), (meta_path, json.dumps(meta).encode("utf-8"))):
+            temporary = path.with_name(path.name + ".tmp")
+            temporary.write_bytes(data)
+            os.replace(temporary, path)
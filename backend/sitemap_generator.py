@@ -1,80 +1,127 @@
 from datetime import datetime, date
-from typing import List
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from html import escape as escape_html
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+import asyncio
 
 import os
 
+# Sitemap protocol limit on URLs per file; larger sites need a sitemap index
+SITEMAP_URL_LIMIT = 50000
+# URL entries joined into one chunk before it is yielded
+CHUNK_URLS = 500
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# (loc, lastmod, changefreq, priority)
+SitemapUrl = Tuple[str, str, str, str]
+
+URLSET_OPEN = f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+URLSET_CLOSE = '</urlset>\n'
+INDEX_OPEN = f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n'
+INDEX_CLOSE = '</sitemapindex>\n'
+
+
+def _url_entry(url: SitemapUrl) -> str:
+    loc, lastmod, changefreq, priority = url
+    return (
+        f'  <url>\n'
+        f'    <loc>{escape(loc)}</loc>\n'
+        f'    <lastmod>{lastmod}</lastmod>\n'
+        f'    <changefreq>{changefreq}</changefreq>\n'
+        f'    <priority>{priority}</priority>\n'
+        f'  </url>\n'
+    )
+
+
+def _sitemap_entry(loc: str, lastmod: Optional[str] = None) -> str:
+    lastmod_tag = f'    <lastmod>{lastmod}</lastmod>\n' if lastmod else ''
+    return f'  <sitemap>\n    <loc>{escape(loc)}</loc>\n{lastmod_tag}  </sitemap>\n'
+
+
+def static_urls(base_url: str, lastmod: Optional[str] = None) -> List[SitemapUrl]:
+    """Home, articles and breeds listing pages."""
+    lastmod = lastmod or date.today().isoformat()
+    return [
+        (base_url, lastmod, 'hourly', '0.9'),
+        (f"{base_url}/articles", lastmod, 'hourly', '0.9'),
+        (f"{base_url}/breeds", lastmod, 'hourly', '0.9'),
+    ]
+
+
+def lastmod_of(doc: dict) -> str:
+    """W3C date of a document's last change: updated_at, else created_at or an article's date."""
+    for field in ('updated_at', 'created_at', 'date'):
+        value = doc.get(field)
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        if isinstance(value, str) and value:
+            return value[:10]
+    return date.today().isoformat()
+
+
+def content_url(base_url: str, section: str, doc: dict) -> SitemapUrl:
+    """Sitemap entry for an article or breed document (section is 'articles' or 'breeds')."""
+    return (f"{base_url}/{section}/{doc['id']}", lastmod_of(doc), 'hourly', '0.9')
+
+
+async def aiter_content_urls(docs: AsyncIterable[dict], base_url: str, section: str) -> AsyncIterator[SitemapUrl]:
+    """Map a database cursor of article or breed documents to sitemap entries."""
+    async for doc in docs:
+        yield content_url(base_url, section, doc)
+
+
+def iter_xml_urlset(urls: Iterable[SitemapUrl]) -> Iterator[str]:
+    """Yield a <urlset> document in chunks without building it in memory."""
+    yield URLSET_OPEN
+    chunk = []
+    for url in urls:
+        chunk.append(_url_entry(url))
+        if len(chunk) == CHUNK_URLS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+    yield URLSET_CLOSE
+
+
+async def aiter_xml_urlset(urls: AsyncIterable[SitemapUrl]) -> AsyncIterator[str]:
+    """Async version of iter_xml_urlset, fed from database cursors."""
+    yield URLSET_OPEN
+    chunk = []
+    async for url in urls:
+        chunk.append(_url_entry(url))
+        if len(chunk) == CHUNK_URLS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+    yield URLSET_CLOSE
+
+
+def iter_xml_sitemap_index(sitemaps: Iterable[Tuple[str, Optional[str]]]) -> Iterator[str]:
+    """Yield a <sitemapindex> listing (loc, lastmod) pairs."""
+    yield INDEX_OPEN
+    for loc, lastmod in sitemaps:
+        yield _sitemap_entry(loc, lastmod)
+    yield INDEX_CLOSE
+
+
 def generate_xml_sitemap(articles: List[dict], breeds: List[dict], base_url: str = None) -> str:
     """Generate XML sitemap with all pages."""
     if base_url is None:
         base_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
-    
-    urlset = ET.Element('urlset')
-    urlset.set('xmlns', 'http://www.sitemaps.org/schemas/sitemap/0.9')
-    
-    today = date.today().isoformat()
-    
-    # Add homepage
-    url = ET.SubElement(urlset, 'url')
-    ET.SubElement(url, 'loc').text = base_url
-    ET.SubElement(url, 'lastmod').text = today
-    ET.SubElement(url, 'changefreq').text = 'hourly'
-    ET.SubElement(url, 'priority').text = '0.9'
-    
-    # Add articles page
-    url = ET.SubElement(urlset, 'url')
-    ET.SubElement(url, 'loc').text = f"{base_url}/articles"
-    ET.SubElement(url, 'lastmod').text = today
-    ET.SubElement(url, 'changefreq').text = 'hourly'
-    ET.SubElement(url, 'priority').text = '0.9'
-    
-    # Add breeds page
-    url = ET.SubElement(urlset, 'url')
-    ET.SubElement(url, 'loc').text = f"{base_url}/breeds"
-    ET.SubElement(url, 'lastmod').text = today
-    ET.SubElement(url, 'changefreq').text = 'hourly'
-    ET.SubElement(url, 'priority').text = '0.9'
-    
-    # Add all articles
-    for article in articles:
-        url = ET.SubElement(urlset, 'url')
-        ET.SubElement(url, 'loc').text = f"{base_url}/articles/{article['id']}"
-        ET.SubElement(url, 'lastmod').text = today
-        ET.SubElement(url, 'changefreq').text = 'hourly'
-        ET.SubElement(url, 'priority').text = '0.9'
-    
-    # Add all breeds
-    for breed in breeds:
-        url = ET.SubElement(urlset, 'url')
-        ET.SubElement(url, 'loc').text = f"{base_url}/breeds/{breed['id']}"
-        ET.SubElement(url, 'lastmod').text = today
-        ET.SubElement(url, 'changefreq').text = 'hourly'
-        ET.SubElement(url, 'priority').text = '0.9'
-    
-    # Pretty print XML
-    rough_string = ET.tostring(urlset, encoding='unicode')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ", encoding="UTF-8").decode('utf-8')
 
-def generate_html_sitemap(articles: List[dict], breeds: List[dict], base_url: str = None) -> str:
-    """Generate HTML sitemap for human users."""
-    if base_url is None:
-        base_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
-    
-    # Group articles by category
-    articles_by_category = {}
-    for article in articles:
-        category = article.get('category', 'other')
-        if category not in articles_by_category:
-            articles_by_category[category] = []
-        articles_by_category[category].append(article)
-    
-    # Group breeds by species
-    dogs = [b for b in breeds if b.get('species') == 'dog']
-    cats = [b for b in breeds if b.get('species') == 'cat']
-    
-    html = f'''<!DOCTYPE html>
+    def urls():
+        yield from static_urls(base_url)
+        for article in articles:
+            yield content_url(base_url, 'articles', article)
+        for breed in breeds:
+            yield content_url(base_url, 'breeds', breed)
+
+    return ''.join(iter_xml_urlset(urls()))
+
+HTML_SITEMAP_HEAD = '''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -105,7 +152,7 @@ def generate_html_sitemap(articles: List[dict], breeds: List[dict], base_url: st
             background: #fef3c7;
         }}
         .main-links {{ margin: 20px 0; }}
-        .main-links a {{
+        .main-links a, .pagination a {{
             background: #fef3c7;
             padding: 10px 20px;
             margin-right: 10px;
@@ -115,51 +162,117 @@ def generate_html_sitemap(articles: List[dict], breeds: List[dict], base_url: st
 </head>
 <body>
     <h1>PetsLib Sitemap</h1>
-    
+
     <div class="main-links">
         <a href="{base_url}">Home</a>
         <a href="{base_url}/articles">Articles</a>
         <a href="{base_url}/breeds">Breeds</a>
     </div>
-    
+
     <div class="section">
         <h2>Articles</h2>
 '''
-    
-    for category, cat_articles in sorted(articles_by_category.items()):
-        html += f'        <h3 style="color: #f97316; text-transform: capitalize;">{category}</h3>\n'
-        html += '        <ul>\n'
-        for article in sorted(cat_articles, key=lambda x: x.get('title', '')):
-            html += f'            <li><a href="{base_url}/articles/{article["id"]}">{article.get("title", "Untitled")}</a></li>\n'
-        html += '        </ul>\n'
-    
-    html += '''    </div>
-    
-    <div class="section">
-        <h2>Dog Breeds</h2>
-        <ul>
+
+HTML_SITEMAP_FOOT = '''    <p style="margin-top: 50px; text-align: center; color: #9ca3af;">© 2025 PetsLib. All rights reserved.</p>
+</body>
+</html>
 '''
-    
-    for breed in sorted(dogs, key=lambda x: x.get('name', '')):
-        html += f'            <li><a href="{base_url}/breeds/{breed["id"]}">{breed.get("name", "Unknown")}</a></li>\n'
-    
-    html += '''        </ul>
-    </div>
-    
+
+# Links per section (articles, dog breeds, cat breeds) on one HTML sitemap page
+HTML_SITEMAP_PAGE_SIZE = 5000
+
+
+def _html_section_open(title: str) -> str:
+    return f'''    </div>
+
     <div class="section">
-        <h2>Cat Breeds</h2>
+        <h2>{title}</h2>
         <ul>
 '''
-    
-    for breed in sorted(cats, key=lambda x: x.get('name', '')):
-        html += f'            <li><a href="{base_url}/breeds/{breed["id"]}">{breed.get("name", "Unknown")}</a></li>\n'
-    
-    html += '''        </ul>
-    </div>
-    
-    <p style="margin-top: 50px; text-align: center; color: #9ca3af;">© 2025 PetsLib. All rights reserved.</p>
-</body>
-</html>
-'''
-    
-    return html
+
+
+def _html_link(base_url: str, section: str, doc_id: str, text: str) -> str:
+    return f'            <li><a href="{base_url}/{section}/{escape_html(str(doc_id))}">{escape_html(text)}</a></li>\n'
+
+
+def _html_pagination(page: int, total_pages: int, page_url: str) -> str:
+    if total_pages <= 1:
+        return ''
+    links = []
+    if page > 1:
+        links.append(f'<a href="{page_url}?page={page - 1}">Previous</a>')
+    links.append(f'<span>Page {page} of {total_pages}</span>')
+    if page < total_pages:
+        links.append(f'<a href="{page_url}?page={page + 1}">Next</a>')
+    return f'    <div class="pagination">{" ".join(links)}</div>\n'
+
+
+def _html_article(article: dict, base_url: str, state: dict) -> str:
+    """Render one article, opening a new list whenever the category changes."""
+    html = ''
+    category = article.get('category', 'other')
+    if category != state.get('category'):
+        if 'category' in state:
+            html += '        </ul>\n'
+        html += f'        <h3 style="color: #f97316; text-transform: capitalize;">{escape_html(category)}</h3>\n'
+        html += '        <ul>\n'
+        state['category'] = category
+    return html + _html_link(base_url, 'articles', article['id'], article.get('title', 'Untitled'))
+
+
+async def aiter_html_sitemap(articles: AsyncIterable[dict], dogs: AsyncIterable[dict],
+                             cats: AsyncIterable[dict], base_url: str, page: int = 1,
+                             total_pages: int = 1, page_url: str = '') -> AsyncIterator[str]:
+    """Stream the HTML sitemap in chunks.
+
+    ``articles`` must arrive sorted by category then title and ``dogs`` and
+    ``cats`` by name, so the database does the sorting.
+    """
+    yield HTML_SITEMAP_HEAD.format(base_url=base_url)
+
+    chunk, state = [], {}
+    async for article in articles:
+        chunk.append(_html_article(article, base_url, state))
+        if len(chunk) == CHUNK_URLS:
+            yield ''.join(chunk)
+            chunk = []
+    if 'category' in state:
+        chunk.append('        </ul>\n')
+
+    for title, breeds in (('Dog Breeds', dogs), ('Cat Breeds', cats)):
+        chunk.append(_html_section_open(title))
+        async for breed in breeds:
+            chunk.append(_html_link(base_url, 'breeds', breed['id'], breed.get('name', 'Unknown')))
+            if len(chunk) == CHUNK_URLS:
+                yield ''.join(chunk)
+                chunk = []
+        chunk.append('        </ul>\n')
+
+    chunk.append('    </div>\n    \n')
+    chunk.append(_html_pagination(page, total_pages, page_url))
+    chunk.append(HTML_SITEMAP_FOOT)
+    yield ''.join(chunk)
+
+
+async def _aiter(items: Iterable[dict]) -> AsyncIterator[dict]:
+    for item in items:
+        yield item
+
+
+def generate_html_sitemap(articles: List[dict], breeds: List[dict], base_url: str = None) -> str:
+    """Generate HTML sitemap for human users from in-memory lists.
+
+    The API streams aiter_html_sitemap from sorted cursors instead.
+    """
+    if base_url is None:
+        base_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
+
+    sorted_articles = sorted(articles, key=lambda x: (x.get('category', 'other'), x.get('title', '')))
+    dogs = sorted((b for b in breeds if b.get('species') == 'dog'), key=lambda x: x.get('name', ''))
+    cats = sorted((b for b in breeds if b.get('species') == 'cat'), key=lambda x: x.get('name', ''))
+
+    async def render():
+        chunks = aiter_html_sitemap(_aiter(sorted_articles), _aiter(dogs), _aiter(cats), base_url)
+        return ''.join([chunk async for chunk in chunks])
+
+    return asyncio.run(render())
@@ -0,0 +1,210 @@
+"""
+Trending pages by exponentially decayed view counts.
+
+Forward decay: a view at time ``t`` adds ``exp(rate * (t - landmark))`` to
+its page's score, so every view weighs exponentially more than the views
+one half-life before it, yet no stored score ever needs decaying. A view
+is one addition plus an update of the top-K.
+
+Since scores only grow, a min-heap of the K best pages per type, indexed by
+page id, stays exact: a view either moves a heap entry down or, if the
+page now beats the smallest entry, replaces it. Both are O(log K).
+
+When the weights grow large the landmark moves forward and all scores are
+scaled down together, which keeps their order; pages whose score has
+decayed to almost nothing are dropped then, so memory follows the pages
+viewed recently. A type holding ``max_scores`` pages also drops its lower
+half of scores before adding another page. The scores are saved to ``trending`` periodically and
+restored at startup.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRENDING_ID = "trending"
+TRENDING_SIZE = 50
+HALF_LIFE = 6 * 60 * 60
+# Move the landmark once views weigh e**20 times more than at the landmark
+RESCALE_EXPONENT = 20.0
+# Pages below this many (decayed) views are forgotten when rescaling
+MIN_SCORE = 0.01
+# Scores kept per page type in memory and in a snapshot
+MAX_SCORES = 10000
+SNAPSHOT_SIZE = MAX_SCORES
+
+
+class TopK:
+    """The ``size`` largest scores, in a min-heap indexed by key; scores may only grow."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._heap: List[list] = []  # [score, key]
+        self._index: Dict[str, int] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def offer(self, key: str, score: float) -> None:
+        heap = self._heap
+        position = self._index.get(key)
+        if position is not None:
+            heap[position][0] = score
+            self._sift_down(position)
+        elif len(heap) < self.size:
+            heap.append([score, key])
+            self._index[key] = len(heap) - 1
+            self._sift_up(len(heap) - 1)
+        elif score > heap[0][0]:
+            del self._index[heap[0][1]]
+            heap[0] = [score, key]
+            self._index[key] = 0
+            self._sift_down(0)
+
+    def scale(self, factor: float) -> None:
+        for entry in self._heap:
+            entry[0] *= factor
+
+    def items(self) -> List[Tuple[str, float]]:
+        """(key, score) pairs, highest score first."""
+        return [(key, score) for score, key in sorted(self._heap, key=lambda entry: (-entry[0], entry[1]))]
+
+    def _swap(self, i: int, j: int) -> None:
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._index[heap[i][1]] = i
+        self._index[heap[j][1]] = j
+
+    def _sift_up(self, position: int) -> None:
+        heap = self._heap
+        while position:
+            parent = (position - 1) >> 1
+            if heap[parent][0] <= heap[position][0]:
+                break
+            self._swap(position, parent)
+            position = parent
+
+    def _sift_down(self, position: int) -> None:
+        heap, size = self._heap, len(self._heap)
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if heap[position][0] <= heap[child][0]:
+                break
+            self._swap(position, child)
+            position = child
+
+
+class Trending:
+    """Decayed view scores per page type with their top-K."""
+
+    def __init__(self, collection, half_life: float = HALF_LIFE, size: int = TRENDING_SIZE,
+                 interval: float = 60.0, clock=time.time, max_scores: int = MAX_SCORES):
+        self.collection = collection
+        self.rate = math.log(2) / half_life
+        self.size = size
+        # Never below twice the top-K, so pruning keeps every top page
+        self.max_scores = max(max_scores, 2 * size)
+        self.interval = interval
+        self.clock = clock
+        self._landmark = clock()
+        self._scores: Dict[str, Dict[str, float]] = {}
+        self._top: Dict[str, TopK] = {}
+        self._task = None
+
+    def record(self, page_type: str, page_id: str, weight: float = 1.0, now: Optional[float] = None) -> None:
+        """Count a view of a page."""
+        now = self.clock() if now is None else now
+        exponent = self.rate * (now - self._landmark)
+        if exponent > RESCALE_EXPONENT:
+            self._rescale(now)
+            exponent = 0.0
+        scores = self._scores.get(page_type)
+        if scores is None:
+            scores = self._scores[page_type] = {}
+            self._top[page_type] = TopK(self.size)
+        elif page_id not in scores and len(scores) >= self.max_scores:
+            self._prune(scores)
+        score = scores.get(page_id, 0.0) + weight * math.exp(exponent)
+        scores[page_id] = score
+        self._top[page_type].offer(page_id, score)
+
+    def _rescale(self, now: float) -> None:
+        factor = math.exp(-self.rate * (now - self._landmark))
+        self._landmark = now
+        for page_type, scores in self._scores.items():
+            top = self._top[page_type]
+            top.scale(factor)
+            for page_id in list(scores):
+                score = scores[page_id] * factor
+                if score < MIN_SCORE and page_id not in top:
+                    del scores[page_id]
+                else:
+                    scores[page_id] = score
+
+    def _prune(self, scores: Dict[str, float]) -> None:
+        keep = heapq.nlargest(self.max_scores // 2, scores.items(), key=lambda item: item[1])
+        scores.clear()
+        scores.update(keep)
+
+    def top(self, page_type: str, limit: int, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """The ``limit`` trending pages of a type with their views decayed to ``now``."""
+        top = self._top.get(page_type)
+        if top is None:
+            return []
+        now = self.clock() if now is None else now
+        decay = math.exp(-self.rate * (now - self._landmark))
+        return [(page_id, score * decay) for page_id, score in top.items()[:limit]]
+
+    async def snapshot(self) -> None:
+        doc = {
+            "landmark": self._landmark,
+            "scores": {
+                page_type: heapq.nlargest(SNAPSHOT_SIZE, ([page_id, score] for page_id, score in scores.items()),
+                                          key=lambda entry: entry[1])
+                for page_type, scores in self._scores.items()
+            },
+        }
+        await self.collection.replace_one({"_id": TRENDING_ID}, doc, upsert=True)
+
+    async def restore(self) -> None:
+        """Load the last snapshot, if any."""
+        doc = await self.collection.find_one({"_id": TRENDING_ID})
+        if doc is None:
+            return
+        self._landmark = doc["landmark"]
+        self._scores, self._top = {}, {}
+        for page_type, entries in doc.get("scores", {}).items():
+            for page_id, score in entries:
+                self.record(page_type, page_id, weight=score, now=self._landmark)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.snapshot()
+            except Exception:
+                logger.exception("Failed to save trending scores")
+
+    def start(self) -> None:
+        """Start the periodic snapshots."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the snapshots and save a last one."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.snapshot()
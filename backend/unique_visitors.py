@@ -0,0 +1,206 @@
+"""
+Approximate unique visitors per page and for the whole site.
+
+Each tracked view adds a hash of the visitor's address and user agent to
+a HyperLogLog sketch of its page and to the site-wide sketch. Sketches are
+buffered in memory and merged into the stored ones periodically: a page's
+sketch lives in the ``visitors`` field of its ``page_views`` document and
+the site-wide one on the ``analytics_counters`` totals document.
+
+MongoDB can't merge the binary sketches itself, so each write only applies
+if the stored sketch is still the one that was read. Pages written
+meanwhile by another process keep their buffered sketch for the next
+flush; merging is idempotent, so a retry never counts anyone twice.
+
+Every buffered page sketch takes 4 KiB, so once ``max_pending`` pages are
+buffered a flush starts early instead of waiting for the interval.
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from analytics_counters import COUNTERS_ID
+from hyperloglog import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+PageKey = Tuple[str, str]  # (page_type, page_id)
+
+DEFAULT_MAX_PENDING = 2000
+
+
+def visitor_fingerprint(address: str, user_agent: str, key: bytes = b"") -> int:
+    """64-bit keyed hash of a visitor; the address itself is never stored."""
+    digest = hashlib.blake2b(f"{address}\n{user_agent}".encode(), digest_size=8, key=key).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _merged(sketch: HyperLogLog, stored: Optional[bytes]) -> HyperLogLog:
+    merged = HyperLogLog(sketch.precision, sketch.registers)
+    if stored is not None:
+        merged.merge(HyperLogLog.from_bytes(stored))
+    return merged
+
+
+class UniqueVisitors:
+    """Buffered HyperLogLog sketches of page visitors."""
+
+    def __init__(self, db, interval: float = 30.0, max_pending: int = DEFAULT_MAX_PENDING):
+        self.db = db
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[PageKey, HyperLogLog] = {}
+        self._site: Optional[HyperLogLog] = None
+        self._flush_lock = asyncio.Lock()
+        self._early_flush = None
+        self._task = None
+
+    def record(self, page_type: str, page_id: str, fingerprint: int) -> None:
+        """Count a visitor of a page."""
+        sketch = self._pending.get((page_type, page_id))
+        if sketch is None:
+            sketch = self._pending[(page_type, page_id)] = HyperLogLog()
+            if len(self._pending) >= self.max_pending and self._early_flush is None:
+                self._early_flush = asyncio.create_task(self._flush_early())
+        sketch.add(fingerprint)
+        if self._site is None:
+            self._site = HyperLogLog()
+        self._site.add(fingerprint)
+
+    def _requeue(self, key: PageKey, sketch: HyperLogLog) -> None:
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = sketch
+        else:
+            pending.merge(sketch)
+
+    def _requeue_site(self, site: HyperLogLog) -> None:
+        if self._site is None:
+            self._site = site
+        else:
+            self._site.merge(site)
+
+    async def _stored(self, page_type: str, page_ids: List[str]) -> Dict[str, bytes]:
+        docs = await self.db.page_views.find(
+            {"page_type": page_type, "page_id": {"$in": page_ids}, "visitors": {"$exists": True}},
+            {"_id": 0, "page_id": 1, "visitors": 1}
+        ).to_list(len(page_ids))
+        return {doc["page_id"]: doc["visitors"] for doc in docs}
+
+    async def _flush_pages(self, pending: Dict[PageKey, HyperLogLog]) -> None:
+        by_type: Dict[str, List[str]] = {}
+        for page_type, page_id in pending:
+            by_type.setdefault(page_type, []).append(page_id)
+        keys, operations = [], []
+        now = datetime.utcnow()
+        try:
+            for page_type, page_ids in by_type.items():
+                stored = await self._stored(page_type, page_ids)
+                for page_id in page_ids:
+                    old = stored.get(page_id)
+                    keys.append((page_type, page_id))
+                    operations.append(UpdateOne(
+                        # A sketch changed since it was read fails the filter, and the
+                        # upsert then fails on the unique page index
+                        {"page_type": page_type, "page_id": page_id, "visitors": old},
+                        {
+                            "$set": {"visitors": _merged(pending[(page_type, page_id)], old).to_bytes()},
+                            "$setOnInsert": {"created_at": now}
+                        },
+                        upsert=True
+                    ))
+            await self.db.page_views.bulk_write(operations, ordered=False)
+        except BulkWriteError as error:
+            failed = {keys[write_error["index"]] for write_error in error.details.get("writeErrors", [])}
+            for key in failed:
+                self._requeue(key, pending[key])
+        except Exception:
+            for key, sketch in pending.items():
+                self._requeue(key, sketch)
+            raise
+
+    async def _flush_site(self, site: HyperLogLog) -> None:
+        try:
+            doc = await self.db.analytics_counters.find_one({"_id": COUNTERS_ID}, {"_id": 0, "visitors": 1})
+            old = (doc or {}).get("visitors")
+            await self.db.analytics_counters.update_one(
+                {"_id": COUNTERS_ID, "visitors": old},
+                {"$set": {"visitors": _merged(site, old).to_bytes()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Written meanwhile by another process; retried on the next flush
+            self._requeue_site(site)
+        except Exception:
+            self._requeue_site(site)
+            raise
+
+    async def flush(self) -> None:
+        """Merge the buffered sketches into the stored ones."""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            site, self._site = self._site, None
+            if pending:
+                await self._flush_pages(pending)
+            if site is not None:
+                await self._flush_site(site)
+
+    async def _flush_early(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Failed to save visitor sketches")
+        finally:
+            self._early_flush = None
+
+    async def estimate(self, page_type: str, page_ids: Iterable[str]) -> Dict[str, int]:
+        """Approximate unique visitors of the given pages, counting buffered views."""
+        page_ids = list(page_ids)
+        stored = await self._stored(page_type, page_ids) if page_ids else {}
+        estimates = {}
+        for page_id in page_ids:
+            sketch = self._pending.get((page_type, page_id))
+            if sketch is not None:
+                estimates[page_id] = _merged(sketch, stored.get(page_id)).count()
+            else:
+                estimates[page_id] = HyperLogLog.from_bytes(stored[page_id]).count() if page_id in stored else 0
+        return estimates
+
+    async def site_estimate(self) -> int:
+        """Approximate unique visitors of the whole site."""
+        doc = await self.db.analytics_counters.find_one({"_id": COUNTERS_ID}, {"_id": 0, "visitors": 1})
+        stored = (doc or {}).get("visitors")
+        if self._site is not None:
+            return _merged(self._site, stored).count()
+        return HyperLogLog.from_bytes(stored).count() if stored else 0
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to save visitor sketches")
+
+    def start(self) -> None:
+        """Start the periodic flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush task and save everything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._early_flush is not None:
+            await self._early_flush
+        await self.flush()
@@ -0,0 +1,139 @@
+"""
+Reference counts of stored images, and collection of the unused ones.
+
+Every article or breed whose ``image_url`` points at a stored image is
+listed in that image's ``refs`` in the ``upload_refs`` collection (as
+``"article:<id>"`` or ``"breed:<id>"``), so one image can be shared by
+several pages. An image is only deleted once no page refers to it.
+
+Images nobody refers to are removed by ``collect_orphans()``. It walks the
+blob store one shard directory at a time and checks each shard's images
+with one query, so memory stays flat however many images there are. Fresh
+uploads get a grace period, since the page that will use them is usually
+saved a little later.
+"""
+import asyncio
+import logging
+import re
+import time
+from typing import Iterable, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from utils.file_upload import blob_shards, remove_blob, scan_shard
+
+logger = logging.getLogger(__name__)
+
+# Resized derivatives ("<hash>-<width>w.webp") belong to their source image
+_BLOB_URL_RE = re.compile(r"/api/uploads/blobs/[0-9a-f]{2}/([0-9a-f]{64})(?:-[0-9]+w)?\.[a-z]+$")
+
+# Unreferenced images younger than this are kept
+ORPHAN_GRACE = 24 * 60 * 60
+
+
+def blob_id(url: Optional[str]) -> Optional[str]:
+    """Content hash of a stored image (or derivative) URL; None for other URLs."""
+    if not url:
+        return None
+    match = _BLOB_URL_RE.search(url)
+    return match.group(1) if match else None
+
+
+class UploadRefs:
+    """Which articles and breeds use which stored image."""
+
+    def __init__(self, collection, grace: float = ORPHAN_GRACE, interval: float = 6 * 60 * 60):
+        self.collection = collection
+        self.grace = grace
+        self.interval = interval
+        self._task = None
+
+    async def replace(self, owner: str, old_url: Optional[str], new_url: Optional[str]) -> None:
+        """Move ``owner``'s reference from the image at ``old_url`` to the one at ``new_url``."""
+        old, new = blob_id(old_url), blob_id(new_url)
+        if old == new:
+            return
+        if new is not None:
+            await self.collection.update_one({"id": new}, {"$addToSet": {"refs": owner}}, upsert=True)
+        if old is not None:
+            await self.collection.update_one({"id": old}, {"$pull": {"refs": owner}})
+
+    async def replace_many(self, changes: Iterable[Tuple[str, Optional[str], Optional[str]]]) -> None:
+        """replace() for many ``(owner, old_url, new_url)`` changes in one bulk write."""
+        added, pulled = [], []
+        for owner, old_url, new_url in changes:
+            old, new = blob_id(old_url), blob_id(new_url)
+            if old == new:
+                continue
+            if new is not None:
+                added.append(UpdateOne({"id": new}, {"$addToSet": {"refs": owner}}, upsert=True))
+            if old is not None:
+                pulled.append(UpdateOne({"id": old}, {"$pull": {"refs": owner}}))
+        if added or pulled:
+            # New references first, so a failure never leaves an image in use unreferenced
+            await self.collection.bulk_write(added + pulled, ordered=True)
+
+    async def count(self, blob: str) -> int:
+        doc = await self.collection.find_one({"id": blob}, {"_id": 0, "refs": 1})
+        return len(doc.get("refs", [])) if doc else 0
+
+    async def forget(self, blob: str) -> bool:
+        """Drop the record of an unreferenced image; False while something still uses it."""
+        if await self.count(blob):
+            return False
+        await self.collection.delete_one({"id": blob, "refs": {"$size": 0}})
+        return True
+
+    async def collect_orphans(self) -> dict:
+        """Delete stored images that nothing refers to and that are older than the grace period."""
+        cutoff = time.time() - self.grace
+        scanned = removed = 0
+        for shard in await asyncio.to_thread(blob_shards):
+            blobs, partials = await asyncio.to_thread(scan_shard, shard)
+            scanned += len(blobs)
+            # Uploads interrupted by a crash
+            stale = [path for path, mtime in partials if mtime < cutoff]
+            candidates = {blob: path for blob, path, mtime in blobs if mtime < cutoff}
+            if candidates:
+                cursor = self.collection.find(
+                    {"id": {"$in": list(candidates)}, "refs.0": {"$exists": True}}, {"_id": 0, "id": 1}
+                )
+                for doc in await cursor.to_list(len(candidates)):
+                    candidates.pop(doc["id"], None)
+                if candidates:
+                    await self.collection.delete_many({"id": {"$in": list(candidates)}, "refs": {"$size": 0}})
+            if candidates or stale:
+                await asyncio.to_thread(_remove_all, list(candidates.values()), stale)
+            removed += len(candidates)
+        return {"scanned": scanned, "removed": removed}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                stats = await self.collect_orphans()
+                if stats["removed"]:
+                    logger.info("Removed unused uploads: %s", stats)
+            except Exception:
+                logger.exception("Failed to collect unused uploads")
+
+    def start(self) -> None:
+        """Start the periodic orphan collection."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _remove_all(blobs, partials) -> None:
+    for path in blobs:
+        remove_blob(path)
+    for path in partials:
+        path.unlink(missing_ok=True)
@@ -1,48 +1,282 @@
-# Импортируем только то, что необходимо для заглушки
+"""
+Content-addressed image storage under UPLOADS_DIR.
+
+Uploads are copied to disk in CHUNK_SIZE pieces with the file writes and
+hashing run in a worker thread, so the event loop never waits on the disk,
+and the copy is abandoned as soon as it passes MAX_FILE_SIZE. The format
+comes from the file's magic bytes rather than its name or content type.
+
+Each image is stored once, as ``blobs/<ab>/<sha256>.<ext>``: uploading the
+same photo again reuses the stored file, and since a name never changes
+content the files can be cached forever. Files are written to a temporary
+name and renamed into place, so a half-written upload is never served.
+Resized WebP derivatives are made afterwards, see image_derivatives.py.
+"""
+import asyncio
+import hashlib
 import os
+import re
+import struct
 import uuid
-import shutil
 from pathlib import Path
 from fastapi import UploadFile, HTTPException, status
-from typing import Optional
+from typing import List, Optional, Tuple
 
-# Создаем папку uploads, используя гарантированный путь Render
-UPLOADS_DIR = Path("/opt/render/project/src/backend/uploads")
-UPLOADS_DIR.mkdir(exist_ok=True)
+from utils.image_derivatives import InvalidImage, create_derivatives
+
+# Uploaded files, served under /api/uploads
+UPLOADS_DIR = Path(os.environ.get("UPLOADS_DIR", "/opt/render/project/src/backend/uploads"))
+UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
 
-# Ограничения (не используются, так как Pillow удален)
-ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
+# Bytes read from the upload and written to disk at a time
+CHUNK_SIZE = 256 * 1024
+
+# Folder names become directories under UPLOADS_DIR
+_FOLDER_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Temporary files start with this; they never match a served name
+_PARTIAL_PREFIX = ".partial-"
+
+# Uploads stored by content hash, sharded by the first two hex digits
+BLOBS_FOLDER = "blobs"
+_BLOB_NAME_RE = re.compile(r"^([0-9a-f]{64})\.[a-z]+$")
+
+
 def validate_image(file: UploadFile) -> None:
-    # Валидация пропускается, чтобы избежать конфликта с Pillow
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File must be an image"
         )
 
+
+def sniff_image(header: bytes) -> Optional[Tuple[str, str]]:
+    """(format, extension) of an image from its first bytes, or None."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "JPEG", ".jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG", ".png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF", ".gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "WEBP", ".webp"
+    return None
+
+
+def image_size(header: bytes, image_format: str) -> Tuple[Optional[int], Optional[int]]:
+    """Width and height read from the image header, or (None, None)."""
+    try:
+        if image_format == "PNG":
+            return struct.unpack(">II", header[16:24])
+        if image_format == "GIF":
+            return struct.unpack("<HH", header[6:10])
+        if image_format == "WEBP":
+            chunk = header[12:16]
+            if chunk == b"VP8X":
+                width, height = (int.from_bytes(header[24:27], "little") + 1,
+                                 int.from_bytes(header[27:30], "little") + 1)
+                return width, height
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", header[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(header[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if image_format == "JPEG":
+            # Walk the segments up to the start-of-frame marker
+            position = 2
+            while position + 9 < len(header):
+                if header[position] != 0xFF:
+                    break
+                marker = header[position + 1]
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack(">HH", header[position + 5:position + 9])
+                    return width, height
+                position += 2 + struct.unpack(">H", header[position + 2:position + 4])[0]
+    except struct.error:
+        pass
+    return None, None
+
+
+def _folder_path(folder: str) -> Path:
+    if not _FOLDER_RE.match(folder):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid folder name")
+    return UPLOADS_DIR / folder
+
+
+def _open_partial(directory: Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{_PARTIAL_PREFIX}{uuid.uuid4().hex}"
+    return path, open(path, "wb")
+
+
+def _write_chunk(handle, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+def _commit(handle, partial: Path, destination: Path) -> bool:
+    """Move the finished upload into place; False if the same content is stored already."""
+    if destination.exists():
+        handle.close()
+        partial.unlink(missing_ok=True)
+        # A fresh modification time keeps the orphan collector off a re-uploaded file
+        os.utime(destination)
+        return False
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(partial, destination)
+    return True
+
+
+def _discard(handle, partial: Path) -> None:
+    handle.close()
+    partial.unlink(missing_ok=True)
+
+
 async def save_upload_file(file: UploadFile, folder: str = "general") -> dict:
-    """Заглушка: сохранить файл без Pillow и вернуть фейковые данные."""
-    
-    # Генерация уникального имени
-    unique_filename = f"{uuid.uuid4()}.png"
-    
-    # Возвращаем информацию о файле
+    """Store an uploaded image and return its URL and metadata.
+
+    Raises 400 for anything that is not a JPEG, PNG, GIF or WebP image and
+    413 once the upload passes MAX_FILE_SIZE. ``derivatives`` lists the
+    resized WebP copies (empty without Pillow), and ``deduplicated`` is True
+    if the image was stored already. ``folder`` is only validated; images
+    are shared between folders.
+    """
+    validate_image(file)
+    _folder_path(folder)
+    directory = UPLOADS_DIR / BLOBS_FOLDER
+
+    header = await file.read(CHUNK_SIZE)
+    sniffed = sniff_image(header)
+    if sniffed is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported image format"
+        )
+    image_format, extension = sniffed
+
+    partial, handle = await asyncio.to_thread(_open_partial, directory)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        chunk = header
+        while chunk:
+            size += len(chunk)
+            if size > MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File is larger than {MAX_FILE_SIZE // (1024 * 1024)}MB"
+                )
+            await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+            chunk = await file.read(CHUNK_SIZE)
+        content_hash = digest.hexdigest()
+        unique_filename = f"{content_hash}{extension}"
+        destination = blob_path(unique_filename)
+        stored = await asyncio.to_thread(_commit, handle, partial, destination)
+    except BaseException:
+        # Also on cancellation, e.g. when the client disconnects
+        await asyncio.shield(asyncio.to_thread(_discard, handle, partial))
+        raise
+
+    width, height = image_size(header, image_format)
+    derivatives = []
+    try:
+        rendered = await create_derivatives(destination)
+    except InvalidImage:
+        if stored:
+            await asyncio.to_thread(_remove_with_derivatives, destination)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid image file"
+        )
+    if rendered is not None:
+        width, height = rendered["width"], rendered["height"]
+        derivatives = [
+            {"width": derivative["width"], "height": derivative["height"],
+             "url": blob_url(derivative["filename"])}
+            for derivative in rendered["derivatives"]
+        ]
     return {
         "filename": unique_filename,
-        "path": "/dev/null", # Путь-заглушка
-        "url": f"/api/uploads/{folder}/{unique_filename}",
-        "width": 800, # Заглушка
-        "height": 600, # Заглушка
-        "format": "PNG",
-        "size": 1024
+        "path": str(destination),
+        "url": blob_url(unique_filename),
+        "hash": content_hash,
+        "width": width,
+        "height": height,
+        "format": image_format,
+        "size": size,
+        "derivatives": derivatives,
+        "deduplicated": not stored
     }
 
+
+def blob_path(filename: str) -> Path:
+    return UPLOADS_DIR / BLOBS_FOLDER / filename[:2] / filename
+
+
+def blob_url(filename: str) -> str:
+    return f"/api/uploads/{BLOBS_FOLDER}/{filename[:2]}/{filename}"
+
+
+def blob_shards() -> List[Path]:
+    """Directories of the blob store: the shards, and the root where uploads are staged."""
+    root = UPLOADS_DIR / BLOBS_FOLDER
+    if not root.is_dir():
+        return []
+    return [root, *sorted(entry for entry in root.iterdir() if entry.is_dir())]
+
+
+def scan_shard(shard: Path) -> Tuple[List[Tuple[str, Path, float]], List[Tuple[Path, float]]]:
+    """Stored images as (hash, path, mtime), and leftover partial files as (path, mtime)."""
+    blobs, partials = [], []
+    with os.scandir(shard) as entries:
+        for entry in entries:
+            match = _BLOB_NAME_RE.match(entry.name)
+            if match:
+                blobs.append((match.group(1), Path(entry.path), entry.stat().st_mtime))
+            elif entry.name.startswith(_PARTIAL_PREFIX):
+                partials.append((Path(entry.path), entry.stat().st_mtime))
+    return blobs, partials
+
+
+def remove_blob(path: Path) -> None:
+    """Delete a stored image and its derivatives."""
+    _remove_with_derivatives(path)
+
+
+def _upload_path(file_path: str) -> Optional[Path]:
+    """The file under UPLOADS_DIR that a URL or relative path names, or None."""
+    relative = file_path.split("/api/uploads/", 1)[-1].lstrip("/")
+    path = (UPLOADS_DIR / relative).resolve()
+    root = UPLOADS_DIR.resolve()
+    if root not in path.parents or path.name.startswith(_PARTIAL_PREFIX):
+        return None
+    return path
+
+
+def _remove_with_derivatives(path: Path) -> None:
+    path.unlink(missing_ok=True)
+    for derivative in path.parent.glob(f"{path.stem}-*w.webp"):
+        derivative.unlink(missing_ok=True)
+
+
 def delete_file(file_path: str) -> bool:
-    """Заглушка: всегда возвращает True."""
+    """Delete an uploaded file and its derivatives by URL or path relative to UPLOADS_DIR.
+
+    Returns False if there is no such file.
+    """
+    path = _upload_path(file_path)
+    if path is None or not path.is_file():
+        return False
+    _remove_with_derivatives(path)
     return True
 
+
 def get_file_url(filename: str, folder: str = "general") -> str:
     """Генерация URL для загруженного файла."""
     return f"/api/uploads/{folder}/{filename}"
@@ -0,0 +1,109 @@
+"""
+Resized WebP copies of uploaded images for responsive ``srcset``s.
+
+Decoding and encoding are CPU bound, so they run in a process pool and
+never hold up the event loop (a thread would still hold the GIL for much
+of the work). Derivatives need Pillow; with ``IMAGE_WIDTHS`` set empty
+uploads are stored as they are and Pillow is not needed.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - checked by check_pillow()
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Widths of the WebP derivatives; larger ones than the original are skipped. Empty: none
+DERIVATIVE_WIDTHS = tuple(int(width) for width in os.environ.get("IMAGE_WIDTHS", "320,640,1280").split(",") if width.strip())
+WEBP_QUALITY = 80
+
+# Images with more pixels are rejected instead of decoded
+MAX_IMAGE_PIXELS = 40_000_000
+
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", "2"))
+
+# Created on first use, so importing the module starts no processes
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class InvalidImage(ValueError):
+    """The upload could not be decoded as an image."""
+
+
+def derivative_name(stem: str, width: int) -> str:
+    return f"{stem}-{width}w.webp"
+
+
+def render_derivatives(source: str, widths: List[int] = DERIVATIVE_WIDTHS) -> dict:
+    """Decode ``source`` and write its WebP derivatives next to it.
+
+    Runs in a worker process. Returns the real size of the image and the
+    derivatives written as ``{"width", "height", "filename"}``.
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    path = Path(source)
+    try:
+        with Image.open(path) as opened:
+            # Phone photos are often stored sideways with an EXIF rotation
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as error:
+        raise InvalidImage(str(error)) from None
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or "A" in image.getbands() else "RGB")
+
+    width, height = image.size
+    # Smaller originals still get one WebP copy at their own width
+    targets = sorted({min(target, width) for target in widths})
+    derivatives = []
+    for target in targets:
+        size = (target, max(1, round(height * target / width)))
+        filename = derivative_name(path.stem, target)
+        # Uploads are stored by content hash, so existing derivatives are current
+        if not path.with_name(filename).exists():
+            resized = image if target == width else image.resize(size, Image.LANCZOS)
+            partial = path.with_name(f".partial-{uuid.uuid4().hex}-{filename}")
+            resized.save(partial, "WEBP", quality=WEBP_QUALITY, method=4)
+            os.replace(partial, path.with_name(filename))
+        derivatives.append({"width": size[0], "height": size[1], "filename": filename})
+    return {"width": width, "height": height, "derivatives": derivatives}
+
+
+def check_pillow() -> None:
+    """Raise unless derivatives are disabled or Pillow is installed."""
+    if DERIVATIVE_WIDTHS and Image is None:
+        raise RuntimeError("Image derivatives need Pillow: install it or set IMAGE_WIDTHS to an empty value")
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _pool
+
+
+async def create_derivatives(source: Path) -> Optional[dict]:
+    """render_derivatives() in the process pool; None when derivatives are disabled.
+
+    Raises InvalidImage if the file does not decode.
+    """
+    if not DERIVATIVE_WIDTHS:
+        return None
+    check_pillow()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), render_derivatives, str(source))
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,238 @@
+"""
+Write-behind page view counter for PetsLib.
+
+Page hits are aggregated in memory and flushed to MongoDB as a single
+unordered ``bulk_write`` of ``$inc`` upserts, either on a timer or when
+the number of buffered hits reaches a threshold. A crash loses at most
+the hits buffered since the last flush. Persisted totals are cached for
+the ``max_cached`` most recently used pages.
+"""
+import asyncio
+import contextlib
+import inspect
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+PageKey = Tuple[str, str]  # (page_type, page_id)
+
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+DEFAULT_MAX_PENDING = 1000  # buffered hits before an early flush
+DEFAULT_MAX_CACHED = 50_000  # pages whose persisted total is kept in memory
+
+
+class ViewCounter:
+    """Buffers page view increments and answers from a running total."""
+
+    def __init__(self, collection, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_pending: int = DEFAULT_MAX_PENDING, max_cached: int = DEFAULT_MAX_CACHED):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_cached = max_cached
+        self._pending: Dict[PageKey, int] = {}
+        self._pending_hits = 0
+        # Increments a flush is writing; counted by the reads until the write is done
+        self._in_flight: Dict[PageKey, int] = {}
+        # Views already persisted in MongoDB for recently seen pages, least recently used first
+        self._persisted: "OrderedDict[PageKey, int]" = OrderedDict()
+        # Odd while a flush is writing; a base load that overlaps a flush is re-read
+        self._flush_epoch = 0
+        self._flush_lock = asyncio.Lock()
+        self._loading: Dict[PageKey, asyncio.Future] = {}
+        self._timer_task = None
+        self._flush_task = None
+        self._listeners: List[Callable] = []
+        self._flush_guard: Callable = contextlib.nullcontext
+
+    def add_listener(self, callback: Callable) -> None:
+        """Call ``callback(increments)`` after every successful flush.
+
+        ``increments`` maps (page_type, page_id) to the views just written.
+        The callback may be a coroutine function.
+        """
+        self._listeners.append(callback)
+
+    def guard_flushes(self, guard: Callable) -> None:
+        """Run every flush, write and listeners, inside ``async with guard()``."""
+        self._flush_guard = guard
+
+    async def record(self, page_type: str, page_id: str) -> int:
+        """Count one view and return the page's current total."""
+        key = (page_type, page_id)
+        self._pending[key] = self._pending.get(key, 0) + 1
+        self._pending_hits += 1
+
+        if self._pending_hits >= self.max_pending and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_soon())
+
+        while key not in self._persisted:
+            await self._load(key)
+        self._persisted.move_to_end(key)
+        return self._total(key)
+
+    async def get(self, page_type: str, page_id: str) -> int:
+        """Return the current total for a page without counting a view."""
+        key = (page_type, page_id)
+        while key not in self._persisted:
+            await self._load(key)
+        self._persisted.move_to_end(key)
+        return self._total(key)
+
+    async def get_many(self, page_type: str, page_ids: List[str]) -> Dict[str, int]:
+        """Return the current totals for several pages, reading unseen ones in one query."""
+        while True:
+            unseen = [page_id for page_id in page_ids if (page_type, page_id) not in self._persisted]
+            if not unseen:
+                break
+            await self._load_many(page_type, unseen)
+        return {page_id: self._total((page_type, page_id)) for page_id in page_ids}
+
+    def _total(self, key: PageKey) -> int:
+        return self._persisted[key] + self._in_flight.get(key, 0) + self._pending.get(key, 0)
+
+    async def _load_many(self, page_type: str, page_ids: List[str]) -> None:
+        while True:
+            epoch = self._flush_epoch
+            if epoch % 2:
+                async with self._flush_lock:
+                    continue
+            docs = await self.collection.find(
+                {"page_type": page_type, "page_id": {"$in": page_ids}},
+                {"_id": 0, "page_id": 1, "views": 1}
+            ).to_list(len(page_ids))
+            if epoch == self._flush_epoch:
+                break
+        views = {doc["page_id"]: doc.get("views", 0) for doc in docs}
+        for page_id in page_ids:
+            # A page loaded meanwhile by _load() read the same persisted total
+            if (page_type, page_id) not in self._persisted:
+                self._remember((page_type, page_id), views.get(page_id, 0))
+
+    def _remember(self, key: PageKey, views: int) -> None:
+        self._persisted[key] = views
+        if len(self._persisted) > self.max_cached:
+            # Evicted pages are read again when next viewed
+            self._persisted.popitem(last=False)
+
+    async def _load(self, key: PageKey) -> None:
+        """Read the persisted total for a page, once per page."""
+        loading = self._loading.get(key)
+        if loading is not None:
+            await loading
+            return
+
+        loading = self._loading[key] = asyncio.get_running_loop().create_future()
+        try:
+            while True:
+                epoch = self._flush_epoch
+                if epoch % 2:
+                    async with self._flush_lock:
+                        continue
+                doc = await self.collection.find_one(
+                    {"page_type": key[0], "page_id": key[1]},
+                    {"_id": 0, "views": 1}
+                )
+                # A flush that overlapped the read may or may not be included in it
+                if epoch == self._flush_epoch:
+                    break
+            self._remember(key, doc.get("views", 0) if doc else 0)
+        finally:
+            # Waiters retry on their own if the read failed
+            del self._loading[key]
+            loading.set_result(None)
+
+    async def _flush_soon(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Failed to flush page views")
+        finally:
+            self._flush_task = None
+
+    async def flush(self) -> int:
+        """Write buffered increments to MongoDB; return the number of hits written."""
+        async with self._flush_guard():
+            return await self._flush()
+
+    async def _flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            hits, self._pending_hits = self._pending_hits, 0
+            self._in_flight = pending
+
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {"page_type": page_type, "page_id": page_id},
+                    {
+                        "$inc": {"views": count},
+                        "$set": {"updated_at": now},
+                        "$setOnInsert": {
+                            "page_type": page_type,
+                            "page_id": page_id,
+                            "created_at": now
+                        }
+                    },
+                    upsert=True
+                )
+                for (page_type, page_id), count in pending.items()
+            ]
+            self._flush_epoch += 1
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+            except Exception:
+                # Put the increments back so the next flush retries them
+                for key, count in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + count
+                self._pending_hits += hits
+                raise
+            finally:
+                self._in_flight = {}
+                self._flush_epoch += 1
+
+            for key, count in pending.items():
+                if key in self._persisted:
+                    self._persisted[key] += count
+
+        for callback in self._listeners:
+            try:
+                result = callback(pending)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception("Page view flush listener failed")
+        return hits
+
+    async def _run_timer(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush page views")
+
+    def start(self) -> None:
+        """Start the periodic flush task."""
+        if self._timer_task is None:
+            self._timer_task = asyncio.create_task(self._run_timer())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush task and write everything still buffered."""
+        if self._timer_task is not None:
+            self._timer_task.cancel()
+            try:
+                await self._timer_task
+            except asyncio.CancelledError:
+                pass
+            self._timer_task = None
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.flush()
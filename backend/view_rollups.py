@@ -0,0 +1,173 @@
+"""
+Page views over time, in hourly and daily buckets.
+
+Every page view flush adds its counts to one bucket per page and hour in
+``view_buckets_hourly`` (plus a per-type total with ``page_id: None``), so
+the buckets are written with a single bulk ``$inc`` and no raw hits are
+stored. Hourly buckets expire through a TTL index after
+``HOURLY_RETENTION``.
+
+``compact()`` rolls the finished hours up into ``view_buckets_daily``.
+Each run recomputes whole days from the hourly buckets and ``$merge``s
+them, so it can be re-run or interrupted safely; ``view_rollup_state``
+records how far it got. Time series and trending pages read only these
+buckets.
+
+``$dateTrunc`` needs MongoDB 5.0 or later.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from leaderboard import with_content
+
+logger = logging.getLogger(__name__)
+
+# Hourly buckets older than this are removed by the TTL index (see create_indexes.py)
+HOURLY_RETENTION = timedelta(days=8)
+ROLLUP_STATE_ID = "views"
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def hour_floor(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def day_floor(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def daily_rollup_pipeline(since: datetime, until: datetime) -> List[dict]:
+    """Sum the hourly buckets in ``[since, until)`` per page and day into view_buckets_daily."""
+    return [
+        {"$match": {"hour": {"$gte": since, "$lt": until}}},
+        {"$group": {
+            "_id": {
+                "page_type": "$page_type", "page_id": "$page_id",
+                "day": {"$dateTrunc": {"date": "$hour", "unit": "day"}},
+            },
+            "views": {"$sum": "$views"},
+        }},
+        {"$project": {
+            "_id": 0, "page_type": "$_id.page_type", "page_id": "$_id.page_id", "day": "$_id.day", "views": 1
+        }},
+        {"$merge": {
+            "into": "view_buckets_daily", "on": ["page_type", "page_id", "day"],
+            "whenMatched": "replace", "whenNotMatched": "insert",
+        }},
+    ]
+
+
+class ViewRollups:
+    """Hourly view buckets from view counter flushes, compacted into daily ones."""
+
+    def __init__(self, db, interval: float = 300.0):
+        self.db = db
+        self.interval = interval
+        self._task = None
+
+    async def add_views(self, increments: Dict[Tuple[str, str], int], now: Optional[datetime] = None) -> None:
+        """View counter flush listener: add the views to this hour's buckets."""
+        hour = hour_floor(now or datetime.utcnow())
+        totals: Dict[str, int] = {}
+        operations = []
+        for (page_type, page_id), count in increments.items():
+            totals[page_type] = totals.get(page_type, 0) + count
+            operations.append(UpdateOne(
+                {"page_type": page_type, "page_id": page_id, "hour": hour}, {"$inc": {"views": count}}, upsert=True
+            ))
+        operations.extend(
+            UpdateOne({"page_type": page_type, "page_id": None, "hour": hour}, {"$inc": {"views": count}}, upsert=True)
+            for page_type, count in totals.items()
+        )
+        if operations:
+            await self.db.view_buckets_hourly.bulk_write(operations, ordered=False)
+
+    async def _compacted_until(self) -> Optional[datetime]:
+        state = await self.db.view_rollup_state.find_one({"_id": ROLLUP_STATE_ID})
+        return state["compacted_until"] if state else None
+
+    async def compact(self, now: Optional[datetime] = None) -> dict:
+        """Roll the finished hours up into daily buckets."""
+        until = hour_floor(now or datetime.utcnow())
+        compacted = await self._compacted_until()
+        # The last day compacted may have gained hours since, so it is redone whole
+        since = day_floor(compacted if compacted is not None else until - HOURLY_RETENTION)
+        cursor = self.db.view_buckets_hourly.aggregate(daily_rollup_pipeline(since, until))
+        await cursor.to_list(None)
+        await self.db.view_rollup_state.update_one(
+            {"_id": ROLLUP_STATE_ID}, {"$set": {"compacted_until": until}}, upsert=True
+        )
+        return {"since": since, "until": until}
+
+    async def timeseries(self, page_type: str, page_id: Optional[str], granularity: str, points: int,
+                         now: Optional[datetime] = None) -> List[dict]:
+        """Views per hour or day for the last ``points`` periods, oldest first.
+
+        ``page_id=None`` gives the total for the page type. Day totals come
+        from the daily buckets, plus the hourly buckets not compacted yet.
+        """
+        step = GRANULARITIES[granularity]
+        floor = hour_floor if granularity == "hour" else day_floor
+        end = floor(now or datetime.utcnow())
+        start = end - step * (points - 1)
+        series = {start + step * i: 0 for i in range(points)}
+        key = {"page_type": page_type, "page_id": page_id}
+
+        if granularity == "hour":
+            hourly_since = start
+        else:
+            compacted = await self._compacted_until()
+            hourly_since = max(compacted or start, start)
+            cursor = self.db.view_buckets_daily.find(
+                {**key, "day": {"$gte": start}}, {"_id": 0, "day": 1, "views": 1}
+            )
+            for bucket in await cursor.to_list(points):
+                if bucket["day"] in series:
+                    series[bucket["day"]] += bucket["views"]
+        cursor = self.db.view_buckets_hourly.find(
+            {**key, "hour": {"$gte": hourly_since}}, {"_id": 0, "hour": 1, "views": 1}
+        )
+        for bucket in await cursor.to_list(None):
+            moment = floor(bucket["hour"])
+            if moment in series:
+                series[moment] += bucket["views"]
+        return [{"time": moment, "views": views} for moment, views in series.items()]
+
+    async def trending(self, page_type: str, days: int, limit: int, now: Optional[datetime] = None) -> List[dict]:
+        """Most viewed pages of ``page_type`` over the last ``days`` compacted days, with their content."""
+        start = day_floor(now or datetime.utcnow()) - timedelta(days=days - 1)
+        cursor = self.db.view_buckets_daily.aggregate([
+            {"$match": {"page_type": page_type, "day": {"$gte": start}, "page_id": {"$ne": None}}},
+            {"$group": {"_id": "$page_id", "views": {"$sum": "$views"}}},
+            {"$sort": {"views": -1, "_id": 1}},
+            # Room for pages whose content was deleted
+            {"$limit": limit * 2},
+            {"$project": {"_id": 0, "page_id": "$_id", "views": 1}},
+        ])
+        return await with_content(self.db, page_type, await cursor.to_list(None), limit)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.compact()
+            except Exception:
+                logger.exception("Failed to compact view buckets")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Compact now and then periodically."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
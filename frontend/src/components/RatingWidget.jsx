@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Star } from 'lucide-react';
 import { rateArticle, getArticleRating } from '../utils/api';
 
-const RatingWidget = ({ articleId }) => {
+const RatingWidget = ({ articleId, initialRating = null }) => {
   const [rating, setRating] = useState(null);
   const [hoveredStar, setHoveredStar] = useState(0);
   const [hasRated, setHasRated] = useState(false);
@@ -14,7 +14,8 @@ const RatingWidget = ({ articleId }) => {
 
   const loadRating = async () => {
     try {
-      const data = await getArticleRating(articleId);
+      // The page bundle already carries the rating
+      const data = initialRating || await getArticleRating(articleId);
       setRating(data);
       // Check if user has already rated (using localStorage)
       const rated = localStorage.getItem(`rated_${articleId}`);
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
-import { getArticle, getArticles, trackPageView } from '../utils/api';
+import { getArticles, getPageBundle } from '../utils/api';
 import { ArrowLeft, Calendar, Clock, User, Tag } from 'lucide-react';
 import RatingWidget from '../components/RatingWidget';
 import Breadcrumbs from '../components/Breadcrumbs';
@@ -10,6 +10,7 @@ const ArticleDetail = () => {
   const { id } = useParams();
   const navigate = useNavigate();
   const [article, setArticle] = useState(null);
+  const [rating, setRating] = useState(null);
   const [relatedArticles, setRelatedArticles] = useState([]);
   const [loading, setLoading] = useState(true);
 
@@ -19,11 +20,11 @@ const ArticleDetail = () => {
 
   const loadArticle = async () => {
     try {
-      const data = await getArticle(id);
+      // Article, rating and page view in one request
+      const bundle = await getPageBundle('article', id, true);
+      const data = bundle.article;
       setArticle(data);
-      
-      // Track page view
-      trackPageView('article', id).catch(err => console.error('Failed to track view:', err));
+      setRating(bundle.rating);
       
       // Load related articles
       const response = await getArticles(data.category);
@@ -161,7 +162,7 @@ const ArticleDetail = () => {
 
         {/* Rating Widget */}
         <div className="mt-8">
-          <RatingWidget articleId={id} />
+          <RatingWidget articleId={id} initialRating={rating} />
         </div>
 
         {/* Related Articles */}
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
-import { getBreed, getBreeds, trackPageView } from '../utils/api';
+import { getBreeds, getPageBundle } from '../utils/api';
 import { ArrowLeft, Heart, Info, Activity, Scissors, GraduationCap, Home } from 'lucide-react';
 import Breadcrumbs from '../components/Breadcrumbs';
 import SEOHead from '../components/SEOHead';
@@ -18,12 +18,11 @@ const BreedDetail = () => {
 
   const loadBreed = async () => {
     try {
-      const data = await getBreed(id);
+      // Breed and page view in one request
+      const bundle = await getPageBundle('breed', id, true);
+      const data = bundle.breed;
       setBreed(data);
       
-      // Track page view
-      trackPageView('breed', id).catch(err => console.error('Failed to track view:', err));
-      
       // Load related breeds
       const response = await getBreeds({ species: data.species });
       const breedsData = response.breeds || response;
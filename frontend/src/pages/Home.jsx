@@ -1,13 +1,14 @@
 import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
-import { PawPrint, BookOpen, Search, Heart, ArrowRight } from 'lucide-react';
-import { getArticles, getBreeds } from '../utils/api';
+import { PawPrint, BookOpen, Search, Heart, ArrowRight, TrendingUp } from 'lucide-react';
+import { getArticles, getBreeds, getTrending } from '../utils/api';
 import SEOHead from '../components/SEOHead';
 
 const Home = () => {
   const [featuredArticles, setFeaturedArticles] = useState([]);
   const [featuredDogs, setFeaturedDogs] = useState([]);
   const [featuredCats, setFeaturedCats] = useState([]);
+  const [trendingBreeds, setTrendingBreeds] = useState([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -16,9 +17,11 @@ const Home = () => {
 
   const loadData = async () => {
     try {
-      const [articlesResponse, breedsResponse] = await Promise.all([
+      const [articlesResponse, breedsResponse, trendingResponse] = await Promise.all([
         getArticles(null, 1, 3),
-        getBreeds({}, 1, 20)
+        getBreeds({}, 1, 20),
+        // The rail is optional, so the home page still loads without it
+        getTrending('breed', 6).catch(() => ({ items: [] }))
       ]);
       
       const articles = articlesResponse.articles || articlesResponse;
@@ -27,6 +30,7 @@ const Home = () => {
       setFeaturedArticles(articles.slice(0, 3));
       setFeaturedDogs(breeds.filter(b => b.species === 'dog').slice(0, 3));
       setFeaturedCats(breeds.filter(b => b.species === 'cat').slice(0, 3));
+      setTrendingBreeds(trendingResponse.items);
     } catch (error) {
       console.error('Error loading data:', error);
     } finally {
@@ -168,6 +172,35 @@ const Home = () => {
         </div>
       </section>
 
+      {/* Trending Breeds */}
+      {trendingBreeds.length > 0 && (
+        <section className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 pt-20">
+          <h2 className="flex items-center gap-3 text-2xl font-bold text-gray-900 mb-6">
+            <TrendingUp className="w-6 h-6 text-amber-500" />
+            Trending Breeds
+          </h2>
+          <div className="flex gap-4 overflow-x-auto pb-2">
+            {trendingBreeds.map((breed) => (
+              <Link
+                key={breed.page_id}
+                to={`/breeds/${breed.page_id}`}
+                className="flex-shrink-0 w-48 bg-white rounded-xl shadow-md overflow-hidden hover:shadow-lg transition-shadow duration-300 border border-amber-100"
+              >
+                {breed.image_url ? (
+                  <img src={breed.image_url} alt={breed.name} loading="lazy" className="h-28 w-full object-cover" />
+                ) : (
+                  <div className="h-28 bg-gradient-to-br from-amber-200 to-orange-200"></div>
+                )}
+                <div className="p-3">
+                  <h3 className="font-semibold text-gray-900 truncate">{breed.name}</h3>
+                  <p className="text-sm text-gray-500 capitalize">{breed.species}</p>
+                </div>
+              </Link>
+            ))}
+          </div>
+        </section>
+      )}
+
       {/* Featured Breeds */}
       <section className="py-20">
         <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
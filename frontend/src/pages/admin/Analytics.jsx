@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
 import { getPopularContent, getAnalyticsStats } from '../../utils/api';
-import { PawPrint, ArrowLeft, TrendingUp, Eye, Star, FileText, Dog } from 'lucide-react';
+import { PawPrint, ArrowLeft, TrendingUp, Eye, Star, FileText, Dog, Users } from 'lucide-react';
 import { Button } from '../../components/ui/button';
 
 const Analytics = () => {
@@ -61,7 +61,7 @@ const Analytics = () => {
         ) : (
           <>
             {/* Stats Cards */}
-            <div className="grid md:grid-cols-4 gap-6 mb-12">
+            <div className="grid md:grid-cols-5 gap-6 mb-12">
               <div className="bg-white rounded-2xl shadow-lg border border-amber-100 p-6">
                 <div className="flex items-center justify-between mb-4">
                   <Eye className="w-8 h-8 text-amber-600" />
@@ -84,6 +84,16 @@ const Analytics = () => {
                 <div className="text-sm text-gray-600">Breed Views</div>
               </div>
 
+              <div className="bg-white rounded-2xl shadow-lg border border-amber-100 p-6">
+                <div className="flex items-center justify-between mb-4">
+                  <Users className="w-8 h-8 text-amber-600" />
+                </div>
+                <div className="text-3xl font-bold text-gray-900 mb-1">
+                  ~{stats?.unique_visitors?.toLocaleString() || 0}
+                </div>
+                <div className="text-sm text-gray-600">Unique Visitors</div>
+              </div>
+
               <div className="bg-white rounded-2xl shadow-lg border border-amber-100 p-6">
                 <div className="flex items-center justify-between mb-4">
                   <Star className="w-8 h-8 text-amber-600" />
@@ -124,7 +134,10 @@ const Analytics = () => {
                           </div>
                           <div>
                             <div className="font-semibold text-gray-900">{article.title || 'Unknown'}</div>
-                            <div className="text-sm text-gray-600">{article.views} views</div>
+                            <div className="text-sm text-gray-600">
+                              {article.views} views · ~{article.unique_visitors ?? 0} visitors
+                              {article.total_ratings > 0 && ` · ${article.average_rating.toFixed(1)} ★ (${article.total_ratings})`}
+                            </div>
                           </div>
                         </div>
                         <Link to={`/articles/${article.page_id}`} target="_blank">
@@ -156,7 +169,7 @@ const Analytics = () => {
                           </div>
                           <div>
                             <div className="font-semibold text-gray-900">{breed.name || 'Unknown'}</div>
-                            <div className="text-sm text-gray-600">{breed.views} views</div>
+                            <div className="text-sm text-gray-600">{breed.views} views · ~{breed.unique_visitors ?? 0} visitors</div>
                           </div>
                         </div>
                         <Link to={`/breeds/${breed.page_id}`} target="_blank">
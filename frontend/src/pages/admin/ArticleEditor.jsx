@@ -21,7 +21,8 @@ const ArticleEditor = () => {
     content: '',
     author: '',
     readTime: '',
-    image_url: ''
+    image_url: '',
+    image_derivatives: null
   });
 
   const [loading, setLoading] = useState(false);
@@ -44,7 +45,8 @@ const ArticleEditor = () => {
         content: article.content,
         author: article.author,
         readTime: article.readTime,
-        image_url: article.image_url || ''
+        image_url: article.image_url || '',
+        image_derivatives: article.image_derivatives || null
       });
     } catch (err) {
       setError('Failed to load article');
@@ -58,7 +60,7 @@ const ArticleEditor = () => {
     setUploading(true);
     try {
       const result = await uploadImage(file, 'articles');
-      setFormData({ ...formData, image_url: result.url });
+      setFormData({ ...formData, image_url: result.url, image_derivatives: result.derivatives });
     } catch (err) {
       alert('Failed to upload image');
     } finally {
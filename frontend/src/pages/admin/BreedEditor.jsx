@@ -31,7 +31,8 @@ const BreedEditor = () => {
     },
     healthInfo: '',
     idealFor: '',
-    image_url: ''
+    image_url: '',
+    image_derivatives: null
   });
 
   const [temperamentInput, setTemperamentInput] = useState('');
@@ -61,7 +62,7 @@ const BreedEditor = () => {
     setUploading(true);
     try {
       const result = await uploadImage(file, 'breeds');
-      setFormData({ ...formData, image_url: result.url });
+      setFormData({ ...formData, image_url: result.url, image_derivatives: result.derivatives });
     } catch (err) {
       alert('Failed to upload image');
     } finally {
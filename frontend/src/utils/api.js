@@ -16,6 +16,14 @@ export const getArticle = async (id) => {
   return response.data;
 };
 
+// Several articles in one request: { articles, missing }
+export const getArticlesByIds = async (ids, fields = null) => {
+  const params = { ids: ids.join(',') };
+  if (fields) params.fields = fields;
+  const response = await axios.get(`${API_URL}/articles/batch`, { params });
+  return response.data;
+};
+
 export const createArticle = async (articleData) => {
   const response = await axios.post(`${API_URL}/articles`, articleData, {
     headers: getAuthHeaders()
@@ -49,6 +57,14 @@ export const getBreed = async (id) => {
   return response.data;
 };
 
+// Several breeds in one request: { breeds, missing }
+export const getBreedsByIds = async (ids, fields = null) => {
+  const params = { ids: ids.join(',') };
+  if (fields) params.fields = fields;
+  const response = await axios.get(`${API_URL}/breeds/batch`, { params });
+  return response.data;
+};
+
 export const createBreed = async (breedData) => {
   const response = await axios.post(`${API_URL}/breeds`, breedData, {
     headers: getAuthHeaders()
@@ -96,12 +112,35 @@ export const getArticleRating = async (articleId) => {
   return response.data;
 };
 
+// Ratings of several articles in one request: { ratings, missing }
+export const getArticleRatings = async (articleIds) => {
+  const response = await axios.get(`${API_URL}/articles/ratings`, { params: { ids: articleIds.join(',') } });
+  return response.data;
+};
+
 // Page Views API
 export const trackPageView = async (pageType, pageId) => {
   const response = await axios.post(`${API_URL}/views/${pageType}/${pageId}`);
   return response.data;
 };
 
+export const getPageViews = async (pageType, pageIds) => {
+  const response = await axios.get(`${API_URL}/views/${pageType}`, { params: { ids: pageIds.join(',') } });
+  return response.data;
+};
+
+// Page Bundle API: the article or breed with its rating, meta tags, SEO settings and views
+export const getPageBundle = async (pageType, pageId, track = false) => {
+  const response = await axios.get(`${API_URL}/pages/${pageType}/${pageId}`, { params: { track } });
+  return response.data;
+};
+
+// Trending API: pages with the most recent views
+export const getTrending = async (pageType, limit = 6) => {
+  const response = await axios.get(`${API_URL}/trending/${pageType}`, { params: { limit } });
+  return response.data;
+};
+
 // Analytics API
 export const getPopularContent = async () => {
   const response = await axios.get(`${API_URL}/analytics/popular`, {
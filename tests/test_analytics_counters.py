@@ -0,0 +1,131 @@
+import asyncio
+
+from analytics_counters import AnalyticsCounters
+from benchmarks._simulated_db import SimulatedCollection
+from view_counter import ViewCounter
+
+
+class Counters:
+    """The single-document $inc/$set upserts AnalyticsCounters makes."""
+
+    def __init__(self):
+        self.doc = None
+
+    async def update_one(self, filter_doc, update, upsert=False):
+        if self.doc is None:
+            self.doc = dict(filter_doc)
+        for field, amount in update.get("$inc", {}).items():
+            self.doc[field] = self.doc.get(field, 0) + amount
+        self.doc.update(update.get("$set", {}))
+
+    async def find_one(self, filter_doc, projection=None):
+        return None if self.doc is None else {k: v for k, v in self.doc.items() if k != "_id"}
+
+
+class Grouped:
+    """aggregate() returning fixed $group results."""
+
+    def __init__(self, groups, during=None):
+        self.groups = groups
+        self.during = during
+
+    def aggregate(self, pipeline):
+        outer = self
+
+        class Cursor:
+            async def to_list(self, length):
+                if outer.during is not None:
+                    await outer.during()
+                return outer.groups
+        return Cursor()
+
+
+def make_counters(views, ratings, during=None):
+    db = type("Db", (), {})()
+    db.analytics_counters = Counters()
+    db.page_views = Grouped([{"_id": page_type, "views": count} for page_type, count in views.items()], during)
+    db.article_ratings = Grouped([{"_id": None, "ratings": ratings[0], "score": ratings[1]}])
+    return AnalyticsCounters(db)
+
+
+def test_write_paths_keep_the_totals_current():
+    counters = make_counters({}, (0, 0))
+
+    async def scenario():
+        await counters.add_views({("article", "1"): 3, ("article", "2"): 2, ("breed", "beagle"): 4})
+        await counters.add_views({("breed", "beagle"): 1})
+        for rating in (5, 4, 4):
+            await counters.add_rating(rating)
+        return await counters.read()
+
+    assert asyncio.run(scenario()) == {
+        "total_article_views": 5, "total_breed_views": 5, "total_ratings": 3, "average_rating": 4.33
+    }
+
+
+def test_reconcile_corrects_drift_and_skips_while_counters_move():
+    counters = make_counters({"article": 10, "breed": 7}, (4, 18))
+
+    async def scenario():
+        # First read builds the document from the aggregation
+        first = await counters.read()
+        # Counted, but the rating itself was never stored
+        await counters.add_rating(5)
+        result = await counters.reconcile()
+        return first, result, await counters.read()
+
+    first, result, stats = asyncio.run(scenario())
+    assert first == {"total_article_views": 10, "total_breed_views": 7, "total_ratings": 4, "average_rating": 4.5}
+    assert result == {"skipped": False, "corrections": {"ratings": -1, "rating_score": -5}}
+    assert stats == first
+
+    racing = make_counters({"article": 10}, (0, 0), during=lambda: racing.add_views({("article", "1"): 1}))
+    assert asyncio.run(racing.reconcile()) == {"skipped": True, "corrections": {}}
+
+
+class PageViews(SimulatedCollection):
+    """Stored page views that can also be summed per page type."""
+
+    def aggregate(self, pipeline):
+        totals = {}
+        for doc in self.docs.values():
+            totals[doc["page_type"]] = totals.get(doc["page_type"], 0) + doc["views"]
+        return Grouped([{"_id": page_type, "views": views} for page_type, views in totals.items()]).aggregate(pipeline)
+
+
+def test_reconcile_waits_for_views_written_but_not_yet_counted():
+    db = type("Db", (), {})()
+    db.analytics_counters = Counters()
+    db.page_views = PageViews(rtt=0)
+    db.article_ratings = Grouped([])
+    counters = AnalyticsCounters(db)
+    views = ViewCounter(db.page_views)
+    released = None
+
+    async def slow_listener(increments):
+        await released.wait()
+
+    views.add_listener(slow_listener)
+    views.add_listener(counters.add_views)
+    views.guard_flushes(counters.counting)
+
+    async def scenario():
+        nonlocal released
+        released = asyncio.Event()
+        for _ in range(4):
+            await views.record("article", "1")
+        flush = asyncio.create_task(views.flush())
+        while not db.page_views.docs:
+            await asyncio.sleep(0)
+        # page_views already holds the views, the counters don't yet
+        assert db.page_views.docs and db.analytics_counters.doc is None
+        reconcile = asyncio.create_task(counters.reconcile())
+        await asyncio.sleep(0)
+        released.set()
+        await flush
+        result = await reconcile
+        return result, await counters.read()
+
+    result, stats = asyncio.run(scenario())
+    assert result == {"skipped": False, "corrections": {}}
+    assert stats["total_article_views"] == 4
@@ -0,0 +1,58 @@
+import autocomplete
+from autocomplete import Autocomplete
+
+
+def make_index():
+    index = Autocomplete()
+    index.upsert("breed", "golden-retriever", "Golden Retriever")
+    index.upsert("breed", "labrador-retriever", "Labrador Retriever")
+    index.upsert("breed", "goldendoodle", "Goldendoodle")
+    index.upsert("article", "1", "Grooming a Golden coat")
+    return index
+
+
+def test_matches_title_and_word_starts_by_weight():
+    index = make_index()
+    index.add_views({("breed", "labrador-retriever"): 10, ("breed", "golden-retriever"): 3})
+    assert index.suggest("retr") == ["Labrador Retriever", "Golden Retriever"]
+    assert index.suggest("gold")[0] == "Golden Retriever"
+    assert set(index.suggest("gold")) == {"Golden Retriever", "Goldendoodle", "Grooming a Golden coat"}
+
+
+def test_limit_and_incremental_changes():
+    index = make_index()
+    assert len(index.suggest("go", limit=2)) == 2
+
+    index.upsert("breed", "goldendoodle", "Golden Doodle")
+    assert "Goldendoodle" not in index.suggest("gold")
+    assert "Golden Doodle" in index.suggest("doo")
+
+    index.remove("article", "1")
+    assert index.suggest("groom") == []
+
+
+def test_popular_queries_become_completions():
+    index = make_index()
+    for _ in range(50):
+        index.record_query("grooming tips", "one searcher")
+    assert index.suggest("groo") == ["Grooming a Golden coat"]
+
+    index.record_query("grooming tips", "second searcher")
+    index.record_query("grooming tips", "third searcher")
+    assert index.suggest("groo") == ["grooming tips", "Grooming a Golden coat"]
+
+
+def test_terms_nobody_searches_any_more_fade_out(monkeypatch):
+    monkeypatch.setattr(autocomplete, "TERM_HALF_LIFE", 10)
+    index = make_index()
+    for searcher in range(3):
+        index.record_query("puppy training", searcher)
+    for searcher in range(3):
+        index.record_query("kitten food", searcher)
+    assert index.suggest("pupp") == ["puppy training"]
+
+    # Only kitten food keeps being searched; puppy training halves twice and goes
+    for _ in range(14):
+        index.record_query("kitten food", 0)
+    assert index.suggest("pupp") == []
+    assert index.suggest("kitt") == ["kitten food"]
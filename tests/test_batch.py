@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from batch import MAX_BATCH, fetch_by_ids, parse_ids
+from view_counter import ViewCounter
+from benchmarks._simulated_db import SimulatedCollection
+
+
+def test_one_query_keeps_requested_order_and_reports_missing_ids():
+    async def scenario():
+        collection = SimulatedCollection(rtt=0)
+        await collection.insert_many([{"id": str(number), "title": f"Article {number}"} for number in range(10)])
+        before = collection.round_trips
+
+        docs, missing = await fetch_by_ids(collection, parse_ids("7, 2,nope,7,0"))
+        assert collection.round_trips == before + 1
+        assert [doc["id"] for doc in docs] == ["7", "2", "0"]
+        assert missing == ["nope"]
+
+    asyncio.run(scenario())
+
+
+def test_batch_size_is_capped():
+    with pytest.raises(HTTPException):
+        parse_ids(",".join(str(number) for number in range(MAX_BATCH + 1)))
+    with pytest.raises(HTTPException):
+        parse_ids(" , ")
+
+
+def test_view_totals_for_many_pages_in_one_query():
+    async def scenario():
+        collection = SimulatedCollection(rtt=0)
+        for page_id, views in (("a", 3), ("b", 5)):
+            await collection.update_one({"page_type": "article", "page_id": page_id}, {"$inc": {"views": views}})
+        counter = ViewCounter(collection)
+        await counter.record("article", "b")
+        before = collection.round_trips
+
+        assert await counter.get_many("article", ["a", "b", "c"]) == {"a": 3, "b": 6, "c": 0}
+        assert collection.round_trips == before + 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+
+import orjson
+
+from bulk_io import MAX_LINE_BYTES, aiter_ndjson, import_ndjson, iter_lines
+from models import Breed
+from upload_refs import blob_id
+from benchmarks._simulated_db import SimulatedCollection
+
+BREED = {
+    "name": "Beagle", "species": "dog", "size": "medium", "weight": "10 kg", "lifespan": "13 years",
+    "temperament": ["curious"], "origin": "England", "history": "Hound", "healthInfo": "Healthy",
+    "idealFor": "Families",
+    "careRequirements": {"exercise": "high", "grooming": "low", "training": "medium", "space": "yard"},
+}
+
+
+async def chunked(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_import_reports_bad_lines_and_upserts_the_rest():
+    async def scenario():
+        collection = SimulatedCollection(rtt=0)
+        lines = [
+            orjson.dumps({**BREED, "id": "b1"}),
+            b"",
+            b"{not json",
+            orjson.dumps({**BREED, "id": "b2", "species": None}),
+            orjson.dumps({**BREED, "id": "b1", "name": "Beagle Harrier"}),
+            orjson.dumps({**BREED, "id": "b3"}),
+        ]
+        seen = []
+        report = await import_ndjson(collection, Breed, chunked(b"\n".join(lines)), batch_size=2,
+                                     on_batch=lambda docs: seen.extend(doc["id"] for doc in docs))
+
+        assert report.as_dict()["failed"] == 2
+        assert [error["line"] for error in report.errors] == [3, 4]
+        assert "species" in report.errors[1]["error"]
+        assert (report.received, report.inserted, report.updated) == (5, 2, 1)
+        assert seen == ["b1", "b1", "b3"]
+        assert collection.docs[(("id", "b1"),)]["name"] == "Beagle Harrier"
+
+        exported = b"".join([chunk async for chunk in aiter_ndjson(collection.find({}), chunk_bytes=10)])
+        assert [orjson.loads(line)["id"] for line in exported.splitlines()] == ["b1", "b3"]
+
+    asyncio.run(scenario())
+
+
+def test_overlong_lines_are_not_buffered():
+    async def scenario():
+        data = b"a" * (MAX_LINE_BYTES + 10) + b"\nshort\n" + b"b" * (MAX_LINE_BYTES + 1)
+        return [(number, line) async for number, line in iter_lines(chunked(data, 64 * 1024))]
+
+    assert asyncio.run(scenario()) == [(1, None), (2, b"short"), (3, None)]
+
+
+def blob_url(name: bytes) -> str:
+    digest = hashlib.sha256(name).hexdigest()
+    return f"/api/uploads/blobs/{digest[:2]}/{digest}.png"
+
+
+def test_importing_over_a_page_moves_its_image_reference(api, insert):
+    client, server = api
+    old, new, kept = blob_url(b"old"), blob_url(b"new"), blob_url(b"kept")
+    insert("breeds", {**BREED, "id": "b1", "image_url": old}, {**BREED, "id": "b2", "image_url": kept})
+    insert("upload_refs", {"id": blob_id(old), "refs": ["breed:b1"]}, {"id": blob_id(kept), "refs": ["breed:b2"]})
+
+    lines = [
+        orjson.dumps({**BREED, "id": "b1", "image_url": kept}),
+        orjson.dumps({**BREED, "id": "b1", "image_url": new}),
+        orjson.dumps({**BREED, "id": "b2", "image_url": kept}),
+        orjson.dumps({**BREED, "id": "b3", "image_url": kept}),
+    ]
+    response = client.post("/api/admin/import", params={"collection": "breeds"}, content=b"\n".join(lines))
+    assert response.json()["failed"] == 0
+
+    def refs(url):
+        return client.portal.call(server.upload_refs.count, blob_id(url))
+    assert (refs(old), refs(new), refs(kept)) == (0, 1, 2)
@@ -0,0 +1,128 @@
+import asyncio
+import io
+import struct
+import time
+import zlib
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import Headers, UploadFile
+
+from utils import file_upload, image_derivatives
+from utils.file_upload import MAX_FILE_SIZE, blob_path, delete_file, save_upload_file
+
+
+def png(width: int, height: int) -> bytes:
+    """A valid grey PNG, built by hand so the tests don't need Pillow."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\x00" + b"\x80" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+PNG_HEADER = png(800, 600)
+
+
+def upload(data: bytes, content_type: str = "image/png") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="photo.png", headers=Headers({"content-type": content_type}))
+
+
+def test_many_concurrent_5mb_uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_upload, "UPLOADS_DIR", tmp_path)
+
+    def data(number: int) -> bytes:
+        # Readers stop at the end of the image, so padding makes a different 5 MB file each time
+        return PNG_HEADER + bytes([number]) * (MAX_FILE_SIZE - len(PNG_HEADER))
+
+    async def scenario():
+        # The loop keeps ticking while the uploads are copied
+        gaps = []
+
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticking = asyncio.ensure_future(ticker())
+        results = await asyncio.gather(*(save_upload_file(upload(data(number)), "breeds") for number in range(32)))
+        ticking.cancel()
+        return results, max(gaps)
+
+    results, longest_gap = asyncio.run(scenario())
+    assert len({result["filename"] for result in results}) == 32
+    assert all(result["size"] == MAX_FILE_SIZE and result["format"] == "PNG" for result in results)
+    assert (results[0]["width"], results[0]["height"]) == (800, 600)
+    assert all(blob_path(result["filename"]).read_bytes() == data(number) for number, result in enumerate(results))
+    assert not any(path.name.startswith(".partial-") for path in tmp_path.rglob("*"))
+    assert longest_gap < 0.5
+
+    assert delete_file(results[0]["url"])
+    assert not delete_file(results[0]["url"])
+    assert not delete_file("../../etc/passwd")
+
+
+def test_same_image_is_stored_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_upload, "UPLOADS_DIR", tmp_path)
+
+    async def scenario():
+        first = await save_upload_file(upload(PNG_HEADER), "articles")
+        again = await asyncio.gather(*(save_upload_file(upload(PNG_HEADER), "breeds") for _ in range(3)))
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert not first["deduplicated"] and all(result["deduplicated"] for result in again)
+    assert {result["url"] for result in again} == {first["url"]}
+    assert first["url"] == f"/api/uploads/blobs/{first['hash'][:2]}/{first['hash']}.png"
+    assert len([path for path in tmp_path.rglob("*.png")]) == 1
+
+
+def test_rejects_oversized_and_disguised_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_upload, "UPLOADS_DIR", tmp_path)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(save_upload_file(upload(PNG_HEADER + b"\x00" * MAX_FILE_SIZE)))
+    assert error.value.status_code == 413
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(save_upload_file(upload(b"<?php echo 'hi'; ?>")))
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException):
+        asyncio.run(save_upload_file(upload(PNG_HEADER), "../outside"))
+
+    # Nothing is left behind, not even the partial file of the oversized upload
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+
+
+def test_webp_derivatives_of_real_images(tmp_path, monkeypatch):
+    pytest.importorskip("PIL")
+    monkeypatch.setattr(file_upload, "UPLOADS_DIR", tmp_path)
+
+    result = asyncio.run(save_upload_file(upload(png(1000, 500)), "articles"))
+    assert [(d["width"], d["height"]) for d in result["derivatives"]] == [(320, 160), (640, 320), (1000, 500)]
+    assert all(blob_path(d["url"].rsplit("/", 1)[1]).read_bytes()[8:12] == b"WEBP" for d in result["derivatives"])
+
+    assert delete_file(result["url"])
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(save_upload_file(upload(png(10, 10)[:40])))
+    assert error.value.status_code == 400
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+
+
+def test_missing_pillow_fails_unless_derivatives_are_off(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_upload, "UPLOADS_DIR", tmp_path)
+    monkeypatch.setattr(image_derivatives, "Image", None)
+    with pytest.raises(RuntimeError):
+        image_derivatives.check_pillow()
+    with pytest.raises(RuntimeError):
+        asyncio.run(save_upload_file(upload(png(10, 10)), "articles"))
+
+    monkeypatch.setattr(image_derivatives, "DERIVATIVE_WIDTHS", ())
+    image_derivatives.check_pillow()
+    assert asyncio.run(save_upload_file(upload(png(10, 10)), "articles"))["derivatives"] == []
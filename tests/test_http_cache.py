@@ -0,0 +1,53 @@
+ARTICLE = {"id": "a1", "title": "Beagle care", "category": "dogs", "content": "Walks", "excerpt": "",
+           "author": "Ann", "date": "2024-03-01", "readTime": "1 min"}
+
+
+def test_lists_answer_304_until_the_collection_changes(api, insert):
+    client, _ = api
+    insert("articles", ARTICLE)
+
+    first = client.get("/api/articles")
+    etag = first.headers["etag"]
+    cached = client.get("/api/articles", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert client.get("/api/articles", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+    # Another query is another representation
+    filtered = client.get("/api/articles", params={"category": "dogs"}, headers={"If-None-Match": etag})
+    assert filtered.status_code == 200
+    assert filtered.headers["etag"] != etag
+    assert client.get("/api/articles", params={"limit": 5}).headers["etag"] != etag
+
+    assert client.put("/api/articles/a1", json={"title": "Beagle care, revised"}).status_code == 200
+    updated = client.get("/api/articles", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.headers["etag"] != etag
+    assert updated.json()["articles"][0]["title"] == "Beagle care, revised"
+
+
+def test_details_answer_304_until_the_document_changes(api, insert):
+    client, _ = api
+    insert("articles", ARTICLE)
+
+    etag = client.get("/api/articles/a1").headers["etag"]
+    assert client.get("/api/articles/a1", headers={"If-None-Match": etag}).status_code == 304
+
+    client.put("/api/articles/a1", json={"content": "Long walks"})
+    updated = client.get("/api/articles/a1", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["content"] == "Long walks"
+    assert client.get("/api/articles/a1", headers={"If-None-Match": updated.headers["etag"]}).status_code == 304
+
+
+def test_each_detail_request_counts_one_cache_lookup(api, insert):
+    client, _ = api
+    insert("articles", ARTICLE)
+
+    etag = client.get("/api/articles/a1").headers["etag"]
+    assert client.get("/api/articles/a1", headers={"If-None-Match": etag}).status_code == 304
+    client.put("/api/articles/a1", json={"content": "Long walks"})
+    assert client.get("/api/articles/a1", headers={"If-None-Match": etag}).status_code == 200
+    stats = client.get("/api/admin/cache").json()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
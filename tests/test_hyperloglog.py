@@ -0,0 +1,121 @@
+import asyncio
+import random
+
+from pymongo.errors import BulkWriteError
+
+from hyperloglog import HyperLogLog
+from unique_visitors import UniqueVisitors, visitor_fingerprint
+
+
+def sketch_of(visitors):
+    sketch = HyperLogLog()
+    for visitor in visitors:
+        sketch.add(visitor_fingerprint(visitor, "Mozilla/5.0"))
+    return sketch
+
+
+def test_estimates_stay_close_to_exact_counts():
+    rng = random.Random(11)
+    assert len(HyperLogLog().to_bytes()) == 4096
+    for distinct in (10, 1000, 20000, 200000):
+        addresses = [f"10.{n >> 16}.{(n >> 8) & 255}.{n & 255}" for n in range(distinct)]
+        # Every visitor comes back a few times
+        visits = addresses + rng.choices(addresses, k=distinct * 2)
+        estimate = sketch_of(visits).count()
+        # About three standard errors (1.04 / sqrt(4096) = 1.6%)
+        assert abs(estimate - distinct) <= max(1, 0.05 * distinct), (distinct, estimate)
+
+
+def test_merging_equals_the_sketch_of_the_union():
+    first = sketch_of(f"visitor-{n}" for n in range(0, 6000))
+    second = sketch_of(f"visitor-{n}" for n in range(4000, 9000))
+    first.merge(second)
+    union = sketch_of(f"visitor-{n}" for n in range(9000))
+    assert first.registers == union.registers
+    first.merge(second)
+    assert HyperLogLog.from_bytes(first.to_bytes()).count() == union.count()
+
+
+class PageViews:
+    """page_views with a unique page key, as the sketch writes need."""
+
+    def __init__(self):
+        self.docs = {}
+        self.before_write = None
+
+    def find(self, filter_doc, projection=None):
+        docs = [{"page_id": page_id, "visitors": doc["visitors"]}
+                for (page_type, page_id), doc in self.docs.items()
+                if page_type == filter_doc["page_type"] and page_id in filter_doc["page_id"]["$in"] and "visitors" in doc]
+
+        class Cursor:
+            async def to_list(self, length):
+                return docs
+        return Cursor()
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.before_write is not None:
+            self.before_write()
+            self.before_write = None
+        errors = []
+        for index, operation in enumerate(operations):
+            key = (operation._filter["page_type"], operation._filter["page_id"])
+            if self.docs.get(key, {}).get("visitors") != operation._filter["visitors"]:
+                # The upsert would collide with the unique page index
+                errors.append({"index": index, "code": 11000})
+                continue
+            self.docs.setdefault(key, {}).update(operation._doc["$set"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+class Counters:
+    def __init__(self):
+        self.doc = {}
+
+    async def find_one(self, filter_doc, projection=None):
+        return self.doc
+
+    async def update_one(self, filter_doc, update, upsert=False):
+        self.doc.update(update["$set"])
+
+
+def test_sketches_written_meanwhile_are_merged_on_the_next_flush():
+    db = type("Db", (), {})()
+    db.page_views, db.analytics_counters = PageViews(), Counters()
+    visitors = UniqueVisitors(db)
+    for n in range(300):
+        visitors.record("breed", "beagle", visitor_fingerprint(f"a-{n}", ""))
+    visitors.record("article", "1", visitor_fingerprint("a-0", ""))
+
+    def other_process_writes():
+        other = sketch_of(f"b-{n}" for n in range(300)).to_bytes()
+        db.page_views.docs[("breed", "beagle")] = {"visitors": other}
+
+    async def scenario():
+        db.page_views.before_write = other_process_writes
+        await visitors.flush()
+        assert list(visitors._pending) == [("breed", "beagle")]
+        await visitors.flush()
+        return await visitors.estimate("breed", ["beagle", "poodle"]), await visitors.site_estimate()
+
+    estimates, site = asyncio.run(scenario())
+    assert abs(estimates["beagle"] - 600) <= 30
+    assert estimates["poodle"] == 0
+    assert abs(site - 300) <= 15
+
+
+def test_a_full_buffer_is_flushed_early():
+    db = type("Db", (), {})()
+    db.page_views, db.analytics_counters = PageViews(), Counters()
+    visitors = UniqueVisitors(db, interval=3600, max_pending=3)
+
+    async def scenario():
+        for n in range(3):
+            visitors.record("breed", f"breed-{n}", visitor_fingerprint("a", ""))
+        assert len(visitors._pending) == 3
+        await visitors._early_flush
+        assert visitors._pending == {} and visitors._early_flush is None
+        return await visitors.estimate("breed", ["breed-0", "breed-2"])
+
+    assert asyncio.run(scenario()) == {"breed-0": 1, "breed-2": 1}
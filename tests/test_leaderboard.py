@@ -0,0 +1,67 @@
+import asyncio
+import random
+
+from leaderboard import Leaderboard, popular_pipeline
+
+
+class Documents:
+    """find_one/replace_one by _id over a dict."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, filter_doc, projection=None):
+        doc = self.docs.get(filter_doc["_id"])
+        return dict(doc) if doc else None
+
+    async def replace_one(self, filter_doc, doc, upsert=False):
+        self.docs[filter_doc["_id"]] = dict(doc)
+
+
+class RankedLeaderboard(Leaderboard):
+    """Ranks an in-memory page_views the way popular_pipeline() does in MongoDB."""
+
+    def __init__(self, views, limit):
+        super().__init__(type("Db", (), {"leaderboards": Documents()})(), limit=limit)
+        self.views = views
+
+    async def _aggregate(self, only=None):
+        board = {}
+        for page_type, facet in (("article", "articles"), ("breed", "breeds")):
+            pages = [(views, page_id) for (kind, page_id), views in self.views.items()
+                     if kind == page_type and (only is None or page_id in only.get(page_type, []))]
+            top = sorted(pages, key=lambda page: (-page[0], page[1]))[:self.limit]
+            board[facet] = [{"page_id": page_id, "views": views, "title": f"Page {page_id}"} for views, page_id in top]
+        return board
+
+
+def test_incremental_updates_match_a_full_rebuild():
+    rng = random.Random(7)
+    views = {}
+    board = RankedLeaderboard(views, limit=5)
+
+    async def scenario():
+        await board.rebuild()
+        for _ in range(200):
+            increments = {}
+            for _ in range(rng.randint(1, 8)):
+                key = (rng.choice(["article", "breed"]), str(rng.randrange(40)))
+                increments[key] = increments.get(key, 0) + rng.randint(1, 20)
+            for key, count in increments.items():
+                views[key] = views.get(key, 0) + count
+            await board.add_views(increments)
+        incremental = await board.read()
+        return incremental, await board._aggregate()
+
+    incremental, rebuilt = asyncio.run(scenario())
+    assert incremental["articles"] == rebuilt["articles"]
+    assert incremental["breeds"] == rebuilt["breeds"]
+    assert len(incremental["articles"]) == 5
+
+
+def test_pipeline_is_restricted_to_viewed_pages():
+    pipeline = popular_pipeline(10, only={"article": ["1", "2"], "breed": []})
+    assert pipeline[0] == {"$match": {"page_type": {"$in": ["article"]}}}
+    articles = pipeline[1]["$facet"]["articles"]
+    assert articles[0] == {"$match": {"page_type": "article", "page_id": {"$in": ["1", "2"]}}}
+    assert any(stage.get("$lookup", {}).get("from") == "article_ratings" for stage in articles)
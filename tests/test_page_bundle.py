@@ -0,0 +1,53 @@
+import orjson
+
+
+def test_bundle_joins_the_page_parts(api, insert):
+    client, server = api
+    insert("breeds", {"id": "beagle", "name": "Beagle", "species": "dog"})
+    insert("page_meta", {"page_type": "breed", "page_id": "beagle", "title": "Beagles"})
+
+    response = client.get("/api/pages/breed/beagle")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-store"
+    body = orjson.loads(response.content)
+    assert body["breed"]["name"] == "Beagle"
+    assert body["meta"]["title"] == "Beagles"
+    assert body["seo"]["site_name"] == "PetsLib"
+    assert body["views"] == 0
+    assert "rating" not in body
+
+
+def test_track_counts_a_view(api, insert):
+    client, server = api
+    insert("breeds", {"id": "beagle", "name": "Beagle", "species": "dog"})
+
+    assert client.get("/api/pages/breed/beagle?track=true").json()["views"] == 1
+    assert client.get("/api/pages/breed/beagle?track=true").json()["views"] == 2
+    assert client.get("/api/pages/breed/beagle").json()["views"] == 2
+    assert [page_id for page_id, _ in server.trending.top("breed", 5)] == ["beagle"]
+
+
+def test_unknown_pages_are_404_and_leave_no_trace(api):
+    client, server = api
+    assert client.get("/api/pages/breed/nope?track=true").status_code == 404
+    assert client.get("/api/pages/article/nope").status_code == 404
+    assert client.get("/api/pages/video/1").status_code == 400
+    assert not server.view_counter._persisted
+    assert not server.view_counter._pending
+    assert server.detail_cache.get(("breed", "nope")) is None
+    assert server.trending.top("breed", 5) == []
+    assert not server.unique_visitors._pending
+
+
+def test_visitors_are_told_apart_by_the_hop_the_proxy_added(api, insert):
+    client, server = api
+    insert("breeds", {"id": "beagle", "name": "Beagle", "species": "dog"})
+
+    def view(forwarded_for):
+        client.post("/api/views/breed/beagle", headers={"X-Forwarded-For": forwarded_for, "User-Agent": "test"})
+
+    # The first hops are made up by the client; the ingress appends the real address
+    for n in range(20):
+        view(f"10.0.0.{n}, 203.0.113.7")
+    view("203.0.113.8")
+    assert client.portal.call(server.unique_visitors.estimate, "breed", ["beagle"]) == {"beagle": 2}
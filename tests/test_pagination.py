@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import pagination
+from pagination import MAX_SKIP, CountCache, check_skip, decode_cursor, encode_cursor, keyset_filter
+
+
+def test_cursor_round_trip():
+    values = ["2024-03-01", "article-7", 3, 2.5]
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 4) == values
+
+
+@pytest.mark.parametrize("values", [
+    [{"$ne": None}, "a"],
+    [["a"], "a"],
+    [None, "a"],
+    [True, "a"],
+])
+def test_cursor_values_must_be_strings_or_numbers(values):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(encode_cursor(values), 2)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor(["a"]), encode_cursor(["a", "b", "c"])])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, 2)
+
+
+def test_keyset_filter_breaks_ties_on_the_next_field():
+    assert keyset_filter([("date", -1), ("id", -1)], ["2024-03-01", "b"]) == {"$or": [
+        {"date": {"$lt": "2024-03-01"}},
+        {"date": "2024-03-01", "id": {"$lt": "b"}},
+    ]}
+
+
+def test_deep_pages_must_use_the_cursor():
+    assert check_skip(MAX_SKIP // 10 + 1, 10) == MAX_SKIP
+    with pytest.raises(HTTPException) as error:
+        check_skip(MAX_SKIP // 10 + 2, 10)
+    assert error.value.status_code == 400
+
+
+def test_cursor_pages_cover_articles_sharing_a_date(api, insert):
+    client, _ = api
+    insert("articles", *(
+        {"id": f"a{n}", "title": f"Article {n}", "category": "dogs", "content": "", "excerpt": "",
+         "author": "Ann", "date": "2024-03-01" if n < 5 else "2024-02-01", "readTime": "1 min"}
+        for n in range(7)
+    ))
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/articles", params=params).json()
+        seen += [article["id"] for article in body["articles"]]
+        cursor = body["pagination"]["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["a4", "a3", "a2", "a1", "a0", "a6", "a5"]
+
+    forged = encode_cursor([{"$gt": ""}, "a"])
+    assert client.get("/api/articles", params={"cursor": forged}).status_code == 400
+
+
+class Counted:
+    def __init__(self, name, total):
+        self.name = name
+        self.total = total
+        self.calls = []
+
+    async def count_documents(self, query):
+        self.calls.append(query)
+        return self.total
+
+    async def estimated_document_count(self):
+        self.calls.append(None)
+        return self.total
+
+
+def test_count_cache_keys_ttl_and_invalidation(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pagination.time, "monotonic", lambda: now[0])
+    cache = CountCache(ttl=60)
+    articles, breeds = Counted("articles", 10), Counted("breeds", 4)
+
+    async def scenario():
+        assert await cache.count(articles, {}) == 10
+        assert await cache.count(articles, {"category": "dogs"}) == 10
+        assert await cache.count(articles, {"category": "dogs"}) == 10
+        assert await cache.count(breeds, {}) == 4
+        # The unfiltered total comes from the collection metadata
+        assert articles.calls == [None, {"category": "dogs"}]
+
+        articles.total = 11
+        cache.invalidate("articles")
+        assert await cache.count(articles, {"category": "dogs"}) == 11
+        assert await cache.count(breeds, {}) == 4
+        assert len(breeds.calls) == 1
+
+        breeds.total = 5
+        now[0] += 59
+        assert await cache.count(breeds, {}) == 4
+        now[0] += 2
+        assert await cache.count(breeds, {}) == 5
+
+    asyncio.run(scenario())
@@ -0,0 +1,22 @@
+import pytest
+from fastapi import HTTPException
+
+from projection import list_projection
+
+ALLOWED = ("id", "title", "content", "date", "careRequirements")
+
+
+def test_summary_by_default_and_whole_documents_on_request():
+    assert list_projection(None, ALLOWED, ("title",), ("id", "date")) == {"_id": 0, "id": 1, "date": 1, "title": 1}
+    assert list_projection("all", ALLOWED, ("title",)) == {"_id": 0}
+
+
+def test_selected_fields_are_validated():
+    projection = list_projection("content, careRequirements.space", ALLOWED, ("title",))
+    assert projection == {"_id": 0, "id": 1, "content": 1, "careRequirements.space": 1}
+    # A parent and its sub-path together would be rejected by MongoDB
+    assert "careRequirements.space" not in list_projection("careRequirements,careRequirements.space", ALLOWED, ())
+
+    with pytest.raises(HTTPException) as error:
+        list_projection("title,password", ALLOWED, ())
+    assert error.value.status_code == 400
@@ -0,0 +1,112 @@
+import asyncio
+
+from id_cache import IdCache
+
+
+def evaluate(expression, doc):
+    """The few aggregation expressions the rating pipeline uses."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = doc
+        for part in expression[1:].split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+    if isinstance(expression, dict):
+        (operator, args), = expression.items()
+        values = [evaluate(arg, doc) for arg in args]
+        if operator == "$add":
+            return sum(values)
+        if operator == "$ifNull":
+            return values[0] if values[0] is not None else values[1]
+        if operator == "$divide":
+            return values[0] / values[1]
+        if operator == "$round":
+            return round(values[0], values[1])
+        raise NotImplementedError(operator)
+    return expression
+
+
+def apply_pipeline(pipeline, doc):
+    doc = dict(doc, distribution=dict(doc.get("distribution", {})))
+    for stage in pipeline:
+        values = {path: evaluate(expression, doc) for path, expression in stage["$set"].items()}
+        for path, value in values.items():
+            *parents, field = path.split(".")
+            target = doc
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[field] = value
+    return doc
+
+
+def test_first_rating_creates_the_totals(api):
+    _, server = api
+    rating = apply_pipeline(server._rating_pipeline(4), {"article_id": "1"})
+    assert rating["total_ratings"] == 1
+    assert rating["total_score"] == 4
+    assert rating["average_rating"] == 4
+    assert rating["distribution"] == {"1": 0, "2": 0, "3": 0, "4": 1, "5": 0}
+
+
+def test_ratings_update_histogram_and_average(api):
+    _, server = api
+    rating = {"article_id": "1"}
+    for stars in (5, 5, 4, 1, 5, 2):
+        rating = apply_pipeline(server._rating_pipeline(stars), rating)
+    assert rating["total_ratings"] == 6
+    assert rating["total_score"] == 22
+    assert rating["average_rating"] == 3.67
+    assert rating["distribution"] == {"1": 1, "2": 1, "3": 0, "4": 1, "5": 3}
+
+
+def test_ratings_stored_before_the_histogram_get_one(api):
+    _, server = api
+    legacy = {"article_id": "1", "total_ratings": 2, "total_score": 6, "average_rating": 3.0}
+    rating = apply_pipeline(server._rating_pipeline(3), legacy)
+    assert rating["distribution"] == {"1": 0, "2": 0, "3": 1, "4": 0, "5": 0}
+    assert rating["average_rating"] == 3.0
+
+
+def test_rating_an_unknown_article_is_404(api):
+    client, server = api
+    assert client.post("/api/articles/nope/rate", json={"rating": 5}).status_code == 404
+    assert client.portal.call(server.db.article_ratings.count_documents, {}) == 0
+
+
+class Articles:
+    def __init__(self, *ids):
+        self.ids = set(ids)
+        self.lookups = 0
+
+    def find(self, filter_doc, projection=None):
+        async def docs():
+            for doc_id in sorted(self.ids):
+                yield {"id": doc_id}
+        return docs()
+
+    async def find_one(self, filter_doc, projection=None):
+        self.lookups += 1
+        return {"id": filter_doc["id"]} if filter_doc["id"] in self.ids else None
+
+
+def test_id_cache_confirms_misses_with_the_database():
+    articles = Articles("1", "2")
+    ids = IdCache(articles)
+
+    async def scenario():
+        await ids.load()
+        assert len(ids) == 2 and "1" in ids
+        assert await ids.exists("1") and articles.lookups == 0
+
+        # Written by another worker after the load
+        articles.ids.add("3")
+        assert await ids.exists("3") and articles.lookups == 1
+        assert await ids.exists("3") and articles.lookups == 1
+        assert not await ids.exists("4") and articles.lookups == 2
+
+        ids.add("5")
+        assert await ids.exists("5") and articles.lookups == 2
+        ids.discard("1")
+        articles.ids.discard("1")
+        assert not await ids.exists("1")
+
+    asyncio.run(scenario())
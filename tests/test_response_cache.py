@@ -0,0 +1,32 @@
+from response_cache import CachedResponse, ResponseCache
+
+
+def test_evicts_least_recently_used_entries_past_the_byte_budget():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", CachedResponse(b"1234"))
+    cache.put("b", CachedResponse(b"1234"))
+    assert cache.get("a").body == b"1234"
+    cache.put("c", CachedResponse(b"1234"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"1234"
+    assert cache.stats()["bytes"] == 8
+    assert cache.evictions == 1
+
+    cache.set_budget(4)
+    assert len(cache) == 1
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_and_stale_reads_are_not_cached():
+    cache = ResponseCache(ttl=0)
+    cache.put("a", CachedResponse(b"old"))
+    assert cache.get("a") is None
+
+    cache = ResponseCache()
+    token = cache.token()
+    # A write lands between the database read and put()
+    cache.invalidate("a")
+    cache.put("a", CachedResponse(b"old"), token)
+    assert cache.get("a") is None
@@ -0,0 +1,81 @@
+from models_extended import SearchResult
+from search import merge_ranked
+
+
+def result(result_type, doc_id, relevance):
+    return SearchResult(type=result_type, id=doc_id, title=doc_id, excerpt="", relevance=relevance)
+
+
+def test_merge_interleaves_by_relevance_and_advances_offsets():
+    articles = [result("article", "a1", 9), result("article", "a2", 5), result("article", "a3", 1)]
+    breeds = [result("breed", "b1", 7), result("breed", "b2", 6)]
+    page, next_offsets = merge_ranked([articles, breeds], 3, [10, 4])
+    assert [item.id for item in page] == ["a1", "b1", "b2"]
+    assert next_offsets == [11, 6]
+
+    page, next_offsets = merge_ranked([articles[1:], []], 3, [11, 6])
+    assert [item.id for item in page] == ["a2", "a3"]
+    assert next_offsets is None
+
+
+def test_ties_go_to_the_first_type():
+    page, _ = merge_ranked([[result("article", "a", 2)], [result("breed", "b", 2)]], 1, [0, 0])
+    assert page[0].id == "a"
+
+
+class TextCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        # textScore descending, then id
+        self.docs.sort(key=lambda doc: (-doc["score"], doc["id"]))
+        return self
+
+    def skip(self, count):
+        self.docs = self.docs[count:]
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class TextCollection:
+    """$text queries over documents with a fixed score, matching any word of the title."""
+
+    def __init__(self, title_field, docs):
+        self.title_field = title_field
+        self.docs = docs
+
+    def find(self, filter_doc, projection=None):
+        words = set(filter_doc["$text"]["$search"].lower().split())
+        return TextCursor([dict(doc) for doc in self.docs if words & set(doc[self.title_field].lower().split())])
+
+
+def test_next_cursor_pages_through_both_types(api, monkeypatch):
+    client, server = api
+    monkeypatch.setattr(server, "db", dict(
+        articles=TextCollection("title", [
+            {"id": f"a{n}", "title": f"Beagle care {n}", "excerpt": "", "score": 10 - n} for n in range(5)
+        ]),
+        breeds=TextCollection("name", [
+            {"id": f"b{n}", "name": f"Beagle mix {n}", "idealFor": "", "score": 7.5 - 2 * n} for n in range(3)
+        ]),
+    ))
+
+    seen, params = [], {"q": "beagle", "limit": 3}
+    while True:
+        response = client.get("/api/search", params=params)
+        assert response.status_code == 200
+        seen.append([item["id"] for item in response.json()])
+        if "x-next-cursor" not in response.headers:
+            break
+        params = {"q": "beagle", "limit": 3, "cursor": response.headers["x-next-cursor"]}
+    assert seen == [["a0", "a1", "a2"], ["b0", "a3", "a4"], ["b1", "b2"]]
+
+    assert [item["type"] for item in client.get("/api/search", params={"q": "beagle", "type": "breed"}).json()] == ["breed"] * 3
+    assert client.get("/api/search", params={"q": "beagle", "cursor": "bogus"}).status_code == 400
@@ -0,0 +1,46 @@
+from search_index import SearchIndex, strip_html, tokenize
+
+
+def make_index():
+    index = SearchIndex()
+    index.add_article({"id": "1", "title": "Puppy nutrition guide", "excerpt": "Feeding basics",
+                       "content": "<p>Protein &amp; fat for growing puppies</p>"})
+    index.add_article({"id": "2", "title": "Litter training", "excerpt": "Cats and litter boxes",
+                       "content": "<p>Nutrition is not covered here</p>"})
+    index.add_breed({"id": "golden-retriever", "name": "Golden Retriever", "temperament": ["Friendly", "Loyal"],
+                     "origin": "Scotland", "idealFor": "Families"})
+    return index
+
+
+def test_tokenize_strips_markup_and_stopwords():
+    assert tokenize(strip_html("<p>The dog &amp; the cat</p>")) == ["dog", "cat"]
+
+
+def test_title_match_outranks_body_match():
+    results, next_offsets = make_index().search("nutrition")
+    assert [result.id for result in results] == ["1", "2"]
+    assert results[0].relevance > results[1].relevance
+    assert next_offsets is None
+
+
+def test_type_filter_and_paging():
+    index = make_index()
+    assert [r.id for r in index.search("friendly", ("breed",))[0]] == ["golden-retriever"]
+    page, next_offsets = index.search("nutrition", limit=1)
+    assert [r.id for r in page] == ["1"]
+    assert [r.id for r in index.search("nutrition", limit=1, offsets=next_offsets)[0]] == ["2"]
+
+
+def test_updates_and_removals_are_incremental():
+    index = make_index()
+    index.add_article({"id": "1", "title": "Senior dog care", "excerpt": "", "content": ""})
+    assert [r.id for r in index.search("nutrition")[0]] == ["2"]
+    assert [r.id for r in index.search("senior")[0]] == ["1"]
+
+    index.remove("article", "2")
+    assert index.search("nutrition")[0] == []
+
+    index.compact()
+    assert index.stats()["dead_documents"] == 0
+    assert [r.id for r in index.search("senior")[0]] == ["1"]
+    assert len(index) == 2
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from models_extended import ArticleRating
+from serialization import ORJSONResponse, dumps
+
+
+def test_matches_fastapi_default_output():
+    content = {
+        "articles": [{"id": "1", "title": "Кошки & <dogs>", "updated_at": datetime(2024, 5, 1, 8, 30, 0, 125000)}],
+        "pagination": {"page": 1, "next_cursor": None},
+        "rating": ArticleRating(article_id="1", updated_at=datetime(2024, 5, 1)),
+    }
+    assert dumps(content) == JSONResponse(jsonable_encoder(content)).body
+
+
+def test_bytes_are_sent_unchanged():
+    assert ORJSONResponse(b'{"cached":true}').body == b'{"cached":true}'
@@ -0,0 +1,56 @@
+import asyncio
+
+from sitemap_cache import SitemapCache
+
+
+def make_builder(calls):
+    async def build():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return f"sitemap {len(calls)}".encode(), None
+    return build
+
+
+def test_concurrent_requests_share_one_build_until_invalidated():
+    async def scenario():
+        calls = []
+
+        async def fingerprint():
+            return "v1"
+
+        cache = SitemapCache(None, fingerprint)
+        build = make_builder(calls)
+        entries = await asyncio.gather(*(cache.get("sitemap.xml", "application/xml", build) for _ in range(10)))
+        assert len(calls) == 1
+        assert len({entry.etag for entry in entries}) == 1
+
+        cache.invalidate()
+        rebuilt = await cache.get("sitemap.xml", "application/xml", build)
+        assert len(calls) == 2
+        assert rebuilt.etag != entries[0].etag
+
+    asyncio.run(scenario())
+
+
+def test_disk_copy_is_reused_only_for_the_same_fingerprint(tmp_path):
+    async def scenario():
+        calls = []
+        version = ["v1"]
+
+        async def fingerprint():
+            return version[0]
+
+        build = make_builder(calls)
+        first = await SitemapCache(tmp_path, fingerprint).get("sitemaps/pages.xml", "application/xml", build)
+
+        # A restarted server finds the sitemap on disk
+        reloaded = await SitemapCache(tmp_path, fingerprint).get("sitemaps/pages.xml", "application/xml", build)
+        assert len(calls) == 1
+        assert (reloaded.body, reloaded.etag) == (first.body, first.etag)
+
+        # Content changed while the server was down
+        version[0] = "v2"
+        await SitemapCache(tmp_path, fingerprint).get("sitemaps/pages.xml", "application/xml", build)
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,125 @@
+import re
+from datetime import datetime
+
+
+def locs(body):
+    return re.findall(r"<loc>([^<]*)</loc>", body)
+
+
+def add_content(insert, articles, breeds):
+    insert("articles", *(
+        {"id": f"a{n}", "title": f"Article {n}", "category": "dogs", "content": "", "excerpt": "",
+         "author": "Ann", "date": "2024-03-01", "readTime": "1 min", "updated_at": datetime(2024, 3, n + 1)}
+        for n in range(articles)
+    ))
+    insert("breeds", *({"id": f"b{n}", "name": f"Breed {n}", "species": "dog"} for n in range(breeds)))
+
+
+def test_small_sites_get_one_urlset(api, insert, monkeypatch):
+    monkeypatch.setenv("FRONTEND_URL", "https://pets.example")
+    client, _ = api
+    add_content(insert, 2, 1)
+
+    response = client.get("/api/sitemap.xml")
+    assert response.status_code == 200
+    assert response.text.startswith('<?xml version="1.0" encoding="UTF-8"?>\n<urlset ')
+    assert locs(response.text) == [
+        "https://pets.example", "https://pets.example/articles", "https://pets.example/breeds",
+        "https://pets.example/articles/a0", "https://pets.example/articles/a1", "https://pets.example/breeds/b0",
+    ]
+    assert "<lastmod>2024-03-02</lastmod>" in response.text
+
+
+def test_large_sites_are_split_into_parts(api, insert, monkeypatch):
+    monkeypatch.setenv("FRONTEND_URL", "https://pets.example")
+    client, server = api
+    monkeypatch.setattr(server, "SITEMAP_URL_LIMIT", 3)
+    add_content(insert, 7, 2)
+
+    index = client.get("/api/sitemap.xml").text
+    assert "<sitemapindex " in index
+    assert [loc.rsplit("/", 1)[1] for loc in locs(index)] == [
+        "pages.xml", "articles-1.xml", "articles-2.xml", "articles-3.xml", "breeds-1.xml",
+    ]
+
+    parts = [locs(client.get(f"/api/sitemaps/articles-{number}.xml").text) for number in (1, 2, 3)]
+    assert [[loc.rsplit("/", 1)[1] for loc in part] for part in parts] == [
+        ["a0", "a1", "a2"], ["a3", "a4", "a5"], ["a6"],
+    ]
+    assert locs(client.get("/api/sitemaps/pages.xml").text)[0] == "https://pets.example"
+    assert client.get("/api/sitemaps/articles-4.xml").status_code == 404
+    assert client.get("/api/sitemaps/videos-1.xml").status_code == 404
+
+
+def test_html_sitemap_groups_and_escapes(api, insert, monkeypatch):
+    monkeypatch.setenv("FRONTEND_URL", "https://pets.example")
+    client, _ = api
+    insert("articles",
+           {"id": "a1", "title": "Walks & <b>runs</b>", "category": "dogs"},
+           {"id": "a2", "title": "Litter boxes", "category": "cats"},
+           {"id": "a3", "title": "Agility", "category": "dogs"})
+    insert("breeds",
+           {"id": "beagle", "name": "Beagle", "species": "dog"},
+           {"id": "siamese", "name": "Siamese", "species": "cat"},
+           {"id": "akita", "name": "Akita", "species": "dog"})
+
+    html = client.get("/api/sitemap.html").text
+    headings = re.findall(r"<h[23][^>]*>([^<]*)</h[23]>", html)
+    assert headings == ["Articles", "cats", "dogs", "Dog Breeds", "Cat Breeds"]
+    links = re.findall(r'<a href="https://pets.example/(\w+/\w+)">([^<]*)</a>', html)
+    assert links == [
+        ("articles/a2", "Litter boxes"),
+        ("articles/a3", "Agility"),
+        ("articles/a1", "Walks &amp; &lt;b&gt;runs&lt;/b&gt;"),
+        ("breeds/akita", "Akita"),
+        ("breeds/beagle", "Beagle"),
+        ("breeds/siamese", "Siamese"),
+    ]
+    assert "<b>" not in html
+    assert "pagination" not in html.split("</style>")[1]
+
+
+def test_html_sitemap_pages(api, insert, monkeypatch):
+    client, server = api
+    monkeypatch.setattr(server, "HTML_SITEMAP_PAGE_SIZE", 1)
+    insert("breeds",
+           {"id": "beagle", "name": "Beagle", "species": "dog"},
+           {"id": "akita", "name": "Akita", "species": "dog"})
+
+    first = client.get("/api/sitemap.html").text
+    second = client.get("/api/sitemap.html", params={"page": 2}).text
+    assert "/breeds/akita" in first and "/breeds/beagle" not in first
+    assert "/breeds/beagle" in second and "Page 2 of 2" in second and "?page=1" in second
+    assert client.get("/api/sitemap.html", params={"page": 3}).status_code == 404
+
+
+def test_sitemap_links_ignore_the_host_header(api, insert, monkeypatch):
+    monkeypatch.setenv("PUBLIC_API_URL", "https://api.pets.example/")
+    client, server = api
+    monkeypatch.setattr(server, "SITEMAP_URL_LIMIT", 3)
+    monkeypatch.setattr(server, "HTML_SITEMAP_PAGE_SIZE", 1)
+    add_content(insert, 4, 2)
+
+    forged = {"Host": "evil.example"}
+    for path in ("/api/sitemap.xml", "/api/sitemap.html"):
+        assert "evil.example" not in client.get(path, headers=forged).text
+    # The copies cached by the forged requests are what everyone else gets
+    index = client.get("/api/sitemap.xml").text
+    assert locs(index)[0] == "https://api.pets.example/api/sitemaps/pages.xml"
+    assert 'href="https://api.pets.example/api/sitemap.html?page=2"' in client.get("/api/sitemap.html").text
+
+
+def test_html_sitemap_pages_continue_after_the_previous_sort_key(api, insert, monkeypatch):
+    client, server = api
+    monkeypatch.setattr(server, "HTML_SITEMAP_PAGE_SIZE", 2)
+    insert("articles", *(
+        {"id": f"a{n}", "title": "Same title", "category": "dogs" if n % 2 else "cats"} for n in range(5)
+    ))
+    insert("breeds", {"id": "siamese", "name": "Siamese", "species": "cat"})
+
+    pages = [client.get("/api/sitemap.html", params={"page": page}).text for page in (1, 2, 3)]
+    articles = [re.findall(r"/articles/(a\d)", html) for html in pages]
+    assert articles == [["a0", "a2"], ["a4", "a1"], ["a3"]]
+    assert ["/breeds/siamese" in html for html in pages] == [True, False, False]
+    # The start keys are read once and reused until the content changes
+    assert len(server._sitemap_page_starts) == 3
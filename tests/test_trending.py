@@ -0,0 +1,68 @@
+import asyncio
+import random
+
+import pytest
+
+from trending import Trending
+
+
+class Snapshots:
+    def __init__(self):
+        self.doc = None
+
+    async def replace_one(self, filter_doc, doc, upsert=False):
+        self.doc = dict(doc)
+
+    async def find_one(self, filter_doc):
+        return self.doc
+
+
+def test_top_pages_match_decayed_view_counts():
+    rng = random.Random(3)
+    half_life = 100.0
+    trending = Trending(None, half_life=half_life, size=5, clock=lambda: 0.0)
+    views = []
+    for second in range(5000):
+        page_id = str(min(int(rng.paretovariate(1.0)), 30) + (second // 1000) * 5)
+        trending.record("breed", page_id, now=float(second))
+        views.append((page_id, second))
+
+    # Each view decays by half every half_life seconds
+    now = 5000.0
+    expected = {}
+    for page_id, second in views:
+        expected[page_id] = expected.get(page_id, 0.0) + 0.5 ** ((now - second) / half_life)
+    ranked = sorted(expected.items(), key=lambda item: -item[1])[:5]
+
+    top = trending.top("breed", 5, now=now)
+    assert [page_id for page_id, _ in top] == [page_id for page_id, _ in ranked]
+    for (_, score), (_, want) in zip(top, ranked):
+        assert score == pytest.approx(want)
+    assert trending.top("article", 5) == []
+
+
+def test_snapshot_restores_scores():
+    snapshots = Snapshots()
+    trending = Trending(snapshots, half_life=60.0, clock=lambda: 0.0)
+    for second in range(0, 3000, 3):
+        trending.record("article", str(second % 7), now=float(second))
+
+    asyncio.run(trending.snapshot())
+    restored = Trending(snapshots, half_life=60.0, clock=lambda: 5000.0)
+    asyncio.run(restored.restore())
+
+    expected = trending.top("article", 7, now=3100.0)
+    assert [page_id for page_id, _ in restored.top("article", 7, now=3100.0)] == [page_id for page_id, _ in expected]
+    assert restored.top("article", 1, now=3100.0)[0][1] == pytest.approx(expected[0][1])
+
+
+def test_scores_per_type_are_capped_without_losing_the_top():
+    trending = Trending(None, size=2, max_scores=10, clock=lambda: 0.0)
+    for _ in range(5):
+        trending.record("article", "popular", now=0.0)
+    trending.record("article", "liked", now=0.0)
+    trending.record("article", "liked", now=0.0)
+    for n in range(1000):
+        trending.record("article", f"once-{n}", now=0.0)
+    assert len(trending._scores["article"]) <= 10
+    assert [page_id for page_id, _ in trending.top("article", 2, now=0.0)] == ["popular", "liked"]
@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import os
+import time
+
+from upload_refs import UploadRefs, blob_id
+from utils import file_upload
+from utils.file_upload import blob_path
+
+
+class RefsCollection:
+    """Just the upload_refs queries UploadRefs makes, over a dict of id -> refs."""
+
+    def __init__(self):
+        self.refs = {}
+
+    async def update_one(self, filter_doc, update, upsert=False):
+        refs = self.refs.setdefault(filter_doc["id"], []) if upsert else self.refs.get(filter_doc["id"], [])
+        for owner in update.get("$addToSet", {}).values():
+            if owner not in refs:
+                refs.append(owner)
+        for owner in update.get("$pull", {}).values():
+            if owner in refs:
+                refs.remove(owner)
+
+    async def find_one(self, filter_doc, projection=None):
+        refs = self.refs.get(filter_doc["id"])
+        return None if refs is None else {"refs": list(refs)}
+
+    def find(self, filter_doc, projection=None):
+        docs = [{"id": blob} for blob in filter_doc["id"]["$in"] if self.refs.get(blob)]
+
+        class Cursor:
+            async def to_list(self, length):
+                return docs
+        return Cursor()
+
+    async def delete_one(self, filter_doc):
+        if not self.refs.get(filter_doc["id"]):
+            self.refs.pop(filter_doc["id"], None)
+
+    async def delete_many(self, filter_doc):
+        for blob in filter_doc["id"]["$in"]:
+            await self.delete_one({"id": blob})
+
+
+def store(content: bytes, age: float) -> str:
+    """Put a blob (and a derivative) in the store, ``age`` seconds old; return its URL."""
+    blob = hashlib.sha256(content).hexdigest()
+    path = blob_path(f"{blob}.png")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    path.with_name(f"{blob}-320w.webp").write_bytes(b"webp")
+    moment = time.time() - age
+    os.utime(path, (moment, moment))
+    return f"/api/uploads/blobs/{blob[:2]}/{blob}.png"
+
+
+def test_only_old_unreferenced_images_are_collected(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_upload, "UPLOADS_DIR", tmp_path)
+    refs = UploadRefs(RefsCollection(), grace=3600)
+    shared = store(b"shared", age=7200)
+    replaced = store(b"replaced", age=7200)
+    fresh = store(b"fresh", age=10)
+
+    async def scenario():
+        await refs.replace("article:1", None, shared)
+        await refs.replace("breed:beagle", None, replaced)
+        await refs.replace("breed:beagle", replaced, shared)
+        assert await refs.count(blob_id(shared)) == 2
+        assert not await refs.forget(blob_id(shared))
+        return await refs.collect_orphans()
+
+    assert asyncio.run(scenario()) == {"scanned": 3, "removed": 1}
+    remaining = sorted(path.name.split(".")[0] for path in tmp_path.rglob("*.png"))
+    assert remaining == sorted([blob_id(shared), blob_id(fresh)])
+    assert not list(tmp_path.rglob(f"{blob_id(replaced)}*"))
+
+
+def test_derivative_urls_map_to_their_source_image():
+    digest = hashlib.sha256(b"image").hexdigest()
+    source = f"/api/uploads/blobs/{digest[:2]}/{digest}.png"
+    assert blob_id(source) == digest
+    assert blob_id(f"/api/uploads/blobs/{digest[:2]}/{digest}-480w.webp") == digest
+    assert blob_id(f"/api/uploads/blobs/{digest[:2]}/{digest}-large.webp") is None
+    assert blob_id("/api/uploads/articles/photo.png") is None
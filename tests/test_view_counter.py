@@ -0,0 +1,108 @@
+import asyncio
+
+from view_counter import ViewCounter
+from benchmarks._simulated_db import SimulatedCollection
+
+
+def test_record_answers_running_total_and_flushes_in_one_batch():
+    async def scenario():
+        collection = SimulatedCollection(rtt=0)
+        counter = ViewCounter(collection, max_pending=10_000)
+
+        totals = await asyncio.gather(*(counter.record("article", "1") for _ in range(50)))
+        await asyncio.gather(*(counter.record("breed", "pug") for _ in range(5)))
+        reads = collection.round_trips
+
+        assert max(totals) == 50
+        assert await counter.flush() == 55
+        assert collection.round_trips == reads + 1
+        assert await counter.get("article", "1") == 50
+        return collection
+
+    collection = asyncio.run(scenario())
+    views = {doc["page_id"]: doc["views"] for doc in collection.docs.values()}
+    assert views == {"1": 50, "pug": 5}
+
+
+def test_running_total_starts_from_persisted_views():
+    async def scenario():
+        collection = SimulatedCollection(rtt=0)
+        await collection.update_one({"page_type": "article", "page_id": "1"}, {"$inc": {"views": 7}})
+        counter = ViewCounter(collection)
+        assert await counter.record("article", "1") == 8
+        await counter.stop()
+        assert await counter.record("article", "1") == 9
+        await counter.stop()
+        return collection
+
+    collection = asyncio.run(scenario())
+    assert next(iter(collection.docs.values()))["views"] == 9
+
+
+def test_size_threshold_triggers_flush():
+    async def scenario():
+        collection = SimulatedCollection(rtt=0)
+        counter = ViewCounter(collection, flush_interval=3600, max_pending=10)
+        for _ in range(10):
+            await counter.record("breed", "pug")
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return collection
+
+    collection = asyncio.run(scenario())
+    assert next(iter(collection.docs.values()))["views"] == 10
+
+
+def test_cached_totals_are_bounded_and_reloaded_after_eviction():
+    async def scenario():
+        collection = SimulatedCollection(rtt=0)
+        counter = ViewCounter(collection, max_cached=2)
+        for page_id in ("1", "2", "3", "1"):
+            await counter.record("article", page_id)
+        await counter.flush()
+        assert len(counter._persisted) == 2
+        for page_id in ("4", "5", "6"):
+            await counter.get("article", page_id)
+        # "1" was evicted; its total is read back from the database
+        assert await counter.record("article", "1") == 3
+        assert await counter.get_many("article", ["2", "3"]) == {"2": 1, "3": 1}
+        assert len(counter._persisted) == 2
+
+    asyncio.run(scenario())
+
+
+def test_totals_include_views_a_slow_flush_is_writing():
+    async def scenario():
+        collection = SimulatedCollection(rtt=0.05)
+        counter = ViewCounter(collection, max_pending=10_000)
+        for _ in range(5):
+            await counter.record("article", "1")
+
+        flush = asyncio.create_task(counter.flush())
+        await asyncio.sleep(0.01)
+        during = [await counter.get("article", "1"), await counter.get_many("article", ["1"]),
+                  await counter.record("article", "1")]
+        await flush
+        return during, await counter.get("article", "1")
+
+    during, after = asyncio.run(scenario())
+    assert during == [5, {"1": 5}, 6]
+    assert after == 6
+
+
+def test_failed_flush_keeps_the_total():
+    class Failing(SimulatedCollection):
+        async def bulk_write(self, operations, ordered=True):
+            raise ConnectionError("down")
+
+    async def scenario():
+        counter = ViewCounter(Failing(rtt=0), max_pending=10_000)
+        for _ in range(3):
+            await counter.record("breed", "pug")
+        try:
+            await counter.flush()
+        except ConnectionError:
+            pass
+        return await counter.get("breed", "pug")
+
+    assert asyncio.run(scenario()) == 3
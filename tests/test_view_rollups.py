@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from view_rollups import ViewRollups, day_floor, daily_rollup_pipeline
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs if length is None else self.docs[:length]
+
+
+class Buckets:
+    """Bucket documents with the upserts, range finds and rollup ViewRollups uses."""
+
+    def __init__(self, time_field, daily=None):
+        self.time_field = time_field
+        self.daily = daily
+        self.docs = []
+
+    def _get(self, key):
+        for doc in self.docs:
+            if all(doc.get(field) == value for field, value in key.items()):
+                return doc
+        self.docs.append(dict(key))
+        return self.docs[-1]
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            doc = self._get(operation._filter)
+            doc["views"] = doc.get("views", 0) + operation._doc["$inc"]["views"]
+
+    def find(self, filter_doc, projection=None):
+        since = filter_doc[self.time_field]["$gte"]
+        return Cursor(sorted(
+            (dict(doc) for doc in self.docs
+             if doc["page_type"] == filter_doc["page_type"] and doc["page_id"] == filter_doc["page_id"]
+             and doc[self.time_field] >= since),
+            key=lambda doc: doc[self.time_field]
+        ))
+
+    def aggregate(self, pipeline):
+        bounds = pipeline[0]["$match"]["hour"]
+        days = {}
+        for doc in self.docs:
+            if bounds["$gte"] <= doc["hour"] < bounds["$lt"]:
+                key = (doc["page_type"], doc["page_id"], day_floor(doc["hour"]))
+                days[key] = days.get(key, 0) + doc["views"]
+        for (page_type, page_id, day), views in days.items():
+            self.daily._get({"page_type": page_type, "page_id": page_id, "day": day})["views"] = views
+        return Cursor([])
+
+
+class State:
+    def __init__(self):
+        self.doc = None
+
+    async def find_one(self, filter_doc):
+        return self.doc
+
+    async def update_one(self, filter_doc, update, upsert=False):
+        self.doc = {**filter_doc, **update["$set"]}
+
+
+def make_rollups():
+    db = type("Db", (), {})()
+    db.view_buckets_daily = Buckets("day")
+    db.view_buckets_hourly = Buckets("hour", daily=db.view_buckets_daily)
+    db.view_rollup_state = State()
+    return ViewRollups(db)
+
+
+def test_day_series_combines_rollups_with_uncompacted_hours():
+    rollups = make_rollups()
+    start = datetime(2024, 5, 1, 20, 30)
+    views = {}
+
+    async def scenario():
+        for step in range(30):
+            moment = start + timedelta(hours=step)
+            count = step + 1
+            await rollups.add_views({("article", "1"): count, ("article", "2"): 1}, now=moment)
+            views[day_floor(moment)] = views.get(day_floor(moment), 0) + count
+            if step % 7 == 0:
+                # Re-running the compaction must not count anything twice
+                await rollups.compact(now=moment)
+                await rollups.compact(now=moment)
+        end = start + timedelta(hours=29)
+        return (
+            await rollups.timeseries("article", "1", "day", 3, now=end),
+            await rollups.timeseries("article", None, "day", 3, now=end),
+            await rollups.timeseries("article", "1", "hour", 2, now=end),
+        )
+
+    page, total, hours = asyncio.run(scenario())
+    assert [point["views"] for point in page] == [views[point["time"]] for point in page]
+    assert sum(point["views"] for point in total) == sum(views.values()) + 30
+    assert hours == [
+        {"time": datetime(2024, 5, 3, 0, 0), "views": 29},
+        {"time": datetime(2024, 5, 3, 1, 0), "views": 30},
+    ]
+
+
+def test_rollup_merges_on_the_daily_bucket_key():
+    pipeline = daily_rollup_pipeline(datetime(2024, 5, 1), datetime(2024, 5, 2, 6))
+    assert pipeline[0] == {"$match": {"hour": {"$gte": datetime(2024, 5, 1), "$lt": datetime(2024, 5, 2, 6)}}}
+    assert pipeline[-1]["$merge"]["on"] == ["page_type", "page_id", "day"]
+    assert pipeline[-1]["$merge"]["whenMatched"] == "replace"